@@ -0,0 +1,288 @@
+# bench-music.py
+# -------------------------------------------------------------------------------------------------
+# Benchmark suite for ifn-music
+#
+# Times parsing, event scheduling, per-instrument synthesis in float64 and float32, full renders
+# of every library piece, a long piece rendered over 1, 2, 4 ... worker processes or from its last
+# measure, transcription back to notes, the GUI waveform pyramid, playback on the null output,
+# the effects and file writing, all in headless mode (no audio device needed).
+#
+# usage:
+#   python benchmark/bench-music.py --output benchmark/bench-baseline.json
+#   python benchmark/bench-music.py --baseline --threshold 0.25
+#
+# Each result records the best wall time over --repeat runs and, where the benchmark produces
+# audio, the real-time factor (audio seconds per wall second). With --baseline the run fails
+# (exit code 1) if any benchmark is slower than baseline * (1 + threshold); without a file name
+# it compares against benchmark/bench-baseline.json. Timings depend on the machine, so store a
+# new baseline on the machine that runs the comparison.
+# -------------------------------------------------------------------------------------------------
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import Music
+from ScoreTransform import ScoreTransform
+from fractions import Fraction
+
+SAMPLE_RATE = 44100
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench-baseline.json")
+NOTE_LENGTHS = [0.1, 0.5, 2.0]   # seconds
+INSTRUMENTS = ["piano", "guitar", "organ", "drum", "bass", "bell", "angklung", "harmonica", "violin", "flute"]
+
+
+def scaled_notes(notes, scale):
+    """repeat a notes string `scale` times as consecutive measures"""
+    return " | ".join([notes.strip().rstrip("|")] * scale)
+
+
+def legacy_parse_music(music_notes):
+    """the regex-and-Fraction parse_music of version 0.1.3, kept as a reference point"""
+    music_notes = music_notes.replace("\n", "").strip()
+    music_notes = re.sub(r'\s+', ' ', music_notes.strip())
+    raw_measures = [m.strip() for m in music_notes.split('|') if m.strip()]
+    pattern = r'([A-Ga-g][#b]?\d+|[Rr]|rest)/([\d\.]+)'
+    measures = []
+    for measure in raw_measures:
+        total_duration = Fraction(0)
+        notes = []
+        for pitch, duration in re.findall(pattern, measure):
+            dur_parts = sum(Fraction(s) for s in duration.split('+'))
+            total_duration += 1/dur_parts.numerator
+            notes.append({'pitch': pitch.upper(), 'duration': dur_parts})
+        measures.append(notes)
+    return measures
+
+
+def collect_benchmarks(muz, scales, stack):
+    """
+    return list of (name, function, audio_seconds[, setup]); audio_seconds is None for
+    benchmarks that do not produce audio. The expensive setup (worker pools, the long render
+    to transcribe) only runs for the benchmarks selected, in their untimed setup() or first
+    render; stack (a contextlib.ExitStack) closes the pools and the scratch directory.
+    """
+    benchmarks = []
+    library = muz.manager.get_all_music()
+
+    # parsing and scheduling over the whole library, scaled up to thousands of measures
+    for scale in scales:
+        pieces = [(m, scaled_notes(m.notes, scale)) for m in library]
+
+        def parse(pieces=pieces):
+            for music, notes in pieces:
+                muz.set_time_signature(music.signature)
+                muz.parse_music(notes)
+
+        def legacy_parse(pieces=pieces):
+            for music, notes in pieces:
+                legacy_parse_music(notes)
+
+        def events(pieces=pieces):
+            for music, notes in pieces:
+                muz.set_time_signature(music.signature)
+                list(muz.notes_to_events(muz.parse_music(notes), music.tempo))
+
+        benchmarks.append((f"parse_music/library/x{scale}", parse, None))
+        benchmarks.append((f"parse_music_legacy/library/x{scale}", legacy_parse, None))
+        benchmarks.append((f"notes_to_events/library/x{scale}", events, None))
+
+        transform = ScoreTransform(muz.parser)
+        library_notes = [notes for _, notes in pieces]
+        benchmarks.append((f"transform/library/x{scale}",
+                           lambda notes=library_notes: transform.apply(notes, semitones=2, time_signature="3/4"),
+                           None))
+
+    # synthesis of a single note per instrument and note length, computed in float64 and in float32
+    for instrument in INSTRUMENTS:
+        for length in NOTE_LENGTHS:
+            def synth(instrument=instrument, length=length):
+                muz.generate_wave(440.0, length, instrument=instrument)
+            benchmarks.append((f"generate_wave/{instrument}/{length}s", synth, length))
+
+            def synth32(instrument=instrument, length=length):
+                muz.generate_wave(440.0, length, instrument=instrument, precision="float32")
+            benchmarks.append((f"generate_wave_float32/{instrument}/{length}s", synth32, length))
+
+    # full renders of each library piece
+    for music in library:
+        instrument = music.instruments[0] if getattr(music, "instruments", None) else "piano"
+        for scale in scales:
+            notes = scaled_notes(music.notes, scale)
+            muz.set_time_signature(music.signature)
+            audio_seconds = sum(e["duration"] for e in muz.notes_to_events(muz.parse_music(notes), music.tempo))
+
+            def render(music=music, notes=notes, instrument=instrument):
+                muz.set_time_signature(music.signature)
+                muz.music_notes_to_waves(notes, tempo=music.tempo, instrument=instrument)
+            benchmarks.append((f"render/{music.name}/{instrument}/x{scale}", render, audio_seconds))
+
+            def render_release(music=music, notes=notes, instrument=instrument):
+                muz.set_time_signature(music.signature)
+                muz.music_notes_to_waves(notes, tempo=music.tempo, instrument=instrument, release=True)
+            benchmarks.append((f"render_release/{music.name}/{instrument}/x{scale}", render_release, audio_seconds))
+
+    # one long piece split over worker processes (workers=1 is the serial render)
+    from ParallelRender import ParallelRenderer
+    from RenderContext import RenderContext
+    music = library[0]
+    notes = scaled_notes(music.notes, max(scales))
+    audio_seconds = sum(e["duration"] for e in muz.notes_to_events(muz.parse_music(notes), music.tempo))
+    context = RenderContext(music.signature, music.tempo, "guitar", seed=0)
+    cpus = os.cpu_count() or 1
+    for workers in sorted({1, 2, 4, cpus}):
+        if workers > cpus:
+            continue
+        renderer = ParallelRenderer(workers)   # the pool starts in the benchmark's setup
+        stack.callback(renderer.close)
+        benchmarks.append((f"render_parallel/{music.name}/guitar/x{max(scales)}/w{workers}",
+                           lambda renderer=renderer: renderer.render(notes, context), audio_seconds,
+                           renderer.start))
+
+    # seeking to the last measure of the long piece renders only that measure
+    last_measure = muz.timeline(notes, context).measures - 1
+    benchmarks.append((f"render_section/{music.name}/guitar/x{max(scales)}/last_measure",
+                       lambda: muz.render_section(notes, context, start_measure=last_measure), None))
+
+    # transcription of a rendered piece back to notes
+    from Transcriber import Transcriber
+    violin = context.replace(instrument="violin")
+    rendered_seconds = muz.timeline(notes, violin).seconds
+
+    @functools.lru_cache(maxsize=None)
+    def rendered():
+        return muz.render(notes, violin)
+
+    transcriber = Transcriber(music.tempo, music.signature)
+    benchmarks.append((f"transcribe/{music.name}/violin/x{max(scales)}",
+                       lambda: transcriber.transcribe(rendered()), rendered_seconds, rendered))
+
+    # the waveform pyramid of the GUI: built once per render, then drawn at any zoom
+    from WavePeaks import WavePeaks
+
+    @functools.lru_cache(maxsize=None)
+    def peaks():
+        return WavePeaks.from_wave(rendered())
+
+    benchmarks.append((f"wave_peaks/build/x{max(scales)}", lambda: WavePeaks.from_wave(rendered()),
+                       rendered_seconds, rendered))
+    benchmarks.append(("wave_peaks/draw/800px", lambda: [peaks().columns(0, peaks().length >> zoom, 800)
+                                                         for zoom in range(12)], None, peaks))
+
+    # the playback path (per-event synthesis, blocks, stop checks) on the null output
+    player = Music.Music(isPrint=False, headless=True, output="null")
+    for music in library:
+        instrument = music.instruments[0] if getattr(music, "instruments", None) else "piano"
+        audio_seconds = sum(e["duration"] for e in muz.notes_to_events(muz.parse_music(music.notes), music.tempo))
+
+        def playback(music=music, instrument=instrument):
+            player.set_time_signature(music.signature)
+            player.play_music_notes(music.notes, tempo=music.tempo, instrument=instrument)
+        benchmarks.append((f"playback/{music.name}/{instrument}", playback, audio_seconds))
+
+    # effects and file output on a fixed ten second signal
+    seconds = 10.0
+    wave = (0.5 * np.sin(2 * np.pi * 440.0 * np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE)).astype(np.float32)
+    benchmarks.append(("effect/echo", lambda: muz.apply_echo(wave.copy()), seconds))
+    benchmarks.append(("effect/reverb", lambda: muz.apply_reverb(wave.copy()), seconds))
+    benchmarks.append(("effect/distortion", lambda: muz.apply_distortion(wave.copy()), seconds))
+
+    tmp_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="ifn-music-bench-"))
+    for extension in ("wav", "flac", "ogg"):
+        filename = os.path.join(tmp_dir, f"bench.{extension}")
+        benchmarks.append((f"save_audio/{extension}", lambda filename=filename: muz.save_audio(filename, wave), seconds))
+    return benchmarks
+
+
+def run_benchmarks(benchmarks, repeat, name_filter=None):
+    """run each benchmark `repeat` times and return dict of results keyed by name"""
+    results = {}
+    for name, function, audio_seconds, *setup in benchmarks:
+        if name_filter and name_filter not in name:
+            continue
+        for prepare in setup:
+            prepare()
+        timings = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - t)
+        best = min(timings)
+        result = {"seconds": best, "mean_seconds": sum(timings) / len(timings)}
+        if audio_seconds:
+            result["audio_seconds"] = audio_seconds
+            result["rtf"] = audio_seconds / best if best > 0 else float("inf")
+        results[name] = result
+        rtf = f"  rtf {result['rtf']:10.1f}x" if "rtf" in result else ""
+        print(f"{name:<48} {best * 1000:10.3f} ms{rtf}")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """return list of (name, baseline_seconds, seconds) that regressed beyond threshold"""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference is None:
+            continue
+        if result["seconds"] > reference["seconds"] * (1.0 + threshold):
+            regressions.append((name, reference["seconds"], result["seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ifn-music benchmark suite")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="length multipliers for the library pieces")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the best is kept")
+    parser.add_argument("--filter", default=None, help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", default=None, help="write machine-readable results to this JSON file")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE, default=None,
+                        help="compare against results stored in this JSON file (by default the committed one)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    muz = Music.Music(isPrint=False, headless=True)
+    np.random.seed(0)
+    with contextlib.ExitStack() as stack:
+        results = run_benchmarks(collect_benchmarks(muz, args.scales, stack), args.repeat, args.filter)
+
+    report = {
+        "meta": {
+            "version": muz.version,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "scales": args.scales,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# load-test-server.py
+# -------------------------------------------------------------------------------------------------
+# Load test for the ifn-music render service (src/RenderServer.py)
+#
+# Sends --requests POST /render requests over --concurrency keep-alive connections and reports
+# requests per second with p50/p99 latency and time to first byte. Requests cycle through the
+# library pieces and instruments; --unique makes every request distinct, which defeats the
+# response cache and in-flight deduplication.
+#
+# usage:
+#   python benchmark/load-test-server.py                          # starts a server in-process
+#   python benchmark/load-test-server.py --port 8765 --external   # against a running server
+# -------------------------------------------------------------------------------------------------
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from MusicManager import MusicManager
+from RenderServer import RenderServer
+
+INSTRUMENTS = ["piano", "guitar", "organ", "bell", "flute"]
+
+
+def build_requests(data_file, count, unique, format):
+    manager = MusicManager(data_file)
+    manager.load_data()
+    library = manager.get_all_music()
+    payloads = []
+    for i in range(count):
+        music = library[i % len(library)]
+        payload = {"notes": music.notes, "tempo": music.tempo, "signature": music.signature,
+                   "instrument": INSTRUMENTS[(i // len(library)) % len(INSTRUMENTS)], "format": format}
+        if unique:
+            # a distinct volume gives a distinct cache key
+            payload["volume"] = round(0.5 - i * 1e-6, 6)
+        payloads.append(json.dumps(payload).encode())
+    return payloads
+
+
+async def read_response(reader):
+    """read one HTTP/1.1 response; returns (status, body bytes, time of the first body byte)"""
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    first_byte = None
+    if headers.get("transfer-encoding") == "chunked":
+        parts = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            if size == 0:
+                await reader.readline()
+                break
+            parts.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b"".join(parts)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        first_byte = time.perf_counter()
+    return status, body, first_byte
+
+
+async def client(host, port, queue, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while not queue.empty():
+            payload = queue.get_nowait()
+            start = time.perf_counter()
+            writer.write(f"POST /render HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload)
+            await writer.drain()
+            status, body, first_byte = await read_response(reader)
+            results.append((status, time.perf_counter() - start, first_byte - start, len(body)))
+    finally:
+        writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] if values else 0.0
+
+
+async def run(args):
+    server = None
+    if not args.external:
+        server = await RenderServer(args.host, args.port, workers=args.workers).start()
+    port = server.port if server else args.port
+    payloads = build_requests(args.data_file, args.requests, args.unique, args.format)
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(args.host, port, queue, results) for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    if server:
+        counters = dict(server.counters)
+        await server.close()
+    else:
+        counters = None
+
+    latencies = [r[1] for r in results]
+    first_bytes = [r[2] for r in results]
+    report = {
+        "requests": len(results),
+        "failed": sum(1 for r in results if r[0] != 200),
+        "concurrency": args.concurrency,
+        "seconds": elapsed,
+        "requests_per_second": len(results) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "ttfb_p50_ms": percentile(first_bytes, 50) * 1000,
+        "ttfb_p99_ms": percentile(first_bytes, 99) * 1000,
+        "mbytes": sum(r[3] for r in results) / 2 ** 20,
+        "server": counters,
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for the ifn-music render service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="server port (0 = any free port in-process)")
+    parser.add_argument("--external", action="store_true", help="use a server that is already running")
+    parser.add_argument("--workers", type=int, default=None, help="render processes of the in-process server")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--unique", action="store_true", help="make every request distinct")
+    parser.add_argument("--format", default="wav", choices=["wav", "flac"])
+    parser.add_argument("--data-file", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..",
+                                                            "src", "music_data.json"))
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{report['requests']} requests ({report['failed']} failed) at concurrency {report['concurrency']} "
+              f"in {report['seconds']:.2f} s")
+        print(f"  {report['requests_per_second']:.1f} req/s, latency p50 {report['p50_ms']:.1f} ms, "
+              f"p99 {report['p99_ms']:.1f} ms, first byte p50 {report['ttfb_p50_ms']:.1f} ms")
+        if report["server"]:
+            print(f"  server: {report['server']}")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# mem-music.py
+# -------------------------------------------------------------------------------------------------
+# Memory regression harness for ifn-music
+#
+# Runs the public entry points (parsing, render, release and multi-track renders, sections,
+# single notes, effects, file output, MIDI, playback on the null output, transcription and the
+# waveform pyramid) on scaled versions of the bundled pieces under tracemalloc, which also sees
+# the numpy buffers. Each entry point is called once to warm the caches (instrument tables, lazy
+# imports), then measured: the peak traced memory above what was allocated before the call, and
+# the memory the call leaves allocated (its result, or a leak). tracemalloc only keeps the live
+# blocks, so the bytes allocated and freed again inside a call show up in the peak, not as a
+# total. The peak per audio second is compared with a stored budget.
+#
+# usage:
+#   python benchmark/mem-music.py --write-budget benchmark/memory-budget.json
+#   python benchmark/mem-music.py --budget benchmark/memory-budget.json
+#
+# With --budget the run fails (exit code 1) if the peak per audio second of any entry point is
+# above its budget * (1 + threshold). --write-budget stores the measured peaks with --headroom
+# (at least SLACK_BYTES) on top, as the new budget.
+# -------------------------------------------------------------------------------------------------
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import numpy as np
+import Music
+
+SAMPLE_RATE = 44100
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "memory-budget.json")
+SLACK_BYTES = 256 * 1024   # least margin of a budget, so entry points using little memory do not flap
+
+
+def scaled_notes(notes, scale):
+    """repeat a notes string `scale` times as consecutive measures"""
+    return " | ".join([notes.strip().rstrip("|")] * scale)
+
+
+def collect_entry_points(muz, scale):
+    """return list of (name, function, audio_seconds) for every entry point measured"""
+    from RenderContext import RenderContext
+    entries = []
+    library = muz.manager.get_all_music()
+
+    # every library piece through the main render path
+    for music in library:
+        instrument = music.instruments[0] if getattr(music, "instruments", None) else "piano"
+        notes = scaled_notes(music.notes, scale)
+        context = RenderContext(music.signature, music.tempo, instrument, seed=0)
+        audio_seconds = muz.timeline(notes, context).seconds
+        entries.append((f"render/{music.name}/{instrument}/x{scale}",
+                        lambda notes=notes, context=context: muz.render(notes, context), audio_seconds))
+
+    # the other entry points on the first piece
+    music = library[0]
+    notes = scaled_notes(music.notes, scale)
+    context = RenderContext(music.signature, music.tempo, "organ")
+    audio_seconds = muz.timeline(notes, context).seconds
+    wave = muz.render(notes, context)
+    tmp_dir = tempfile.mkdtemp(prefix="ifn-music-mem-")
+    piece = f"{music.name}/x{scale}"
+
+    entries.append((f"parse_and_schedule/{piece}",
+                    lambda: list(muz.notes_to_events(muz.parse_music(notes), music.tempo)), audio_seconds))
+    entries.append((f"music_notes_to_waves/{piece}",
+                    lambda: muz.music_notes_to_waves(notes, tempo=music.tempo, instrument="organ"), audio_seconds))
+    release = context.replace(instrument="bell", release=True)
+    entries.append((f"render_release/{piece}/bell", lambda: muz.render(notes, release),
+                    muz.timeline(notes, release).seconds))
+    entries.append((f"music_tracks_to_waves/{piece}/stereo", lambda: muz.music_tracks_to_waves(
+        [{"notes": notes, "instrument": "flute", "pan": -0.5}, {"notes": notes, "instrument": "bass", "pan": 0.5}],
+        tempo=music.tempo, channels=2), audio_seconds))
+    half = muz.timeline(notes, context).measures // 2
+    entries.append((f"render_section/{piece}/second_half",
+                    lambda: muz.render_section(notes, context, start_measure=half), audio_seconds / 2))
+    for instrument in ("piano", "guitar", "bell", "violin"):
+        entries.append((f"generate_wave/{instrument}/10s",
+                        lambda instrument=instrument: muz.generate_wave(440.0, 10.0, instrument=instrument), 10.0))
+        entries.append((f"generate_wave_float32/{instrument}/10s",
+                        lambda instrument=instrument: muz.generate_wave(440.0, 10.0, instrument=instrument,
+                                                                        precision="float32"), 10.0))
+    entries.append((f"render_float32/{piece}/organ", lambda: muz.render(notes, context, precision="float32"),
+                    audio_seconds))
+
+    seconds = len(wave) / SAMPLE_RATE
+    entries.append((f"apply_echo/{piece}", lambda: muz.apply_echo(wave), seconds))
+    entries.append((f"apply_reverb/{piece}", lambda: muz.apply_reverb(wave), seconds))
+    entries.append((f"apply_distortion/{piece}", lambda: muz.apply_distortion(wave), seconds))
+    for extension in ("wav", "flac", "ogg"):
+        filename = os.path.join(tmp_dir, f"mem.{extension}")
+        entries.append((f"save_audio/{extension}/{piece}",
+                        lambda filename=filename: muz.save_audio(filename, wave), seconds))
+    midi_name = os.path.join(tmp_dir, "mem.mid")
+    entries.append((f"save_midi/{piece}",
+                    lambda: muz.save_midi(midi_name, notes, tempo=music.tempo, signature=music.signature),
+                    audio_seconds))
+    entries.append((f"load_midi/{piece}", lambda: muz.load_midi(midi_name), audio_seconds))
+
+    player = Music.Music(isPrint=False, headless=True, output="null")
+    entries.append((f"play_music_notes/{piece}/null",
+                    lambda: player.play_music_notes(notes, tempo=music.tempo, instrument="organ"), audio_seconds))
+    entries.append((f"play_wave/{piece}/null", lambda: player.play_wave(wave), seconds))
+
+    from Transcriber import Transcriber
+    from WavePeaks import WavePeaks
+    transcriber = Transcriber(music.tempo, music.signature)
+    entries.append((f"transcribe/{piece}", lambda: transcriber.transcribe(wave), seconds))
+    entries.append((f"wave_peaks/{piece}", lambda: WavePeaks.from_wave(wave), seconds))
+    return entries
+
+
+def measure(function):
+    """(peak bytes, retained bytes, seconds) of one call above the memory traced before it"""
+    gc.collect()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    t = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - t
+    current, peak = tracemalloc.get_traced_memory()
+    del result
+    return peak - before, current - before, seconds
+
+
+def run_entry_points(entries, name_filter=None):
+    """measure each entry point after a warm-up call and return dict of results keyed by name"""
+    results = {}
+    tracemalloc.start()
+    try:
+        for name, function, audio_seconds in entries:
+            if name_filter and name_filter not in name:
+                continue
+            function()
+            peak, retained, seconds = measure(function)
+            results[name] = {"peak_bytes": peak, "retained_bytes": retained, "seconds": seconds,
+                             "audio_seconds": audio_seconds, "peak_bytes_per_second": peak / audio_seconds}
+            print(f"{name:<48} peak {peak / 2 ** 20:9.2f} MiB  {peak / audio_seconds / 1024:9.1f} KiB/s"
+                  f"  retained {retained / 2 ** 20:8.2f} MiB")
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def check(results, budget, threshold=0.0):
+    """return list of (name, budget, measured) peak bytes per audio second over the budget"""
+    over = []
+    for name, result in results.items():
+        limit = budget.get("budget", {}).get(name)
+        if limit is None:
+            continue
+        if result["peak_bytes_per_second"] > limit * (1.0 + threshold):
+            over.append((name, limit, result["peak_bytes_per_second"]))
+    return over
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ifn-music memory regression harness")
+    parser.add_argument("--scale", type=int, default=10, help="length multiplier for the library pieces")
+    parser.add_argument("--filter", default=None, help="only run entry points whose name contains this")
+    parser.add_argument("--output", default=None, help="write machine-readable results to this JSON file")
+    parser.add_argument("--budget", nargs="?", const=DEFAULT_BUDGET, default=None,
+                        help="fail when an entry point goes over the budget stored in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.0,
+                        help="allowed excess over the budget (0.1 = 10%%)")
+    parser.add_argument("--write-budget", default=None, help="store the measured peaks as the budget in this file")
+    parser.add_argument("--headroom", type=float, default=0.25,
+                        help="margin added to the measured peaks by --write-budget (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    muz = Music.Music(isPrint=False, headless=True)
+    np.random.seed(0)
+    results = run_entry_points(collect_entry_points(muz, args.scale), args.filter)
+
+    meta = {
+        "version": muz.version,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "scale": args.scale,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"meta": meta, "results": results}, file, indent=2)
+    if args.write_budget:
+        budget = {name: int(max(result["peak_bytes"] * (1.0 + args.headroom), result["peak_bytes"] + SLACK_BYTES)
+                            / result["audio_seconds"])
+                  for name, result in sorted(results.items())}
+        with open(args.write_budget, "w") as file:
+            json.dump({"meta": dict(meta, headroom=args.headroom), "budget": budget}, file, indent=2)
+            file.write("\n")
+
+    if args.budget:
+        with open(args.budget) as file:
+            budget = json.load(file)
+        if budget.get("meta", {}).get("scale", args.scale) != args.scale:
+            print(f"warning: the budget was measured at scale {budget['meta']['scale']}, this run at {args.scale}")
+        over = check(results, budget, args.threshold)
+        for name, limit, measured in over:
+            print(f"OVER BUDGET {name}: {measured / 1024:.1f} KiB/s, budget {limit / 1024:.1f} KiB/s")
+        if over:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import time
+
+import numpy as np
+
+from AudioWriter import AudioWriter
+
+
+def frame_bytes(wave):
+    """
+    byte view of a wave for an audio stream; a C-contiguous float32 buffer, mono or
+    interleaved (frames, channels), is passed without a copy
+    """
+    return memoryview(np.ascontiguousarray(wave, dtype=np.float32)).cast("B")
+
+
+class AudioOutput():
+    # -------------------------------------------------------------------------------------------------
+    # AudioOutput Class
+    #
+    # Interface of the playback sinks used by Music.play_wave and Music.play_music_notes:
+    # open(sample_rate, channels), write(wave) of float32 (frames,) or (frames, channels) blocks,
+    # close(). `realtime` sinks are heard by a person (a sound card). `speed` is the rate at which
+    # a sink consumes audio relative to real time (1.0 for a sound card), or None when it takes
+    # the audio as fast as it comes, so playback logic can be tested and profiled faster than
+    # real time. Subclasses implement _open, _write and _close.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    realtime = False
+    speed = None
+
+    def __init__(self):
+        self.sample_rate = None
+        self.channels = None
+        self.frames = 0
+        self.is_open = False
+
+    def open(self, sample_rate=44100, channels=1):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = 0
+        self._open()
+        self.is_open = True
+        return self
+
+    def write(self, wave):
+        wave = np.ascontiguousarray(wave, dtype=np.float32)
+        self._write(wave)
+        self.frames += len(wave)
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self._close()
+
+    @property
+    def seconds(self):
+        """audio written since open"""
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _open(self):
+        pass
+
+    def _write(self, wave):
+        pass
+
+    def _close(self):
+        pass
+
+
+class PyAudioOutput(AudioOutput):
+    # sound card output through a blocking PyAudio stream
+    realtime = True
+    speed = 1.0
+
+    def _open(self):
+        import pyaudio
+        self._pyaudio = pyaudio.PyAudio()
+        self._stream = self._pyaudio.open(format=pyaudio.paFloat32, channels=self.channels,
+                                          rate=self.sample_rate, output=True)
+
+    def _write(self, wave):
+        self._stream.write(frame_bytes(wave))
+
+    def _close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._pyaudio.terminate()
+
+
+class NullOutput(AudioOutput):
+    # discards the audio. speed=None consumes it as fast as possible; speed=k emulates a device
+    # clock running k times faster than real time with `buffer` seconds of queue, blocking the
+    # writer like a sound card would.
+    def __init__(self, speed=None, buffer=0.1):
+        super().__init__()
+        self.speed = speed
+        self.buffer = buffer
+
+    def _open(self):
+        self._start = time.perf_counter()
+
+    def _write(self, wave):
+        if self.speed:
+            due = self._start + ((self.frames + len(wave)) / self.sample_rate - self.buffer) / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+
+class FileOutput(AudioOutput):
+    # writes the played audio to a WAV (or FLAC / OGG) file through a background AudioWriter
+    def __init__(self, filename, format=None):
+        super().__init__()
+        self.filename = filename
+        self.format = format
+        self.stats = None
+
+    def _open(self):
+        self._writer = AudioWriter(self.filename, sample_rate=self.sample_rate, channels=self.channels,
+                                   format=self.format)
+
+    def _write(self, wave):
+        # the writer encodes on its own thread, so it must not see a buffer the caller reuses
+        self._writer.write(np.clip(wave, -1.0, 1.0))
+
+    def _close(self):
+        self.stats = self._writer.close()
+
+
+class MemoryOutput(AudioOutput):
+    # ring buffer holding the most recent `capacity` seconds; read() consumes the oldest frames
+    # (for a consumer thread or a test), data() returns everything buffered without consuming it.
+    # Frames overwritten before being read are counted in `dropped`.
+    def __init__(self, capacity=60.0):
+        super().__init__()
+        self.capacity = capacity
+        self.dropped = 0
+
+    def _open(self):
+        size = max(1, int(self.capacity * self.sample_rate))
+        self._ring = np.zeros((size, self.channels), dtype=np.float32)
+        self._read = 0     # total frames consumed
+        self.dropped = 0
+
+    def _write(self, wave):
+        size = len(self._ring)
+        wave = wave.reshape(len(wave), -1)
+        end = self.frames + len(wave)
+        # only the last `size` frames of a long block survive
+        part = wave[max(0, len(wave) - size):]
+        start = (end - len(part)) % size
+        first = min(len(part), size - start)
+        self._ring[start:start + first] = part[:first]
+        self._ring[:len(part) - first] = part[first:]
+        oldest = end - size
+        if self._read < oldest:
+            self.dropped += oldest - self._read
+            self._read = oldest
+
+    def available(self):
+        """frames written and not yet read"""
+        return self.frames - self._read
+
+    def read(self, n_frames=None):
+        """consume and return up to n_frames of the oldest unread frames"""
+        n = self.available() if n_frames is None else min(n_frames, self.available())
+        size = len(self._ring)
+        index = (self._read + np.arange(n)) % size
+        self._read += n
+        block = self._ring[index]
+        return block[:, 0] if self.channels == 1 else block
+
+    def data(self):
+        """all unread frames, oldest first, without consuming them"""
+        index = (self._read + np.arange(self.available())) % len(self._ring)
+        block = self._ring[index]
+        return block[:, 0] if self.channels == 1 else block
+
+
+OUTPUTS = {
+    "pyaudio": PyAudioOutput,
+    "null": NullOutput,
+    "file": FileOutput,
+    "memory": MemoryOutput,
+}
+
+
+def make_output(output=None, **kwargs):
+    """
+    an AudioOutput from an instance, a name of OUTPUTS (kwargs go to its constructor,
+    e.g. make_output("file", filename="take.wav")), or None for the sound card
+    """
+    if output is None:
+        return PyAudioOutput()
+    if isinstance(output, AudioOutput):
+        return output
+    if output not in OUTPUTS:
+        raise ValueError(f"Unknown audio output {output!r}; use one of {', '.join(OUTPUTS)} or an AudioOutput")
+    return OUTPUTS[output](**kwargs)
@@ -0,0 +1,105 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+# file extension -> (soundfile format, subtype)
+AUDIO_FORMATS = {
+    ".wav": ("WAV", "PCM_16"),
+    ".flac": ("FLAC", "PCM_16"),
+    ".ogg": ("OGG", "VORBIS"),
+}
+
+
+def audio_format(filename, format=None):
+    """return (format, subtype) for a filename, or for an explicit format name such as 'flac'"""
+    key = "." + format.lower().lstrip(".") if format else os.path.splitext(filename)[1].lower()
+    if key not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported audio format {key!r}; use one of {', '.join(AUDIO_FORMATS)}")
+    return AUDIO_FORMATS[key]
+
+
+class AudioWriter():
+    # -------------------------------------------------------------------------------------------------
+    # AudioWriter Class
+    #
+    # Encodes audio blocks to WAV, FLAC or OGG/Vorbis on a background thread fed by a bounded queue,
+    # so the caller can go on rendering while the previous audio is being compressed. write() blocks
+    # only when queue_size blocks are already waiting. close() waits for the encoder and returns the
+    # compression ratio (against 16-bit PCM) and encode throughput.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    _DONE = object()
+
+    def __init__(self, filename, sample_rate=44100, channels=1, format=None, queue_size=8):
+        self.filename = filename
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.format, self.subtype = audio_format(filename, format)
+        self.frames = 0
+        self.encode_seconds = 0.0
+        self.stats = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._encode, name="AudioWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, block):
+        """queue a float block (frames,) or (frames, channels) in -1..1 for encoding"""
+        if self._error is not None:
+            raise self._error
+        self._queue.put(block)
+
+    def close(self):
+        """finish encoding, close the file and return the statistics dictionary"""
+        if self.stats is None:
+            self._queue.put(self._DONE)
+            self._thread.join()
+            if self._error is not None:
+                raise self._error
+            file_bytes = os.path.getsize(self.filename)
+            raw_bytes = self.frames * self.channels * 2
+            audio_seconds = self.frames / self.sample_rate
+            self.stats = {
+                "filename": self.filename,
+                "format": self.format,
+                "frames": self.frames,
+                "file_bytes": file_bytes,
+                "compression_ratio": raw_bytes / file_bytes if file_bytes else 0.0,
+                "encode_seconds": self.encode_seconds,
+                "throughput": audio_seconds / self.encode_seconds if self.encode_seconds > 0 else float("inf"),
+            }
+        return self.stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _encode(self):
+        import soundfile as sf
+        try:
+            with sf.SoundFile(self.filename, "w", samplerate=self.sample_rate, channels=self.channels,
+                              format=self.format, subtype=self.subtype) as file:
+                while True:
+                    block = self._queue.get()
+                    if block is self._DONE:
+                        break
+                    t = time.perf_counter()
+                    if self.subtype == "PCM_16":
+                        file.write(np.int16(block * 32767))
+                    else:
+                        file.write(np.asarray(block, dtype=np.float32))
+                    self.encode_seconds += time.perf_counter() - t
+                    self.frames += len(block)
+        except Exception as e:
+            self._error = e
+            # keep draining so that a blocked write() returns
+            while self._queue.get() is not self._DONE:
+                pass
@@ -0,0 +1,488 @@
+import math
+import threading
+
+import numpy as np
+
+# Third-party packages add instruments by declaring an entry point in this group, e.g. in pyproject.toml
+#   [project.entry-points."ifn_music.instruments"]
+#   marimba = "my_package.marimba:Marimba"
+# where Marimba is an Instrument subclass (or any factory returning an Instrument).
+ENTRY_POINT_GROUP = "ifn_music.instruments"
+DEFAULT_INSTRUMENT = "sine"   # used for unknown names
+MAX_TAIL_SECONDS = 2.0        # longest release tail of any note
+PRECISIONS = ("float64", "float32")   # compute modes of the instruments; the output is float32 in both
+
+_time_bases = {}
+_time_bases_lock = threading.Lock()
+
+
+def time_base(sample_rate, n_samples, precision="float64"):
+    """
+    read-only time in seconds of the samples 0 .. n_samples - 1, computed once per
+    (sample_rate, n_samples, precision) and shared by every instrument
+    """
+    key = (sample_rate, n_samples, precision)
+    t = _time_bases.get(key)
+    if t is None:
+        with _time_bases_lock:
+            t = _time_bases.get(key)
+            if t is None:
+                t = (np.arange(n_samples) / sample_rate).astype(precision)
+                t.setflags(write=False)
+                _time_bases[key] = t
+    return t
+
+
+class Instrument():
+    # -------------------------------------------------------------------------------------------------
+    # Instrument Class
+    #
+    # Base class of the synthesizers. prepare(sample_rate) precomputes the time ramp and the envelope
+    # tables once; render_into(out, freq, n_samples, volume) then writes n_samples clipped float
+    # samples into the caller's buffer out[:n_samples]. Subclasses implement oscillate() and
+    # envelope(); tables are read-only after prepare, so one prepared instrument can be shared.
+    # The base class itself is a plain sine.
+    #
+    # prepare(sample_rate, precision="float32") computes the notes in float32 instead of float64,
+    # which halves the memory traffic and the temporaries of every note. The tables and the time
+    # base are then float32, and the built-in instruments take their phase from cycles(), which
+    # wraps it to [0, 1) from the sample index (in float64 once per PHASE_BLOCK samples, in
+    # float32 within the block), so high notes keep their precision however long they are; a
+    # float32 t * freq would lose about one bit of phase per doubling of the number of cycles.
+    # The float64 mode computes exactly what it always did and is the reference. Largest measured
+    # difference to it over 110 Hz to 4186 Hz and 0.1 s to 12 s notes at volume 0.5: 7e-6 (organ,
+    # 3e-6 for a sine), except the flute, whose vibrato shift stays unwrapped (1e-5 at 1 s, 1e-4
+    # at 12 s for C8), and a few samples at the jumps of the piano square and the violin sawtooth,
+    # which may land on the other side.
+    #
+    # Noise instruments set NOISE = True and draw their random numbers from the rng argument of
+    # oscillate(freq, t, rng). render_into(..., seed=s) passes np.random.default_rng(s), so a note
+    # sounds the same whichever process or range renders it; seed=None uses the global np.random.
+    # Other instruments are repeatable: a note depends only on (freq, n_samples, volume), so
+    # identical measures of one render are synthesized once and copied.
+    #
+    # mix_note() adds a note plus its release tail into a mix buffer: the sound goes on past the
+    # note end under a release fade exp(-t / RELEASE) and stops once its amplitude bound
+    # volume * AMPLITUDE * exp(-DECAY * t) * fade falls below the threshold.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    TABLE_SECONDS = 4.0   # notes up to this length use the precomputed tables
+    DECAY = 0.0           # rate of the exponential decay of the envelope (1/s), 0 when sustained
+    RELEASE = 0.02        # time constant of the release fade after the note end (s)
+    AMPLITUDE = 1.0       # peak of the raw waveform
+    NOISE = False         # True when oscillate() takes an rng argument for its noise
+    PHASE_BLOCK = 64      # samples per float64 phase offset of cycles() in float32
+
+    def __init__(self):
+        self.sample_rate = None
+        self.precision = "float64"
+        self.dtype = np.dtype(np.float64)
+        self._t = None
+        self._tables = {}
+
+    def prepare(self, sample_rate=44100, precision="float64"):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; use one of {', '.join(PRECISIONS)}")
+        self.sample_rate = sample_rate
+        self.precision = precision
+        self.dtype = np.dtype(precision)
+        self._t = time_base(sample_rate, int(sample_rate * self.TABLE_SECONDS), precision)
+        self._tables = {}
+        return self
+
+    @staticmethod
+    def _readonly(array):
+        array.setflags(write=False)
+        return array
+
+    def time(self, n_samples):
+        """time in seconds of the first n_samples samples"""
+        if n_samples <= len(self._t):
+            return self._t[:n_samples]
+        if self.dtype == np.float64:
+            return np.arange(n_samples) / self.sample_rate
+        return np.arange(n_samples, dtype=self.dtype) / self.dtype.type(self.sample_rate)
+
+    def cycles(self, freq, t):
+        """
+        phase of freq in cycles, wrapped into [0, 1), at the times t = time(n_samples); in float32
+        it is made from the sample index, so it does not lose precision on long notes
+        """
+        if self.dtype == np.float64:
+            return t * freq % 1
+        n_samples, block = len(t), self.PHASE_BLOCK
+        step = freq / self.sample_rate
+        offsets = (np.arange(-(-n_samples // block)) * (block * step) % 1).astype(self.dtype)
+        phase = np.add.outer(offsets, self._t[:block] * self.dtype.type(freq)).ravel()[:n_samples]
+        phase -= np.floor(phase)
+        return phase
+
+    def angle(self, freq, t, mult=1):
+        """phase 2 pi freq mult t in radians at the times t = time(n_samples), for np.sin"""
+        if self.dtype == np.float64:
+            return 2 * np.pi * freq * mult * t
+        phase = self.cycles(freq * mult, t)
+        phase *= self.dtype.type(2 * np.pi)
+        return phase
+
+    def table(self, key, function, n_samples):
+        """function(t) over the first n_samples samples, precomputed once per key"""
+        if key not in self._tables:
+            self._tables[key] = self._readonly(function(self._t))
+        if n_samples <= len(self._t):
+            return self._tables[key][:n_samples]
+        return function(self.time(n_samples))
+
+    def decay(self, rate, n_samples):
+        return self.table(("decay", rate), lambda t: np.exp(-t * rate), n_samples)
+
+    def attack(self, rate, n_samples):
+        return self.table(("attack", rate), lambda t: 1 - np.exp(-t * rate), n_samples)
+
+    def oscillate(self, freq, t):
+        """raw waveform (of the precision's dtype, may be modified in place by the caller)"""
+        return np.sin(self.angle(freq, t))
+
+    def envelope(self, n_samples):
+        """amplitude envelope, or None for a flat one"""
+        return None
+
+    def tail_samples(self, n_samples, volume=0.5, threshold=1e-3):
+        """length of the release tail of a note of n_samples, bounded by MAX_TAIL_SECONDS"""
+        level = min(1.0, volume * self.AMPLITUDE * math.exp(-self.DECAY * n_samples / self.sample_rate))
+        if level <= threshold:
+            return 0
+        seconds = math.log(level / threshold) / (self.DECAY + 1 / self.RELEASE)
+        return min(int(math.ceil(seconds * self.sample_rate)), int(MAX_TAIL_SECONDS * self.sample_rate))
+
+    def mix_note(self, out, freq, n_samples, volume=0.5, threshold=1e-3, seed=None):
+        """
+        add a note of n_samples and its release tail into out (the mix buffer from the note start);
+        whatever does not fit in out is dropped. Returns the number of samples added.
+        """
+        if freq <= 0:
+            return 0
+        tail = self.tail_samples(n_samples, volume, threshold)
+        note = np.empty(n_samples + tail, dtype=np.float32)
+        self.render_into(note, freq, n_samples + tail, volume, seed)
+        if tail:
+            note[n_samples:] *= self.table(("release", self.RELEASE), lambda t: np.exp(-t / self.RELEASE), tail)
+        n = min(len(note), len(out))
+        out[:n] += note[:n]
+        return n
+
+    @property
+    def repeatable(self):
+        """True when a note renders the same samples every time it is played (no noise)"""
+        return not self.NOISE
+
+    def render_into(self, out, freq, n_samples, volume=0.5, seed=None):
+        """
+        write n_samples of a note at freq (Hz) into out[:n_samples]; freq <= 0 writes silence.
+        seed (an int or a sequence of ints) makes the noise of a noise instrument reproducible
+        """
+        target = out[:n_samples]
+        if freq <= 0 or n_samples == 0:
+            target[:] = 0
+            return target
+        if self.NOISE:
+            rng = np.random if seed is None else np.random.default_rng(seed)
+            wave = self.oscillate(freq, self.time(n_samples), rng)
+        else:
+            wave = self.oscillate(freq, self.time(n_samples))
+        env = self.envelope(n_samples)
+        if env is not None:
+            wave *= env
+        wave *= volume
+        np.clip(wave, -1.0, 1.0, out=target)
+        return target
+
+
+class Piano(Instrument):
+    DECAY = 8
+    RELEASE = 0.1
+
+    def oscillate(self, freq, t):
+        return np.sign(np.sin(self.angle(freq, t)))   # square wave
+
+    def envelope(self, n_samples):
+        return self.decay(self.DECAY, n_samples)
+
+
+class Guitar(Instrument):
+    # Karplus-Strong plucked string followed by a low-pass resonance filter
+    DECAY = 8
+    RELEASE = 0.3
+    NOISE = True
+
+    def prepare(self, sample_rate=44100, precision="float64"):
+        super().prepare(sample_rate, precision)
+        self._filters = {}
+        return self
+
+    def _filter(self, freq):
+        coefficients = self._filters.get(freq)
+        if coefficients is None:
+            from scipy import signal
+            b, a = signal.butter(2, min(freq / (self.sample_rate / 2), 0.99), btype='low')
+            coefficients = b.astype(self.dtype), a.astype(self.dtype)
+            self._filters[freq] = coefficients
+        return coefficients
+
+    def oscillate(self, freq, t, rng=np.random):
+        from scipy import signal
+        n_samples = len(t)
+        pluck = min(int(self.sample_rate * 0.01), n_samples)
+        delay = max(1, int(self.sample_rate / freq))
+        # buffer[i + 1] holds sample i; buffer[0] is the zero read by sample delay
+        buffer = np.zeros(n_samples + 1, dtype=self.dtype)
+        buffer[1:pluck + 1] = rng.uniform(-1, 1, pluck)   # initial pluck noise
+        # each sample averages the two samples one period earlier, so a whole period at a time
+        # depends only on finished samples
+        start = max(pluck, delay)
+        while start < n_samples:
+            end = min(start + delay, n_samples)
+            buffer[start + 1:end + 1] = (buffer[start + 1 - delay:end + 1 - delay]
+                                         + buffer[start - delay:end - delay]) * 0.49
+            start = end
+        b, a = self._filter(freq)
+        return signal.lfilter(b, a, buffer[1:])
+
+    def envelope(self, n_samples):
+        return self.decay(self.DECAY, n_samples)
+
+
+class Organ(Instrument):
+    HARMONICS = [(1, 0.6), (2, 0.4), (3, 0.3), (4, 0.2)]   # fundamental, octave, twelfth, double octave
+    RELEASE = 0.05
+    AMPLITUDE = 1.5
+
+    def oscillate(self, freq, t):
+        wave = np.zeros(len(t), dtype=self.dtype)
+        for mult, amp in self.HARMONICS:
+            wave += amp * np.sin(self.angle(freq, t, mult))
+        return wave
+
+
+class Drum(Instrument):
+    # kick drum: pitch drop from 200 to 50 Hz plus noise; the note frequency is ignored
+    DECAY = 25
+    RELEASE = 0.1
+    AMPLITUDE = 2.0
+    NOISE = True
+
+    def oscillate(self, freq, t, rng=np.random):
+        wave = np.sin(2 * np.pi * np.linspace(200, 50, len(t), dtype=self.dtype) * t)
+        wave += 0.5 * rng.normal(0, 1, len(t))
+        return wave
+
+    def envelope(self, n_samples):
+        return self.decay(self.DECAY, n_samples)
+
+
+class Bass(Instrument):
+    # FM synthesis of an electric bass
+    DECAY = 4
+    RELEASE = 0.1
+
+    def oscillate(self, freq, t):
+        return np.sin(self.angle(freq, t) + 0.5 * np.sin(self.angle(freq, t, 2)))
+
+    def envelope(self, n_samples):
+        return self.decay(self.DECAY, n_samples)
+
+
+class Bell(Instrument):
+    PARTIALS = [(1, 0.6), (2.76, 0.4), (5.43, 0.3), (8.12, 0.2)]   # inharmonic
+    DECAY = 8.5
+    RELEASE = 0.5
+    AMPLITUDE = 1.5
+
+    def oscillate(self, freq, t):
+        wave = np.zeros(len(t), dtype=self.dtype)
+        for mult, amp in self.PARTIALS:
+            wave += amp * np.sin(self.angle(freq, t, mult))
+        return wave
+
+    def envelope(self, n_samples):
+        # slow decay of the partials times the fast decay of the strike
+        return self.decay(self.DECAY, n_samples)
+
+
+class Angklung(Instrument):
+    DECAY = 20
+    RELEASE = 0.2
+    AMPLITUDE = 2.0
+    NOISE = True
+
+    def oscillate(self, freq, t, rng=np.random):
+        wave = np.sin(self.angle(freq, t))
+        wave += rng.normal(0, 0.3, len(t))
+        return wave
+
+    def envelope(self, n_samples):
+        return self.table("tremolo", lambda t: np.exp(-t * self.DECAY) * (1 - np.cos(2 * np.pi * t * 10)), n_samples)
+
+
+class Harmonica(Instrument):
+    # reed vibration with breath noise and a slow attack
+    RELEASE = 0.05
+    NOISE = True
+
+    def oscillate(self, freq, t, rng=np.random):
+        if self.dtype == np.float64:
+            from scipy import signal
+            wave = signal.sawtooth(2 * np.pi * freq * t * 1.005, 0.5)
+        else:
+            wave = 1 - 4 * np.abs(self.cycles(freq * 1.005, t) - 0.5)   # the same triangle
+        wave += 0.1 * rng.normal(0, 1, len(t)) * self.decay(10, len(t))
+        return wave
+
+    def envelope(self, n_samples):
+        return self.attack(10, n_samples)
+
+
+class Violin(Instrument):
+    RELEASE = 0.08
+
+    def oscillate(self, freq, t):
+        return 2 * self.cycles(freq, t) - 1   # sawtooth
+
+    def envelope(self, n_samples):
+        return self.attack(2, n_samples)
+
+
+class Flute(Instrument):
+    # breath-controlled sine with a 6 Hz vibrato
+    RELEASE = 0.08
+    NOISE = True
+
+    def oscillate(self, freq, t, rng=np.random):
+        if self.dtype == np.float64:
+            vibrato = self.table("vibrato", lambda t: 1 + 0.005 * np.sin(2 * np.pi * 6 * t), len(t))
+            wave = np.sin(2 * np.pi * freq * t * vibrato)
+        else:
+            # the wrapped phase plus the vibrato's shift of it, t * 0.005 * sin(...) seconds, made
+            # in float64: times freq it grows to hundreds of cycles on long high notes
+            shift = self.table("vibrato shift", self._vibrato_shift, len(t))
+            phase = self.cycles(freq, t)
+            phase += shift * self.dtype.type(freq)
+            phase -= np.floor(phase)
+            wave = np.sin(phase * self.dtype.type(2 * np.pi))
+        wave += 0.05 * rng.normal(0, 1, len(t)) * self.decay(5, len(t))
+        return wave
+
+    def _vibrato_shift(self, t):
+        t = np.arange(len(t)) / self.sample_rate
+        return (t * 0.005 * np.sin(2 * np.pi * 6 * t)).astype(self.dtype)
+
+    def envelope(self, n_samples):
+        return self.attack(2, n_samples)
+
+
+BUILTIN_INSTRUMENTS = {
+    "piano": Piano,
+    "guitar": Guitar,
+    "organ": Organ,
+    "drum": Drum,
+    "bass": Bass,
+    "bell": Bell,
+    "angklung": Angklung,
+    "harmonica": Harmonica,
+    "violin": Violin,
+    "flute": Flute,
+    "sine": Instrument,
+}
+
+
+class InstrumentRegistry():
+    # -------------------------------------------------------------------------------------------------
+    # InstrumentRegistry Class
+    #
+    # Maps instrument names to factories (Instrument subclasses). get() returns one prepared instance
+    # per (name, sample_rate, precision), shared by all callers. Entry points of ENTRY_POINT_GROUP
+    # are listed without being imported and loaded on first use; built-in and register()ed names
+    # take precedence.
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, factories=None, group=ENTRY_POINT_GROUP):
+        self.group = group
+        self._factories = dict(BUILTIN_INSTRUMENTS if factories is None else factories)
+        self._entry_points = None
+        self._prepared = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        """add or replace an instrument; factory() must return an Instrument"""
+        name = name.lower()
+        with self._lock:
+            self._factories[name] = factory
+            self._prepared = {key: value for key, value in self._prepared.items() if key[0] != name}
+        return factory
+
+    def entry_points(self):
+        """name -> EntryPoint of the installed plugin instruments"""
+        if self._entry_points is None:
+            from importlib.metadata import entry_points
+            try:
+                self._entry_points = {ep.name.lower(): ep for ep in entry_points(group=self.group)}
+            except Exception as e:
+                print(f"Warning: cannot list {self.group} entry points: {e}")
+                self._entry_points = {}
+        return self._entry_points
+
+    def names(self):
+        names = list(self._factories)
+        return names + [name for name in self.entry_points() if name not in self._factories]
+
+    def __contains__(self, name):
+        name = name.lower()
+        return name in self._factories or name in self.entry_points()
+
+    def get(self, name, sample_rate=44100, precision="float64"):
+        """the prepared instrument for name; unknown names give the DEFAULT_INSTRUMENT"""
+        name = name.lower()
+        key = (name, sample_rate, precision)
+        instrument = self._prepared.get(key)
+        if instrument is not None:
+            return instrument
+        with self._lock:
+            instrument = self._prepared.get(key)
+            if instrument is None:
+                instrument = self._create(name)
+                # instruments written before the float32 mode take prepare(sample_rate) only
+                instrument = (instrument.prepare(sample_rate) if precision == "float64"
+                              else instrument.prepare(sample_rate, precision))
+                self._prepared[key] = instrument
+        return instrument
+
+    def _create(self, name):
+        factory = self._factories.get(name)
+        if factory is None and name in self.entry_points():
+            try:
+                factory = self.entry_points()[name].load()
+                self._factories[name] = factory
+            except Exception as e:
+                print(f"Warning: cannot load instrument {name!r}: {e}")
+        if factory is None:
+            factory = self._factories.get(DEFAULT_INSTRUMENT, Instrument)
+        return factory()
+
+
+REGISTRY = InstrumentRegistry()
+
+
+def register_instrument(name):
+    """class decorator adding an Instrument subclass to the default registry under name"""
+    def decorator(factory):
+        return REGISTRY.register(name, factory)
+    return decorator
+
+
+def get_instrument(name, sample_rate=44100, precision="float64"):
+    return REGISTRY.get(name, sample_rate, precision)
+
+
+def instrument_names():
+    return REGISTRY.names()
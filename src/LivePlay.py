@@ -0,0 +1,238 @@
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from Instruments import get_instrument
+from MidiFile import MidiFile
+from PitchNote import PitchNote
+
+# Two rows of the computer keyboard laid out like a piano from C4: the home row holds the white keys
+# and the row above the black keys. z / x shift everything down / up an octave.
+KEY_MAP = {
+    "a": "C4", "w": "C#4", "s": "D4", "e": "D#4", "d": "E4", "f": "F4", "t": "F#4", "g": "G4",
+    "y": "G#4", "h": "A4", "u": "A#4", "j": "B4", "k": "C5", "o": "C#5", "l": "D5", "p": "D#5", ";": "E5",
+}
+OCTAVE_DOWN, OCTAVE_UP = "z", "x"
+
+
+class LiveSynth():
+    # -------------------------------------------------------------------------------------------------
+    # LiveSynth Class
+    #
+    # Polyphonic mixer behind the live-play mode, independent of the audio and keyboard libraries.
+    # Every key gets a pre-rendered attack segment (note_seconds of the instrument), so a key press
+    # only starts reading a ready buffer. press() and release() may be called from any thread: they
+    # append to a lock-free event queue that render(frames) drains at the start of each audio
+    # callback, then it mixes the sounding voices into one small block. Released voices fade out
+    # with the instrument's release time constant.
+    # Key-to-sound latency (press until the first sample reaches the DAC) and the played notes are
+    # recorded; recorded_notes() turns the session into a notes string for MusicManager.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, instrument="piano", volume=0.5, sample_rate=44100, note_seconds=3.0, key_map=KEY_MAP):
+        self.instrument_name = instrument
+        self.instrument = get_instrument(instrument, sample_rate)
+        self.volume = volume
+        self.sample_rate = sample_rate
+        self.note_samples = int(note_seconds * sample_rate)
+        self.key_map = key_map
+        self.note_handle = PitchNote()
+        self.octave = 0
+        self._segments = {}        # midi -> pre-rendered attack segment
+        self._events = deque()     # (kind, key, midi, press time)
+        self._voices = []          # [key, segment, position, release position or None]
+        self._held = {}            # key -> midi, as seen by the input thread
+        release = self.instrument.RELEASE
+        fade_samples = int(math.ceil(release * math.log(1000) * sample_rate))   # down to -60 dB
+        self._fade = (np.exp(-np.arange(fade_samples) / (release * sample_rate))).astype(np.float32)
+        self.latencies = []
+        self.recording = []        # [midi, start seconds, end seconds or None]
+        self._start = None
+        self.prepare()
+
+    def prepare(self):
+        """pre-render the attack segments of every mapped key at the current octave"""
+        for pitch in self.key_map.values():
+            self.segment(self.note_handle.parse_note(pitch) + 12 * self.octave)
+
+    def segment(self, midi):
+        segment = self._segments.get(midi)
+        if segment is None:
+            segment = np.empty(self.note_samples, dtype=np.float32)
+            self.instrument.render_into(segment, self.note_handle.midi_to_freq(midi), self.note_samples, self.volume)
+            # a key held past the segment fades out instead of clicking
+            fade = self._fade[:self.note_samples]
+            segment[-len(fade):] *= fade
+            self._segments[midi] = segment
+        return segment
+
+    """
+    #
+    #    input side (keyboard thread)
+    #
+    """
+
+    def press(self, key, when=None):
+        """start the note of a key; octave keys shift the map. Returns True if a note started."""
+        key = key.lower()
+        if key in (OCTAVE_DOWN, OCTAVE_UP):
+            self.octave = max(-3, min(3, self.octave + (1 if key == OCTAVE_UP else -1)))
+            self.prepare()
+            return False
+        if key not in self.key_map or key in self._held:   # ignore auto-repeat
+            return False
+        midi = self.note_handle.parse_note(self.key_map[key]) + 12 * self.octave
+        self.segment(midi)
+        self._held[key] = midi
+        self._events.append(("press", key, midi, time.perf_counter() if when is None else when))
+        return True
+
+    def release(self, key, when=None):
+        key = key.lower()
+        midi = self._held.pop(key, None)
+        if midi is not None:
+            self._events.append(("release", key, midi, time.perf_counter() if when is None else when))
+
+    """
+    #
+    #    output side (audio callback)
+    #
+    """
+
+    def render(self, frames, output_delay=0.0, now=None):
+        """
+        mix the next block of frames. output_delay is the time until this block is heard
+        (the DAC time of the stream), used for the latency measurements.
+        """
+        now = time.perf_counter() if now is None else now
+        while self._events:
+            kind, key, midi, pressed = self._events.popleft()
+            if self._start is None:
+                self._start = pressed
+            if kind == "press":
+                self._voices.append([key, self._segments[midi], 0, None])
+                self.latencies.append(now - pressed + output_delay)
+                self.recording.append([midi, pressed - self._start, None])
+            else:
+                for voice in self._voices:
+                    if voice[0] == key and voice[3] is None:
+                        voice[3] = voice[2]
+                for note in reversed(self.recording):
+                    if note[0] == midi and note[2] is None:
+                        note[2] = pressed - self._start
+                        break
+
+        block = np.zeros(frames, dtype=np.float32)
+        sounding = []
+        for voice in self._voices:
+            _, segment, position, released = voice
+            n = min(frames, len(segment) - position)
+            if released is not None:
+                offset = position - released
+                n = min(n, len(self._fade) - offset)
+                if n > 0:
+                    block[:n] += segment[position:position + n] * self._fade[offset:offset + n]
+            elif n > 0:
+                block[:n] += segment[position:position + n]
+            voice[2] = position + max(n, 0)
+            if n == frames:
+                sounding.append(voice)
+        self._voices = sounding
+        np.clip(block, -1.0, 1.0, out=block)
+        return block
+
+    @property
+    def active_voices(self):
+        return len(self._voices)
+
+    """
+    #
+    #    session results
+    #
+    """
+
+    def latency_stats(self):
+        """key-to-sound latency in milliseconds: {'count', 'mean', 'p50', 'p99', 'max'}"""
+        if not self.latencies:
+            return {"count": 0, "mean": None, "p50": None, "p99": None, "max": None}
+        ms = np.array(self.latencies) * 1000
+        return {"count": len(ms), "mean": float(ms.mean()), "p50": float(np.percentile(ms, 50)),
+                "p99": float(np.percentile(ms, 99)), "max": float(ms.max())}
+
+    def recorded_notes(self, tempo=120, signature="4/4"):
+        """the played melody (top line, 1/32 note grid) as a notes string at tempo"""
+        midi_file = MidiFile()
+        ppq = midi_file.parser.PPQ
+        ticks_per_second = tempo / 60 * ppq
+        end = max((note[2] for note in self.recording if note[2] is not None), default=0)
+        spans = [(int(round(start * ticks_per_second)), int(round((end if stop is None else stop) * ticks_per_second)),
+                  midi) for midi, start, stop in self.recording]
+        return midi_file.spans_to_notes(spans, ppq, signature)
+
+    def to_music(self, name, tempo=120, signature="4/4", manager=None):
+        """
+        return the recorded session as a music dictionary; with a MusicManager it is also added
+        to the library (call manager.save_data() to keep it)
+        """
+        music_data = {"name": name, "notes": self.recorded_notes(tempo, signature), "signature": signature,
+                      "tempo": tempo, "instruments": [self.instrument_name]}
+        if manager is not None:
+            manager.add_music(manager.create_music(music_data))
+        return music_data
+
+
+class LivePlayer():
+    # -------------------------------------------------------------------------------------------------
+    # LivePlayer Class
+    #
+    # Connects a LiveSynth to the computer keyboard (keyboard hook) and the sound card (PyAudio
+    # callback stream with a small buffer). run() blocks until the quit key is pressed.
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, instrument="piano", volume=0.5, sample_rate=44100, buffer_frames=128, key_map=KEY_MAP):
+        self.synth = LiveSynth(instrument, volume, sample_rate, key_map=key_map)
+        self.sample_rate = sample_rate
+        self.buffer_frames = buffer_frames
+        self.underflows = 0
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        import pyaudio
+        if status & pyaudio.paOutputUnderflow:
+            self.underflows += 1
+        delay = max(0.0, time_info.get("output_buffer_dac_time", 0.0) - time_info.get("current_time", 0.0))
+        block = self.synth.render(frame_count, output_delay=delay)
+        return block.tobytes(), pyaudio.paContinue
+
+    def _on_key(self, event):
+        if event.name is None:
+            return
+        # the hook runs as soon as the key event arrives; timestamps use the synth's own clock
+        if event.event_type == "down":
+            self.synth.press(event.name)
+        else:
+            self.synth.release(event.name)
+
+    def run(self, quit_key="esc"):
+        """play until quit_key; returns the latency statistics"""
+        import pyaudio
+        import keyboard
+        done = threading.Event()
+        p = pyaudio.PyAudio()
+        stream = p.open(format=pyaudio.paFloat32, channels=1, rate=self.sample_rate, output=True,
+                        frames_per_buffer=self.buffer_frames, stream_callback=self._callback)
+        hook = keyboard.hook(self._on_key)
+        keyboard.add_hotkey(quit_key, done.set)
+        try:
+            stream.start_stream()
+            done.wait()
+        finally:
+            keyboard.unhook(hook)
+            keyboard.remove_hotkey(quit_key)
+            stream.stop_stream()
+            stream.close()
+            p.terminate()
+        return dict(self.synth.latency_stats(), underflows=self.underflows)
@@ -0,0 +1,330 @@
+import os
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from ScoreParser import ScoreParser
+from ScoreTransform import ScoreArrays, ScoreTransform
+
+# General MIDI program numbers of the Music instruments; drum is played on channel 10
+GM_PROGRAMS = {
+    "piano": 0, "bell": 14, "organ": 19, "harmonica": 22, "guitar": 24, "bass": 33,
+    "violin": 40, "flute": 73, "angklung": 113, "sine": 80,
+}
+DRUM_CHANNEL = 9
+
+
+class MidiFile():
+    # -------------------------------------------------------------------------------------------------
+    # MidiFile Class
+    #
+    # Pure-Python Standard MIDI File (type 0 and 1) writer and reader for music notes strings.
+    # Writing keeps tempo and time signature as meta events; reading merges all tracks and channels
+    # into one melodic line (the highest sounding note), quantizes it to a 1/32 note grid and
+    # re-bars it with the file's time signature.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, parser=None):
+        self.parser = parser if parser is not None else ScoreParser()
+        self.transform = ScoreTransform(self.parser)
+        self.version = "0.0.1"
+
+    """
+    #
+    #    writing
+    #
+    """
+
+    def write(self, filename, music_notes, tempo=120, signature="4/4", instrument="piano",
+              name=None, midi_type=1, velocity=80):
+        """
+        Write music notes to a Standard MIDI File of type 0 (one track) or 1 (tempo track + note track).
+        """
+        with open(filename, "wb") as file:
+            file.write(self.to_bytes(music_notes, tempo, signature, instrument, name, midi_type, velocity))
+
+    def to_bytes(self, music_notes, tempo=120, signature="4/4", instrument="piano",
+                 name=None, midi_type=1, velocity=80):
+        """return the Standard MIDI File content of music notes as bytes"""
+        if midi_type not in (0, 1):
+            raise ValueError(f"Unsupported MIDI file type {midi_type}")
+        numerator, denominator = map(int, signature.split('/'))
+        if denominator & (denominator - 1):
+            raise ValueError(f"MIDI time signatures need a power-of-two denominator, got {signature}")
+
+        meta = []
+        if name:
+            meta.append((0, b"\xff\x03" + self._vlq(len(name.encode())) + name.encode()))
+        microseconds = round(60_000_000 / tempo)
+        meta.append((0, b"\xff\x51\x03" + microseconds.to_bytes(3, "big")))
+        meta.append((0, bytes([0xff, 0x58, 0x04, numerator, denominator.bit_length() - 1, 24, 8])))
+
+        channel = DRUM_CHANNEL if instrument == "drum" else 0
+        notes = [(0, bytes([0xc0 | channel, GM_PROGRAMS.get(instrument, 0)]))]
+        # end of track at the end of the score keeps trailing rests
+        end_tick = self.parser.parse(music_notes).total_ticks()
+        for start, end, midi in self._note_spans(music_notes):
+            notes.append((start, bytes([0x90 | channel, midi, velocity])))
+            notes.append((end, bytes([0x80 | channel, midi, 0])))
+        # note-offs sort before note-ons at the same tick
+        notes.sort(key=lambda event: (event[0], event[1][0] & 0xf0 == 0x90))
+
+        if midi_type == 0:
+            tracks = [meta + notes]
+        else:
+            tracks = [meta, notes]
+        header = b"MThd" + struct.pack(">IHHH", 6, midi_type, len(tracks), self.parser.PPQ)
+        return header + b"".join(self._track(events, end_tick) for events in tracks)
+
+    def _note_spans(self, music_notes):
+        """yield (start tick, end tick, midi) of every note, with tied notes merged"""
+        tick = 0
+        pending = None
+        for measure in self.parser.parse(music_notes).measures:
+            for note in measure:
+                if pending is not None:
+                    if note['midi'] == pending[2]:
+                        pending[1] += note['ticks']
+                        tick += note['ticks']
+                        if not note['tie']:
+                            yield tuple(pending)
+                            pending = None
+                        continue
+                    yield tuple(pending)
+                    pending = None
+                if note['midi'] is not None:
+                    if note['tie']:
+                        pending = [tick, tick + note['ticks'], note['midi']]
+                    else:
+                        yield (tick, tick + note['ticks'], note['midi'])
+                tick += note['ticks']
+        if pending is not None:
+            yield tuple(pending)
+
+    def _track(self, events, end_tick=0):
+        data = bytearray()
+        last = 0
+        for tick, message in events:
+            data += self._vlq(tick - last) + message
+            last = tick
+        data += self._vlq(max(end_tick - last, 0)) + b"\xff\x2f\x00"
+        return b"MTrk" + struct.pack(">I", len(data)) + bytes(data)
+
+    @staticmethod
+    def _vlq(value):
+        """variable-length quantity encoding"""
+        out = [value & 0x7f]
+        value >>= 7
+        while value:
+            out.append(0x80 | (value & 0x7f))
+            value >>= 7
+        return bytes(reversed(out))
+
+    """
+    #
+    #    reading
+    #
+    """
+
+    def read(self, filename):
+        """
+        Read a Standard MIDI File and return a music dictionary
+        {'name', 'notes', 'signature', 'tempo'} ready for MusicManager.create_music.
+        """
+        with open(filename, "rb") as file:
+            data = file.read()
+        music = self.from_bytes(data)
+        music["name"] = music.get("name") or Path(filename).stem
+        return music
+
+    def from_bytes(self, data):
+        """parse Standard MIDI File bytes into a music dictionary"""
+        if data[:4] != b"MThd":
+            raise ValueError("Not a Standard MIDI File")
+        length, midi_type, n_tracks, division = struct.unpack(">IHHH", data[4:14])
+        if division & 0x8000:
+            raise ValueError("SMPTE time division is not supported")
+        position = 8 + length
+
+        tempo = None
+        signature = None
+        name = None
+        end_tick = 0
+        spans = []
+        for _ in range(n_tracks):
+            if data[position:position + 4] != b"MTrk":
+                raise ValueError(f"Missing track chunk at byte {position}")
+            (track_length,) = struct.unpack(">I", data[position + 4:position + 8])
+            track = data[position + 8:position + 8 + track_length]
+            position += 8 + track_length
+            for kind, tick, values in self._track_events(track):
+                if kind == "tempo" and tempo is None:
+                    tempo = values
+                elif kind == "signature" and signature is None:
+                    signature = values
+                elif kind == "name" and name is None:
+                    name = values
+                elif kind == "note":
+                    spans.append((tick,) + values)
+                elif kind == "end":
+                    end_tick = max(end_tick, tick)
+
+        tempo = round(60_000_000 / tempo) if tempo else 120
+        signature = signature or "4/4"
+        notes = self.spans_to_notes(spans, division, signature, end_tick)
+        return {"name": name, "notes": notes, "signature": signature, "tempo": tempo}
+
+    def _track_events(self, track):
+        """yield ('tempo', tick, microseconds), ('signature', tick, '3/4'), ('name', tick, str),
+        ('note', start tick, (end tick, midi)) and ('end', tick, None) from one track chunk"""
+        tick = 0
+        i = 0
+        status = None
+        sounding = {}   # (channel, midi) -> start tick
+        n = len(track)
+        while i < n:
+            delta = 0
+            while True:
+                byte = track[i]
+                i += 1
+                delta = (delta << 7) | (byte & 0x7f)
+                if not byte & 0x80:
+                    break
+            tick += delta
+            byte = track[i]
+            if byte == 0xff:
+                meta_type = track[i + 1]
+                i += 2
+                length, i = self._read_vlq(track, i)
+                payload = track[i:i + length]
+                i += length
+                if meta_type == 0x51 and length == 3:
+                    yield ("tempo", tick, int.from_bytes(payload, "big"))
+                elif meta_type == 0x58 and length >= 2:
+                    yield ("signature", tick, f"{payload[0]}/{2 ** payload[1]}")
+                elif meta_type == 0x03:
+                    yield ("name", tick, payload.decode("latin-1"))
+                elif meta_type == 0x2f:
+                    yield ("end", tick, None)
+                    break
+                continue
+            if byte in (0xf0, 0xf7):
+                length, i = self._read_vlq(track, i + 1)
+                i += length
+                continue
+            if byte & 0x80:
+                status = byte
+                i += 1
+            elif status is None:
+                raise ValueError("Running status without a previous status byte")
+            kind = status & 0xf0
+            channel = status & 0x0f
+            if kind in (0xc0, 0xd0):
+                i += 1
+                continue
+            data1, data2 = track[i], track[i + 1]
+            i += 2
+            if kind == 0x90 and data2 > 0:
+                sounding.setdefault((channel, data1), tick)
+            elif kind == 0x80 or kind == 0x90:
+                start = sounding.pop((channel, data1), None)
+                if start is not None and tick > start:
+                    yield ("note", start, (tick, data1))
+
+    @staticmethod
+    def _read_vlq(data, i):
+        value = 0
+        while True:
+            byte = data[i]
+            i += 1
+            value = (value << 7) | (byte & 0x7f)
+            if not byte & 0x80:
+                return value, i
+
+    def spans_to_notes(self, spans, division, signature, end_tick=0):
+        """
+        reduce (start, end, midi) note spans, in ticks of `division` per quarter note, to the
+        highest melodic line and format them as a notes string
+        """
+        if not spans:
+            return ""
+        grid = self.parser.PPQ // 8   # 1/32 note
+        end_tick = int(round(end_tick * self.parser.PPQ / division / grid)) * grid
+        spans = np.array(spans, dtype=np.int64)
+        # to our tick resolution, quantized to the grid
+        starts = np.rint(spans[:, 0] * self.parser.PPQ / division / grid).astype(np.int64) * grid
+        ends = np.rint(spans[:, 1] * self.parser.PPQ / division / grid).astype(np.int64) * grid
+        midi = spans[:, 2]
+        # by start, highest pitch first: keep the top note of chords
+        order = np.lexsort((-midi, starts))
+        starts, ends, midi = starts[order], ends[order], midi[order]
+        keep = np.r_[True, starts[1:] != starts[:-1]] & (ends > starts)
+        starts, ends, midi = starts[keep], ends[keep], midi[keep]
+        # a note lasts until the next one starts at the latest
+        ends = np.minimum(ends, np.r_[starts[1:], ends[-1:]])
+
+        # interleave rests for the gaps (including a leading and a trailing one)
+        gaps = starts - np.r_[0, ends[:-1]]
+        rows_midi = np.empty(2 * len(starts) + 1, dtype=np.int16)
+        rows_ticks = np.empty(2 * len(starts) + 1, dtype=np.int64)
+        rows_midi[0:-1:2], rows_ticks[0:-1:2] = -1, gaps
+        rows_midi[1::2], rows_ticks[1::2] = midi, ends - starts
+        rows_midi[-1], rows_ticks[-1] = -1, end_tick - ends[-1]
+        present = rows_ticks > 0
+        rows_midi, rows_ticks = rows_midi[present], rows_ticks[present]
+
+        zeros = np.zeros(len(rows_ticks), dtype=np.int64)
+        arrays = ScoreArrays(rows_midi, rows_ticks, np.zeros(len(rows_ticks), dtype=bool), zeros,
+                             zeros.astype(np.int32), 1)
+        return self.transform.to_notes(self.transform.rebar(arrays, signature))[0]
+
+
+def read_midi(filename):
+    """read one MIDI file into a music dictionary (module-level so process pools can pickle it)"""
+    return MidiFile().read(filename)
+
+
+def import_directory(manager, directory, workers=None, extensions=(".mid", ".midi"), max_pending=None):
+    """
+    Stream every MIDI file of a directory into a MusicManager, reading files in a process pool.
+    Files are listed lazily and at most max_pending are in flight at a time, so arbitrarily large
+    corpora are ingested with bounded memory. Returns (list of added SampleMusic, list of (path, error)).
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 4 * workers
+    paths = (entry.path for entry in os.scandir(directory)
+             if entry.is_file() and entry.name.lower().endswith(extensions))
+    added, failed = [], []
+    pending = deque()
+
+    def collect(path, future):
+        try:
+            music = manager.create_music(future.result())
+        except Exception as e:
+            failed.append((path, e))
+            return
+        manager.add_music(music)
+        added.append(music)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path in paths:
+            pending.append((path, executor.submit(read_midi, path)))
+            if len(pending) >= max_pending:
+                collect(*pending.popleft())
+        while pending:
+            collect(*pending.popleft())
+    return added, failed
+
+
+if __name__ == "__main__":
+    import tempfile
+    midi_file = MidiFile()
+    notes = "rest/4 C4/4 D4/4 E4/4 | F4/2. G4/4~ | G4/2 rest/2"
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "example.mid")
+        midi_file.write(filename, notes, tempo=96, signature="4/4", name="example")
+        print(midi_file.read(filename))
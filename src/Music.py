@@ -1,14 +1,24 @@
 import numpy as np
-import pyaudio
-import soundfile as sf
-import re
-import scipy
 import os
 from PitchNote import PitchNote
+from ScoreParser import ScoreParser
+from ScoreTransform import ScoreTransform
+from MidiFile import MidiFile
+from AudioWriter import AudioWriter
 from fractions import Fraction
-import keyboard
+import itertools
 import threading
-from MusicManager import MusicManager
+from MusicManager import MusicManager, SampleMusic
+from RenderStats import RenderStats, NULL_STATS
+from Instruments import get_instrument, MAX_TAIL_SECONDS
+from RenderContext import RenderContext
+from Timeline import Timeline
+from AudioOutput import PyAudioOutput, frame_bytes, make_output
+import time
+
+# pyaudio, keyboard, scipy and soundfile are imported lazily inside the methods
+# that need them, so that `import Music` stays cheap and headless render workers
+# never load the audio or keyboard stack.
 
 class Music():
     # -------------------------------------------------------------------------------------------------
@@ -24,18 +34,92 @@ class Music():
     # damages, or other liability, whether in an action of contract, tort, or otherwise, arising
     # from, out of, or in connection with the software or the use or other dealings in the software.
     #
-    # Version: 0.1.3
-    # Date: 09 March 2025
+    # Version: 0.1.4
+    # Date: 19 October 2026
     # -------------------------------------------------------------------------------------------------
-    def __init__(self, time_signature="4/4", isPrint = True):        
+    WRITE_BLOCK = 65536     # frames per block handed to the audio file writer
+    PLAY_BLOCK = 4096       # frames per block handed to the playback output; stop is checked between blocks
+    
+    def __init__(self, time_signature="4/4", isPrint = True, headless = False, data_file = "music_data.json",
+                 output = None):
+        '''
+        headless = True never touches pyaudio or keyboard: the object can only render, or play
+        to an output other than the sound card.
+        The music library (data_file) is loaded on first access of `manager`.
+        output selects where play_wave and play_music_notes send the audio: None or "pyaudio" (sound
+        card), "null", "memory", or an AudioOutput such as FileOutput("take.wav").
+        '''
         self.is_print = isPrint
+        self.headless = headless
+        self.output = make_output(output)
         self.set_time_signature(time_signature)
-        self.version = "0.1.3"
+        self.version = "0.1.4"
         
-        self.stop_playback = False
+        self._playbacks = set()     # stop events of the playbacks in progress
+        self._playbacks_lock = threading.Lock()
         self.note_handle = PitchNote()
-        self.manager = MusicManager("music_data.json")
-        self.manager.load_data()
+        self.parser = ScoreParser()
+        self.transform = ScoreTransform(self.parser)
+        self.data_file = data_file
+        self._manager = None
+        self._freq_cache = {}
+        self.stats = NULL_STATS
+    
+    
+    @property
+    def manager(self):
+        '''
+        MusicManager of the music library, loaded lazily on first use
+        '''
+        if self._manager is None:
+            manager = MusicManager(self.data_file)
+            manager.load_data()
+            self._manager = manager
+        return self._manager
+    
+    
+    def enable_stats(self, logger=None):
+        '''
+        turn on instrumentation and return the RenderStats object collecting
+        per-stage timing, counters, samples per instrument, cache use and peak buffers
+        '''
+        if not self.stats.enabled:
+            self.stats = RenderStats(logger)
+        return self.stats
+    
+    
+    def disable_stats(self):
+        '''
+        turn off instrumentation; the methods then record nothing
+        '''
+        self.stats = NULL_STATS
+    
+    
+    def _require_audio(self):
+        '''
+        raise RuntimeError if this object was created in headless mode
+        '''
+        if self.headless:
+            raise RuntimeError("Audio playback is not available in headless mode")
+    
+    
+    def set_output(self, output=None, **kwargs):
+        '''
+        select the playback output (see __init__); kwargs go to the constructor of a named output.
+        returns the AudioOutput that playback will use
+        '''
+        self.output = make_output(output, **kwargs)
+        return self.output
+    
+    
+    def _open_output(self, channels, sample_rate=44100):
+        '''
+        open the selected playback output; the sound card is refused in headless mode
+        '''
+        output = self.output
+        if isinstance(output, PyAudioOutput):
+            self._require_audio()
+        return output.open(sample_rate, channels)
         
         
     def _parse_time_signature(self):
@@ -52,6 +136,15 @@ class Music():
         self.beats_per_measure = self._parse_time_signature()
     
     
+    def context(self, tempo=120, instrument="piano", volume=0.5, sample_rate=44100, release=False, threshold=1e-3,
+                seed=None, precision="float64"):
+        '''
+        RenderContext of this object's time signature with the given settings
+        '''
+        return RenderContext(self.time_signature, tempo, instrument, volume, sample_rate, release, threshold, seed,
+                             precision)
+    
+    
     """
     #
     #    musical pitch note and its frequency
@@ -69,10 +162,17 @@ class Music():
         return the frequency of MIDI note (e.g. note = `C4` or `E#4`, `Ab3` )
         For example, A4 -> 440Hz, etc.
         '''
+        freq = self._freq_cache.get(pitch)
+        if freq is not None:
+            self.stats.cache_hit("pitch")
+            return freq
+        self.stats.cache_miss("pitch")
         if pitch.lower() == "rest":
-            return 0.0
-        midi = self.note_handle.parse_note(pitch)
-        freq = self.note_handle.midi_to_freq(midi)
+            freq = 0.0
+        else:
+            midi = self.note_handle.parse_note(pitch)
+            freq = self.note_handle.midi_to_freq(midi)
+        self._freq_cache[pitch] = freq
         return freq
     
     
@@ -87,19 +187,21 @@ class Music():
         return self.note_handle.midi_to_name(midi)
 
 
-    def canonize_music(self, music_notes, tempo, time_signature):
-        self.set_time_signature(time_signature)       
-        measures = self.parse_music(music_notes)
-        canonize_notes=""
-        for measure in measures:
-            for event in self.notes_to_events([measure], tempo):
-                if event['type'] == 'note':
-                    note=f"{event['pitch']}/{event['note_duration']}"
-                elif event['type'] == 'rest':
-                    note=f"rest/{event['note_duration']}"
-                canonize_notes += note + " "
-            canonize_notes +=  " | \n"
-        return canonize_notes
+    def canonize_music(self, music_notes, tempo=None, time_signature=None):
+        '''
+        return music_notes rewritten with canonical pitch names and durations, one measure per line,
+        with the repeats written out; with a time_signature the notes are re-barred to it, notes
+        crossing a bar line being split and tied (the time signature of this object is left
+        unchanged). tempo does not change the notation and is deprecated.
+        '''
+        if tempo is not None:
+            import warnings
+            warnings.warn("canonize_music(tempo=...) is ignored and deprecated; pass time_signature only",
+                          DeprecationWarning, stacklevel=2)
+        arrays = self.transform.to_arrays([music_notes])
+        if time_signature is not None:
+            arrays = self.transform.rebar(arrays, time_signature)
+        return self.transform.to_notes(arrays, measure_separator=" | \n")[0]
     
     
     """
@@ -110,141 +212,361 @@ class Music():
     #    
     """
 
-    def generate_wave(self, frequency, duration, instrument="piano", volume=0.5):
+    def generate_wave(self, frequency, duration, instrument="piano", volume=0.5, num_samples=None,
+                      precision="float64"):
         """
         Generate a waveform (sine or whichever wave for a musical instrument) for the given
-        frequency, duration, instrument, volume
+        frequency, duration, instrument, volume.
+        num_samples, when given, fixes the exact length and overrides duration.
+        The synthesis itself is done by the instrument objects of Instruments.REGISTRY, computing
+        in float64 or in float32 (precision); the wave is float32 either way.
         """
         sample_rate=44100
-        num_samples = int(sample_rate * duration)
-        if num_samples == 0:
-            return np.zeros(0, dtype=np.float32)
-        
-        t = np.linspace(0, duration, num_samples, endpoint=False)
-        
-        if frequency <= 0:
-            return np.zeros(num_samples, dtype=np.float32)
+        if num_samples is None:
+            num_samples = int(sample_rate * duration)
+        wave = np.zeros(num_samples, dtype=np.float32)
+        get_instrument(instrument, sample_rate, precision).render_into(wave, frequency, num_samples, volume)
+        return wave
 
-        wave = np.zeros(num_samples)
-        
-        # Instrument-specific synthesis
-        if instrument == "guitar":
-            # Physical modeling of plucked string
-            noise = np.random.uniform(-1, 1, int(sample_rate*0.01))  # Initial pluck noise
-            wave = np.append(noise, np.zeros(num_samples - len(noise)))
-            delay = int(sample_rate / frequency)
-            
-            # Karplus-Strong algorithm approximation
-            for i in range(len(noise), num_samples):
-                if i - delay >= 0:
-                    wave[i] = (wave[i - delay] + wave[i - delay - 1]) * 0.49
-            
-            # Resonance filter and envelope
-            b, a = scipy.signal.butter(2, frequency/(sample_rate/2), btype='low')
-            wave = scipy.signal.lfilter(b, a, wave)
-            env = np.exp(-t * 8)
-
-        elif instrument == "organ":
-            # Additive synthesis with multiple harmonics
-            harmonics = [
-                (1, 0.6),  # Fundamental
-                (2, 0.4),  # Octave
-                (3, 0.3),  # Twelfth
-                (4, 0.2)   # Double octave
-            ]
-            for mult, amp in harmonics:
-                wave += amp * np.sin(2 * np.pi * frequency * mult * t)
-            env = np.ones_like(t)
-
-        elif instrument == "drum":
-            # Kick drum synthesis
-            freq_sweep = np.linspace(200, 50, num_samples)  # Pitch drop
-            wave = np.sin(2 * np.pi * freq_sweep * t)
-            wave += 0.5 * np.random.normal(0, 1, num_samples)  # Noise component
-            env = np.exp(-t * 25)  # Fast decay
-
-        elif instrument == "bass":
-            # FM synthesis for electric bass
-            modulator = 0.5 * np.sin(2 * np.pi * 2 * frequency * t)
-            carrier = np.sin(2 * np.pi * frequency * t + modulator)
-            wave = carrier
-            env = np.exp(-t * 4)
-
-        elif instrument == "bell":
-            # Inharmonic partials with exponential decay
-            partials = [(1, 0.6), (2.76, 0.4), (5.43, 0.3), (8.12, 0.2)]
-            for mult, amp in partials:
-                wave += amp * np.sin(2 * np.pi * frequency * mult * t) * np.exp(-t * 0.5)
-            env = np.exp(-t * 8)
-
-        elif instrument == "angklung":
-            # Metallic percussion model
-            main = np.sin(2 * np.pi * frequency * t)
-            noise = np.random.normal(0, 0.3, num_samples)
-            wave = main + noise
-            env = np.exp(-t * 20) * (1 - np.cos(2 * np.pi * t * 10))  # Tremolo effect
-
-        elif instrument == "harmonica":
-            # Reed vibration with breath noise
-            wave = scipy.signal.sawtooth(2 * np.pi * frequency * t * 1.005, 0.5)
-            wave += 0.1 * np.random.normal(0, 1, num_samples) * np.exp(-t * 10)
-            env = 1 - np.exp(-t * 10)  # Slow attack
-        
-        elif instrument == "violin":
-            wave = (2 * (t * frequency % 1) - 1)
-            env = 1 - np.exp(-t * 2)  # Slow attack
-        
-        elif instrument == "flute":
-            # Breath-controlled sine with vibrato
-            vibrato = 0.005 * np.sin(2 * np.pi * 6 * t)  # 6Hz vibrato
-            wave = np.sin(2 * np.pi * frequency * t * (1 + vibrato))
-            breath_noise = 0.05 * np.random.normal(0, 1, num_samples)
-            wave += breath_noise * np.exp(-t * 5)
-            env = 1 - np.exp(-t * 2)  # Slow attack
-
-        elif instrument == "piano":        
-            wave = np.sign(np.sin(2 * np.pi * frequency * t)) # Square wave
-            env = np.exp(-t * 8)
-        
-        else:  # Default to sine wave
-            wave = np.sin(2 * np.pi * frequency * t)
-            env = np.ones_like(t)
 
-        # Apply amplitude envelope and volume
-        wave = np.clip(wave * env * volume, -1.0, 1.0)
-        return wave.astype(np.float32)
+    def play_wave(self, wave, stop=None, start_sample=0, end_sample=None, loops=1):
+        """
+        play a mono (frames,) or interleaved (frames, channels) wave on the selected output.
+        stop is an optional threading.Event that ends this playback when set; stop_music() ends it too.
+        start_sample/end_sample play only that part of the wave, loops times over (0 loops until
+        stopped) without copying it.
+        returns False if the playback was stopped
+        """
+        channels = 1 if wave.ndim == 1 else wave.shape[1]
+        end_sample = len(wave) if end_sample is None else min(end_sample, len(wave))
+        stop = self._start_playback(stop)
+        try:
+            with self._open_output(channels) as output:
+                for _ in (itertools.count() if loops == 0 else range(loops)):
+                    for start in range(start_sample, end_sample, self.PLAY_BLOCK):
+                        if stop.is_set():
+                            return False
+                        output.write(wave[start:min(start + self.PLAY_BLOCK, end_sample)])
+            return True
+        finally:
+            self._end_playback(stop)
 
 
-    def play_wave(self, wave):
-        sample_rate=44100
-        p = pyaudio.PyAudio()
-        stream = p.open(format=pyaudio.paFloat32, channels=1, rate=sample_rate, output=True)
-        stream.write(wave.astype(np.float32).tobytes())
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+    def _start_playback(self, stop=None):
+        """register the stop event of a new playback so stop_music() can reach it"""
+        stop = threading.Event() if stop is None else stop
+        with self._playbacks_lock:
+            self._playbacks.add(stop)
+        return stop
 
 
-    def music_notes_to_waves(self, music_notes, tempo=120, instrument="piano", volume=0.5):
-        """Convert music sequence to audio waves with proper measure validation"""
-        self.beats_per_measure = self._parse_time_signature()
-        full_wave = np.array([], dtype=np.float32)
+    def _end_playback(self, stop):
+        with self._playbacks_lock:
+            self._playbacks.discard(stop)
+
+
+    @property
+    def stop_playback(self):
+        """True while every playback in progress has been asked to stop"""
+        with self._playbacks_lock:
+            return bool(self._playbacks) and all(stop.is_set() for stop in self._playbacks)
+
+
+    @stop_playback.setter
+    def stop_playback(self, value):
+        # kept for old callers: setting it to True stops the playbacks in progress
+        if value:
+            with self._playbacks_lock:
+                for stop in self._playbacks:
+                    stop.set()
+
+
+    _frame_bytes = staticmethod(frame_bytes)
+
+
+    @staticmethod
+    def pan_gains(pan=0.0, channels=2):
+        """
+        constant-power gains of a mono source over `channels` speakers;
+        pan runs from -1 (first channel) through 0 (center) to 1 (last channel), and with more
+        than two channels the source is spread between the two nearest ones
+        """
+        gains = np.zeros(channels, dtype=np.float32)
+        if channels == 1:
+            gains[0] = 1.0
+            return gains
+        position = (min(max(pan, -1.0), 1.0) + 1) / 2 * (channels - 1)
+        left = min(int(position), channels - 2)
+        angle = (position - left) * np.pi / 2
+        gains[left], gains[left + 1] = np.cos(angle), np.sin(angle)
+        return gains
+
+
+    def music_tracks_to_waves(self, tracks, tempo=120, channels=2, release=False):
+        """
+        Render several tracks into one interleaved, C-contiguous (frames, channels) float32 buffer.
+        Each track is a dictionary {'notes', 'instrument', 'volume', 'pan', 'gain'}; pan runs from
+        -1 (left) to 1 (right) and gain scales the track after synthesis. The buffer can be passed
+        as it is to play_wave, save_audio and the effects.
+        """
+        waves = [self.music_notes_to_waves(track['notes'], tempo=tempo, instrument=track.get('instrument', "piano"),
+                                           volume=track.get('volume', 0.5), release=release)
+                 for track in tracks]
+        frames = max((len(wave) for wave in waves), default=0)
+        with self.stats.stage("mix"):
+            mix = np.zeros((frames, channels), dtype=np.float32)
+            for track, wave in zip(tracks, waves):
+                gains = self.pan_gains(track.get('pan', 0.0), channels) * track.get('gain', 1.0)
+                for channel in np.flatnonzero(gains):
+                    mix[:len(wave), channel] += gains[channel] * wave
+        self.stats.peak_buffer("render", mix.nbytes)
+        return mix
+
+
+    def music_notes_to_waves(self, music_notes, tempo=120, instrument="piano", volume=0.5, release=False):
+        """
+        Convert music sequence to audio waves.
+        The output buffer is allocated once and every note is written at its exact sample offset.
+        release=True lets every note ring on with its release tail, overlap-added into the buffer
+        (the wave is then longer than the score by the last tail).
+        Same as render(music_notes, self.context(tempo, instrument, volume, release=release)).
+        """
+        return self.render(music_notes, self.context(tempo, instrument, volume, release=release))
+
+
+    def render(self, music_notes, context=None, **changes):
+        """
+        Render music_notes with the settings of a RenderContext (signature, tempo, instrument,
+        volume, sample rate, release); keyword arguments replace single fields of it, e.g.
+        render(notes, context, tempo=90). The default is RenderContext().
+        Nothing of this object is changed (only the stats, which are locked), so one Music can
+        serve many threads rendering at once and every render equals the serial one.
+        """
+        context = RenderContext() if context is None else context
+        if changes:
+            context = context.replace(**changes)
+        stats = self.stats
+        render_start = time.perf_counter()
         measures = self.parse_music(music_notes)
-        
-        for event in self.notes_to_events(measures, tempo):
-            if event['type'] == 'note':
-                wave = self.generate_wave(
-                    event['frequency'],
-                    event['duration'],
-                    instrument=instrument,
-                    volume=volume
-                )
-            else:
-                wave = np.zeros(int(44100 * event['duration']), dtype=np.float32)
-                
-            full_wave = np.append(full_wave, wave)
+        events = list(self.notes_to_events(measures, context.tempo, context.sample_rate))
+        full_wave = self.render_events(events, instrument=context.instrument, volume=context.volume,
+                                       release=context.release, threshold=context.threshold,
+                                       sample_rate=context.sample_rate, seed=context.seed,
+                                       precision=context.precision)
             
+        if stats.enabled:
+            stats.count("renders")
+            stats.peak_buffer("render", full_wave.nbytes)
+            elapsed = time.perf_counter() - render_start
+            audio_seconds = len(full_wave) / context.sample_rate
+            stats.emit("render", instrument=context.instrument, tempo=context.tempo, samples=len(full_wave),
+                       seconds=elapsed, rtf=audio_seconds / elapsed if elapsed > 0 else None)
+        return full_wave
+    
+    
+    def render_parallel(self, music_notes, context=None, workers=None, **changes):
+        """
+        Render one piece on a pool of worker processes (see ParallelRender.ParallelRenderer);
+        the result equals render(music_notes, context) when the render is deterministic
+        (no noise instrument, or a context seed).
+        """
+        from ParallelRender import ParallelRenderer
+        with ParallelRenderer(workers) as renderer:
+            return renderer.render(music_notes, context, **changes)
+
+
+    def render_length(self, events, instrument="piano", volume=0.5, release=False, threshold=1e-3,
+                      sample_rate=44100):
+        """number of samples render_events gives for the whole of events"""
+        tails = None
+        if release:
+            tails = self._release_tails(events, get_instrument(instrument, sample_rate), volume, threshold)
+        return self._events_end(events, tails)
+
+
+    def timeline(self, music_notes, context=None, **changes):
+        """Timeline (measure and time index) of music_notes rendered with a RenderContext"""
+        context = RenderContext() if context is None else context
+        if changes:
+            context = context.replace(**changes)
+        measures = self.parse_music(music_notes)
+        events = list(self.notes_to_events(measures, context.tempo, context.sample_rate))
+        measure_starts = self.measure_start_samples(measures, context.tempo, context.sample_rate)
+        end = self.render_length(events, context.instrument, context.volume, context.release,
+                                 context.threshold, context.sample_rate)
+        reach = int(MAX_TAIL_SECONDS * context.sample_rate) if context.release else 0
+        return Timeline(events, measure_starts, end, context.sample_rate, reach)
+
+
+    def measure_starts(self, music_notes, context=None, **changes):
+        """start sample of every measure of music_notes under a RenderContext, as rendered by render()"""
+        return self.timeline(music_notes, context, **changes).measure_starts
+
+
+    def render_section(self, music_notes, context=None, start_measure=None, end_measure=None,
+                       start_seconds=None, end_seconds=None, **changes):
+        """
+        Render only a section of music_notes, from a measure (numbered from 0) or a time in
+        seconds up to the start of end_measure or end_seconds (by default the end). Nothing
+        before the section is synthesized, and the result equals the same samples of
+        render(music_notes, context).
+        """
+        context = RenderContext() if context is None else context
+        if changes:
+            context = context.replace(**changes)
+        timeline = self.timeline(music_notes, context)
+        start, end = timeline.section(start_measure, end_measure, start_seconds, end_seconds)
+        return self.render_events(timeline.events_between(start, end), context.instrument, context.volume,
+                                  start, end, context.release, context.threshold, context.sample_rate,
+                                  context.seed, precision=context.precision)
+
+
+    @staticmethod
+    def measure_ranges(measure_starts, end_sample, min_samples):
+        """
+        sample boundaries [0, b1, ..., end_sample] splitting a piece into ranges for
+        render_events; a range ends at the first measure start (measure_start_samples) at
+        least min_samples in
+        """
+        boundaries = [0]
+        for start in measure_starts:
+            if start - boundaries[-1] >= min_samples and start < end_sample:
+                boundaries.append(start)
+        if end_sample > boundaries[-1]:
+            boundaries.append(end_sample)
+        return boundaries
+
+
+    @staticmethod
+    def _release_tails(events, synth, volume, threshold):
+        return [synth.tail_samples(e['end_sample'] - e['start_sample'], volume, threshold)
+                if e['type'] == 'note' else 0 for e in events]
+
+
+    @staticmethod
+    def _events_end(events, tails=None, start_sample=0):
+        if tails is not None:
+            return max([e['end_sample'] + tail for e, tail in zip(events, tails)], default=start_sample)
+        return events[-1]['end_sample'] if events else start_sample
+
+
+    def render_events(self, events, instrument="piano", volume=0.5, start_sample=0, end_sample=None,
+                      release=False, threshold=1e-3, sample_rate=44100, seed=None, out=None, precision="float64"):
+        """
+        Render scheduled events (from notes_to_events) into a new buffer holding the samples
+        [start_sample, end_sample) of the piece; end_sample defaults to the end of the last event.
+        Rendering a piece in consecutive ranges gives the same samples as rendering it at once.
+        With release=True each note also emits its release tail (cut once it falls below
+        threshold), added into the buffer at its exact offset; end_sample then defaults to the
+        end of the longest tail.
+        sample_rate must be the one the events were scheduled with.
+        Without release tails, a measure that repeats an earlier one note for note (same pitches,
+        lengths and offsets) is copied from its first render when the instrument is repeatable;
+        the measures and copies are counted in the stats ("measures", "measures_copied").
+        With a seed, every note of a noise instrument gets the generator seeded by
+        (seed, start_sample of the note), so any range of the piece renders the same samples.
+        out, a float32 buffer of end_sample - start_sample samples (e.g. a slice of shared
+        memory), receives the render instead of a new buffer.
+        precision "float32" has the instruments compute in float32 (see Instruments.Instrument).
+        """
+        stats = self.stats
+        synth = get_instrument(instrument, sample_rate, precision)
+        tails = None
+        if release:
+            tails = self._release_tails(events, synth, volume, threshold)
+        if end_sample is None:
+            end_sample = self._events_end(events, tails, start_sample)
+        if out is None:
+            full_wave = np.zeros(end_sample - start_sample, dtype=np.float32)
+        else:
+            if len(out) != end_sample - start_sample:
+                raise ValueError(f"out holds {len(out)} samples, the range has {end_sample - start_sample}")
+            full_wave = out
+            full_wave[:] = 0
+        if tails is not None:
+            for event, tail in zip(events, tails):
+                start, end = event['start_sample'], event['end_sample']
+                if end + tail <= start_sample or start >= end_sample or event['type'] != 'note':
+                    continue
+                with stats.stage("synthesis:" + instrument):
+                    if start >= start_sample:
+                        n = synth.mix_note(full_wave[start - start_sample:], event['frequency'], end - start,
+                                           volume, threshold, self._note_seed(seed, event))
+                    else:
+                        # a note begun before the range: render it whole and keep the part inside
+                        wave = np.zeros(end - start + tail, dtype=np.float32)
+                        synth.mix_note(wave, event['frequency'], end - start, volume, threshold,
+                                       self._note_seed(seed, event))
+                        n = min(len(wave) - (start_sample - start), len(full_wave))
+                        full_wave[:n] += wave[start_sample - start:start_sample - start + n]
+                stats.add_samples(instrument, n)
+            with stats.stage("mix"):
+                # overlapping tails may add up past full scale
+                np.clip(full_wave, -1.0, 1.0, out=full_wave)
+            return full_wave
+        # a measure played again the same way (same notes at the same sample offsets) is synthesized
+        # once and copied, unless the instrument is not repeatable (noise)
+        copies = {} if synth.repeatable else None      # measure layout -> its first render in full_wave
+        measures = copied = 0
+        for _, group in itertools.groupby(events, key=lambda event: event['measure']):
+            group = list(group)
+            first, last = group[0]['start_sample'], group[-1]['end_sample']
+            if last <= start_sample or first >= end_sample:
+                continue
+            layout = None
+            if copies is not None and first >= start_sample and last <= end_sample:
+                measures += 1
+                layout = tuple((e['frequency'], e['start_sample'] - first, e['end_sample'] - e['start_sample'])
+                               for e in group)
+                source = copies.get(layout)
+                if source is not None:
+                    with stats.stage("copy"):
+                        full_wave[first - start_sample:last - start_sample] = full_wave[source:source + last - first]
+                    stats.add_samples("copy", last - first)
+                    copied += 1
+                    continue
+            for event in group:
+                self._render_event(full_wave, event, synth, instrument, volume, start_sample, end_sample, seed)
+            if layout is not None:
+                copies[layout] = first - start_sample
+        if stats.enabled and measures:
+            stats.count("measures", measures)
+            stats.count("measures_copied", copied)
+            stats.emit("dedup", instrument=instrument, measures=measures, copied=copied, ratio=copied / measures)
         return full_wave
+
+
+    def _render_event(self, full_wave, event, synth, instrument, volume, start_sample, end_sample, seed):
+        """write the part of one event inside [start_sample, end_sample) into full_wave"""
+        stats = self.stats
+        start, end = event['start_sample'], event['end_sample']
+        if end <= start_sample or start >= end_sample:
+            return
+        if event['type'] == 'note':
+            lo, hi = max(start, start_sample), min(end, end_sample)
+            with stats.stage("synthesis:" + instrument):
+                in_place = (lo, hi) == (start, end)
+                if in_place:
+                    # synthesize straight into the output buffer
+                    synth.render_into(full_wave[lo - start_sample:], event['frequency'], end - start, volume,
+                                      self._note_seed(seed, event))
+                else:
+                    # a note cut by the range: render it whole and keep the part inside
+                    wave = np.empty(end - start, dtype=np.float32)
+                    synth.render_into(wave, event['frequency'], end - start, volume,
+                                      self._note_seed(seed, event))
+            if not in_place:
+                with stats.stage("mix"):
+                    full_wave[lo - start_sample:hi - start_sample] = wave[lo - start:hi - start]
+            stats.add_samples(instrument, hi - lo)
+        else:
+            stats.add_samples("rest", end - start)
+
+
+    @staticmethod
+    def _note_seed(seed, event):
+        """seed of one note: the same for the note wherever the piece is cut"""
+        return None if seed is None else (seed, event['start_sample'])
    
     
     """
@@ -260,110 +582,55 @@ class Music():
     #
     """   
     
-    def parse_music(self, music_notes: str):
+    def parse_music(self, music_notes: str, strict: bool = True):
         """
-        Parse standard music notation with measure validation        
+        Parse standard music notation into measures of notes
         
         Convert a music string of the form:
 
-            "C4/4 E4/4 G4/4 C5/4 | F4/4 F4/4 F4/4 F4/4"
+            "C4/4 E4/4 G4/4 C5/4 | F4/4 F4/4 F4/2"
 
-        into a list of measures, each measure is a list of (pitch, duration_in_beats).
-
-        Then check if each measure sums up to the specified beats_per_measure:
-          - If less, add a rest to fill the measure.
-          - If more, either carry over or warn the user.
-
-        This function returns something like:
+        into a list of measures, each measure is a list of note dictionaries with integer
+        durations in ticks (ScoreParser.PPQ ticks per quarter note):
         [
-          [('C4', 1), ('E4', 1), ('G4', 1), ('C5', 1)],    # measure 1
-          [('F4', 1), ('F4', 1), ('F4', 1), ('F4', 1)]     # measure 2
+          [{'pitch': 'C4', 'midi': 60, 'ticks': 960, 'tie': False, 'position': 0}, ...],    # measure 1
+          [{'pitch': 'F4', 'midi': 65, 'ticks': 960, 'tie': False, 'position': 26}, ...]    # measure 2
         ]
-        # Standard format: "C4/4 D4/4 E4/4 | F4/2 G4/2 | r/4 ..."
+        Dotted notes (D4/2.), added durations (E4/2+8), ties (G4/4~ G4/8) and notes without a
+        duration (C4, taking the previous note value) are supported; see ScoreParser.
+        strict=True raises ScoreSyntaxError with the position of an unparseable token,
+        strict=False skips it with a warning.
+        Measures are not validated against the time signature here; see validate_measure.
         """
-        beats_per_measure = self.beats_per_measure # local copy
-        
-        # Normalize whitespace
-        music_notes = music_notes.replace("\n", "").strip()
-        music_notes = re.sub(r'\s+', ' ', music_notes.strip())
-        # Split by measure bars (assumed separated by '|')
-        raw_measures = [m.strip() for m in music_notes.split('|') if m.strip()]
-        # pattern = r'([A-Ga-g][#b]?\d+|r|R|rest)/?((?:\d+/?)+)'
-        pattern = r'([A-Ga-g][#b]?\d+|[Rr]|rest)/([\d\.]+)'
-        
-        measures = []
-        # for measure in music_notes.split('|'):
-        for m_index, measure in enumerate(raw_measures):
-            measure = measure.strip()
-            if not measure:
-                continue
-                
-            total_duration = Fraction(0)
-            notes = []
-            
-            for note in re.findall(pattern, measure):
-                pitch, duration = note
-                pitch = pitch.upper()
-                
-                # Parse duration with support for dotted notes
-                dur_parts = sum(Fraction(s) for s in duration.split('+'))
-                total_duration += 1/dur_parts.numerator
-                
-                notes.append({
-                    'pitch': pitch,
-                    'duration': dur_parts
-                })
-            
-            # # Validate measure duration
-            # # Compare measure length to the expected beats_per_measure
-            # if total_duration < beats_per_measure:
-            #     # Fill in the difference with a rest
-            #     needed = beats_per_measure - total_duration
-            #     # measures.append((f"rest/{1/needed}"))
-            #     notes.append({
-            #         'pitch': "rest",
-            #         'duration': Fraction(1/needed)
-            #     })
-            #     print(f"Warning: measure {m_index+1} has {total_duration} below {beats_per_measure} beats. rest/{int(1/needed)} was added")
-            #     total_duration += needed
-            # elif total_duration > beats_per_measure:
-            #     # For a simple approach, just warn user. 
-            #     # Or do a partial measure or carry remainder to the next measure, etc.
-            #     print(f"Warning: measure {m_index+1} has {total_duration} exceeds {beats_per_measure} beats.")
-            
-            # if total_duration != beats_per_measure:
-            #     raise ValueError(f"Invalid measure: Expected {beats_per_measure}, got {total_duration}")
-            
-            measures.append(notes)
-        return measures
+        with self.stats.stage("parse"):
+            score = self.parser.parse(music_notes, strict=strict)
+        for error in score.errors:
+            print(f"Warning: skipping {error}")
+        return score.measures
     
     
     def validate_measure(self, measure, beats_per_measure, validation_type='strict'):
         """Validate measure duration against beats per measure."""
-        total_duration = Fraction(0)
+        measure_ticks = int(self.parser.WHOLE * beats_per_measure)
+        total_ticks = 0
         for note in measure:
-            total_duration += note['duration']
+            total_ticks += note['ticks']
 
         if validation_type == 'strict':
             # Strict validation, return False if total duration doesn't match beats_per_measure
-            if total_duration != beats_per_measure:
+            if total_ticks != measure_ticks:
                 return False
         elif validation_type == 'solve':
             # Solve validation, adjust to fit
-            if total_duration < beats_per_measure:
-                needed = beats_per_measure - total_duration
-                measure.append({
-                    'pitch': 'rest',
-                    'duration': needed
-                })
-            elif total_duration > beats_per_measure:
+            if total_ticks < measure_ticks:
+                needed = measure_ticks - total_ticks
+                measure.append({'pitch': 'rest', 'midi': None, 'ticks': needed, 'tie': False, 'position': None})
+            elif total_ticks > measure_ticks:
                 # Carry overflow to the next measure
-                overflow = total_duration - beats_per_measure
-                measure.append({
-                    'pitch': 'rest',
-                    'duration': overflow
-                })
-                print(f"Warning: measure exceeds {beats_per_measure} beats. Overflow of {overflow} added as rest.")
+                overflow = total_ticks - measure_ticks
+                measure.append({'pitch': 'rest', 'midi': None, 'ticks': overflow, 'tie': False, 'position': None})
+                print(f"Warning: measure exceeds {beats_per_measure} beats. "
+                      f"Overflow of {self.parser.format_duration(overflow)} added as rest.")
             return True
         return True
 
@@ -379,55 +646,105 @@ class Music():
                                   E.g., "4/4" or "3/4"
 
         Returns:
-        list: A list of measures where each measure is represented as a list of dictionaries with 'pitch' and 'duration'.
+        list: A list of measures where each measure is represented as a list of dictionaries with 'pitch', 'midi', 'ticks' and 'tie'.
               The measures will be adjusted to align with the new time signature's beats per measure.
               
         Example:
         If the original time signature is "4/4" and the new time signature is "3/4", the function will 
-        adjust the measures accordingly, adding rests or modifying notes if needed.
+        adjust the measures accordingly, splitting notes that cross a bar line into tied notes.
         """
-        self.set_time_signature(new_time_signature)
-        measures = self.parse_music(music_notes)
-
-        # Adjust each measure for the new time signature
-        adjusted_measures = []
-        for measure in measures:
-            while True:
-                is_valid = self.validate_measure(measure, self.beats_per_measure, validation_type='solve')
-                if is_valid:
-                    adjusted_measures.append(measure)
-                    break
-                else:
-                    print(f"Invalid measure duration, attempting to fix: {measure}")
-        return adjusted_measures
+        arrays = self.transform.to_arrays([music_notes])
+        return self.transform.to_measures(self.transform.rebar(arrays, new_time_signature))
     
                 
-    def notes_to_events(self, measures, tempo):
-        """Convert to timeline events with proper timing"""
-        quarter_duration = 60.0 / tempo
-        for measure in measures:
+    def notes_to_events(self, measures, tempo, sample_rate=44100):
+        """
+        Convert to timeline events with sample-accurate timing.
+        Each event boundary is computed from its exact cumulative tick position and rounded once,
+        so start_sample/end_sample index straight into a shared output buffer and long pieces
+        (or several tracks) never drift off the beat grid.
+        Tied notes of the same pitch are merged into one event.
+        """
+        to_sample = self._sample_clock(tempo, sample_rate)
+        tick = 0
+        pending = None   # tied note waiting for its continuation: (note, start tick, measure index)
+        for measure_index, measure in enumerate(measures):
             for note in measure:        
-                try:
-                    if note['pitch'] in ('R', 'r', 'rest', 'Rest', 'REST'):
-                        event_type = 'rest'
-                        freq = 0.0
-                    else:
-                        event_type = 'note'
-                        freq = self.pitch_to_freq(note['pitch'])  # From previous implementation
-                    
-                    # Calculate actual duration in seconds
-                    duration = max(float(1 / note['duration'] * 4 * quarter_duration), 0.01)
-                    
-                    yield {
-                        'type': event_type,
-                        'pitch': note['pitch'],
-                        'duration': duration,
-                        'frequency': freq,
-                        'note_duration': note['duration'].numerator
-                    }
-                
-                except Exception as e:
-                    print(f"Skipping invalid note {note}: {str(e)}")
+                if pending is not None:
+                    tied, start_tick, start_measure = pending
+                    if note['midi'] == tied['midi'] and note['midi'] is not None:
+                        merged = dict(tied, ticks=tied['ticks'] + note['ticks'], tie=note['tie'])
+                        tick += note['ticks']
+                        if note['tie']:
+                            pending = (merged, start_tick, start_measure)
+                        else:
+                            yield from self._note_to_event(merged, start_tick, start_measure, to_sample, sample_rate)
+                            pending = None
+                        continue
+                    yield from self._note_to_event(tied, start_tick, start_measure, to_sample, sample_rate)
+                    pending = None
+                if note['tie']:
+                    pending = (note, tick, measure_index)
+                else:
+                    yield from self._note_to_event(note, tick, measure_index, to_sample, sample_rate)
+                tick += note['ticks']
+        if pending is not None:
+            yield from self._note_to_event(*pending, to_sample, sample_rate)
+    
+    
+    def measure_start_samples(self, measures, tempo, sample_rate=44100):
+        """
+        start sample of every measure, from the tick lengths of the measures and rounded like
+        notes_to_events (a tie across a bar line gives one event, but still two measures)
+        """
+        to_sample = self._sample_clock(tempo, sample_rate)
+        starts = []
+        tick = 0
+        for measure in measures:
+            starts.append(to_sample(tick))
+            tick += sum(note['ticks'] for note in measure)
+        return starts
+    
+    
+    def _sample_clock(self, tempo, sample_rate):
+        """function rounding a tick position to its sample at tempo"""
+        tempo = Fraction(tempo)
+        # samples = ticks * sample_rate * 60 / (tempo * PPQ), as an exact integer ratio
+        numerator = sample_rate * 60 * tempo.denominator
+        denominator = tempo.numerator * self.parser.PPQ
+        def to_sample(tick):
+            return (2 * tick * numerator + denominator) // (2 * denominator)
+        return to_sample
+    
+    
+    def _note_to_event(self, note, start_tick, measure_index, to_sample, sample_rate):
+        """yield the timeline event of one parsed note, or nothing if it is invalid"""
+        try:
+            if note['midi'] is None:
+                event_type = 'rest'
+                freq = 0.0
+            else:
+                event_type = 'note'
+                with self.stats.stage("pitch"):
+                    freq = self.pitch_to_freq(note['pitch'])
+            
+            start_sample = to_sample(start_tick)
+            end_sample = to_sample(start_tick + note['ticks'])
+            yield {
+                'type': event_type,
+                'pitch': note['pitch'],
+                'duration': (end_sample - start_sample) / sample_rate,
+                'frequency': freq,
+                'ticks': note['ticks'],
+                'note_duration': self.parser.format_duration(note['ticks']),
+                'measure': measure_index,
+                'start_tick': start_tick,
+                'start_sample': start_sample,
+                'end_sample': end_sample
+            }
+        
+        except Exception as e:
+            print(f"Skipping invalid note {note}: {str(e)}")
     
     
     """
@@ -442,7 +759,6 @@ class Music():
             name = music.name
             music_notes = music.notes
             tempo = music.tempo
-            signature = music.signature
             
             if not hasattr(music, "instruments") or music.instruments == "":
                 instrument = "organ"  # default instrument if it doesn't exist or is empty
@@ -455,7 +771,6 @@ class Music():
                 volume = music.volume
 
             print(f"playing {name}")
-            self.set_time_signature(signature)        
             self.play_music_notes(music_notes, tempo=tempo, instrument=instrument, volume=volume)
         
         
@@ -519,7 +834,10 @@ class Music():
         #     print(f"Playback error: {e}")
         #     return False  
     
-    def play_music_notes(self, music_notes: str, tempo: int = 128, instrument: str = "organ", volume: float = 0.5):
+    def play_music_notes(self, music_notes: str, tempo: int = 128, instrument: str = "organ", volume: float = 0.5,
+                         channels: int = 1, pan: float = 0.0, stop: threading.Event = None,
+                         start_measure: int = None, end_measure: int = None, start_seconds: float = None,
+                         end_seconds: float = None, loops: int = 1):
         """
         Play the given music with the specified tempo, instrument, and volume.
 
@@ -528,58 +846,114 @@ class Music():
             tempo (int): Tempo in beats per minute. Default is 128 BPM.
             instrument (str): Instrument to simulate during playback. Default is "organ".
             volume (float): Volume level (0.0 to 1.0). Default is 0.5.
+            channels (int): Number of output channels. Default is 1 (mono).
+            pan (float): Position from -1 (left) to 1 (right) when channels > 1. Default is 0 (center).
+            stop (threading.Event): Optional event that ends this playback when set.
+            start_measure, end_measure (int): Play only the measures [start_measure, end_measure),
+                numbered from 0. Default is the whole piece.
+            start_seconds, end_seconds (float): The same section given in seconds instead.
+            loops (int): Times the section is played; 0 repeats it until stopped. Default is 1.
 
         Returns:
             bool: True if playback was successful, False if interrupted or failed.
+        
+        The audio goes to the output selected on this object (the sound card by default).
+        Esc stops playback on the sound card; stop_music() stops it on any output.
+        Playback seeks through the Timeline of the piece, so nothing before the section is
+        synthesized. A single pass is synthesized note by note as it plays; a looped section is
+        rendered once and replayed.
         """
-        # Flag to control playback interruption
-        self.stop_playback = False
+        output = self.output
+        if isinstance(output, PyAudioOutput):
+            self._require_audio()
+        # the keyboard is only watched while a person listens to the sound card
+        keyboard = None
+        if output.realtime and not self.headless:
+            import keyboard
+        # Event to control playback interruption, private to this call
+        stop = self._start_playback(stop)
         # Flag to track playback success
         playback_successful = True
-        self.beats_per_measure = self._parse_time_signature()
+        stats = self.stats
+        gains = self.pan_gains(pan, channels)
+        synth_seconds = 0.0
+        def event_waves(events, section_start, section_end):
+            # the wave of each event in turn, cut to the section at its ends
+            nonlocal synth_seconds
+            for event in events:
+                if event['type'] == 'note':
+                    # Handle note playback
+                    if self.is_print:
+                        os.system('cls' if os.name == 'nt' else 'clear')
+                        print(f"Playing {instrument}: {event['pitch']}/{event['note_duration']} "
+                            f"({event['frequency']:.2f} Hz for {event['duration']:.2f}s)")
+                    
+                    t = time.perf_counter()
+                    wave = self.generate_wave(
+                        event['frequency'],
+                        event['duration'],
+                        instrument=instrument,
+                        volume=volume,
+                        num_samples=event['end_sample'] - event['start_sample']
+                    )
+                    synth_seconds += time.perf_counter() - t
+                    stats.add_samples(instrument, len(wave))
+                    
+                else:
+                    # Handle silence between notes
+                    wave = np.zeros(event['end_sample'] - event['start_sample'], dtype=np.float32)
+                yield wave[max(section_start - event['start_sample'], 0):section_end - event['start_sample']]
+        
         def playback_thread():
             nonlocal playback_successful  # Allows modifying the outer variable
+            # playback is late (an underrun) whenever the output's clock passes the audio already queued
+            audio_seconds = 0.0
+            underruns = 0
+            start = None
             try:
-                p = pyaudio.PyAudio()
-                stream = p.open(format=pyaudio.paFloat32,
-                                channels=1,
-                                rate=44100,
-                                output=True)
+                output.open(44100, channels)
             
-                measures = self.parse_music(music_notes)
-                for event in self.notes_to_events(measures, tempo):
-                    if keyboard.is_pressed("esc"):
+                timeline = self.timeline(music_notes, tempo=tempo, instrument=instrument, volume=volume)
+                section_start, section_end = timeline.section(start_measure, end_measure, start_seconds, end_seconds)
+                events = timeline.events_between(section_start, section_end)
+                if loops == 1:
+                    waves = event_waves(events, section_start, section_end)
+                else:
+                    section = self.render_events(events, instrument, volume, section_start, section_end)
+                    waves = itertools.repeat(section) if loops == 0 else itertools.repeat(section, loops)
+                for wave in waves:
+                    if keyboard is not None and keyboard.is_pressed("esc"):
                         print("ESC pressed! Stopping playback...")
-                        self.stop_playback=True
+                        stop.set()
                         
-                    if self.stop_playback:  # Check if the user requested to stop playback
+                    if stop.is_set():  # Check if the user requested to stop playback
                         break
-                    if event['type'] == 'note':
-                        # Handle note playback
-                        if self.is_print:
-                            os.system('cls' if os.name == 'nt' else 'clear')
-                            print(f"Playing {instrument}: {event['pitch']}/{event['note_duration']} "
-                                f"({event['frequency']:.2f} Hz for {event['duration']:.2f}s)")
-                        
-                        wave = self.generate_wave(
-                            event['frequency'],
-                            event['duration'],
-                            instrument=instrument,
-                            volume=volume
-                        )
-                        stream.write(wave.tobytes())
-                        
-                    elif event['type'] == 'rest':
-                        # Handle silence between notes
-                        silence = np.zeros(int(44100 * event['duration']), dtype=np.float32)
-                        stream.write(silence.tobytes())
+                    
+                    now = time.perf_counter()
+                    if start is None:
+                        start = now
+                    elif output.speed and (now - start) * output.speed > audio_seconds:
+                        underruns += 1
+                    if channels > 1:
+                        wave = np.outer(wave, gains)
+                    for block_start in range(0, len(wave), self.PLAY_BLOCK):
+                        if stop.is_set():
+                            break
+                        output.write(wave[block_start:block_start + self.PLAY_BLOCK])
+                        audio_seconds += min(self.PLAY_BLOCK, len(wave) - block_start) / 44100
             
-                stream.stop_stream()
-                stream.close()
-                p.terminate()
+                if stats.enabled:
+                    stats.add_time("playback:synthesis", synth_seconds)
+                    stats.count("playback_underruns", underruns)
+                    stats.emit("playback", instrument=instrument, tempo=tempo, audio_seconds=audio_seconds,
+                               synthesis_seconds=synth_seconds, underruns=underruns,
+                               rtf=audio_seconds / synth_seconds if synth_seconds > 0 else None)
             except Exception as e:
                 print(f"Playback error: {e}")
                 playback_successful = False
+            finally:
+                output.close()
+                self._end_playback(stop)
                 
         # Run playback in a separate thread to avoid blocking the main thread
         thread = threading.Thread(target=playback_thread)
@@ -587,9 +961,141 @@ class Music():
         thread.join()  # Wait for the thread to finish
         return playback_successful
     
+    def live_play(self, instrument="piano", volume=0.5, buffer_frames=128, record_name=None, tempo=120):
+        """
+        Play the selected instrument from the computer keyboard until Esc is pressed
+        (keys a w s e d f t g y h u j k o l p ; from C4 upward, z / x shift an octave).
+        Notes are pre-rendered per key and mixed in a PyAudio callback of buffer_frames frames.
+        Returns the LiveSynth of the session: latency_stats() gives the key-to-sound latency and
+        recorded_notes(tempo) the melody. With record_name the session is also added to the
+        music library under that name.
+        """
+        self._require_audio()
+        from LivePlay import LivePlayer
+        player = LivePlayer(instrument, volume, buffer_frames=buffer_frames)
+        if self.is_print:
+            print(f"Live play with {instrument}; press Esc to stop")
+        latency = player.run(quit_key="esc")
+        if self.is_print:
+            print(f"{latency['count']} notes, key-to-sound latency p50 {latency['p50']} ms, "
+                  f"p99 {latency['p99']} ms, {latency['underflows']} underflows")
+        if record_name and player.synth.recording:
+            player.synth.to_music(record_name, tempo, self.time_signature, manager=self.manager)
+        return player.synth
+
+
     def stop_music(self):
-        # Simulate pressing the Esc key
-        keyboard.send('esc')
+        '''
+        stop every playback in progress on this object
+        '''
+        self.stop_playback = True
+        if not self.headless and self.output.realtime:
+            # Simulate pressing the Esc key
+            import keyboard
+            keyboard.send('esc')
+
+
+    """
+    #
+    #    asyncio API
+    #       the CPU work and the blocking output writes run in an executor (the loop's default
+    #       thread pool unless one is given), never on the event loop itself
+    #
+    """
+
+    async def render_async(self, music_notes, context=None, executor=None, **changes):
+        """
+        await the render(music_notes, context, **changes) of music_notes, computed in the executor
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, lambda: self.render(music_notes, context, **changes))
+
+
+    async def render_blocks(self, music_notes, context=None, block_seconds=1.0, executor=None, **changes):
+        """
+        async iterator over the wave of music_notes in consecutive blocks, cut at measure starts
+        once a block holds block_seconds; together they equal render(music_notes, context).
+        The next block is rendered in the executor while the current one is being consumed.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        context = RenderContext() if context is None else context
+        if changes:
+            context = context.replace(**changes)
+
+        def schedule():
+            timeline = self.timeline(music_notes, context)
+            return timeline, self.measure_ranges(timeline.measure_starts, timeline.end_sample,
+                                                 int(block_seconds * context.sample_rate))
+
+        def render_range(start, end):
+            return self.render_events(timeline.events_between(start, end), context.instrument, context.volume,
+                                      start, end, context.release, context.threshold, context.sample_rate,
+                                      context.seed, precision=context.precision)
+
+        timeline, boundaries = await loop.run_in_executor(executor, schedule)
+        ranges = list(zip(boundaries, boundaries[1:]))
+        pending = None
+        try:
+            for index, (start, end) in enumerate(ranges):
+                if pending is None:
+                    pending = loop.run_in_executor(executor, render_range, start, end)
+                wave = await pending
+                pending = None
+                if index + 1 < len(ranges):
+                    pending = loop.run_in_executor(executor, render_range, *ranges[index + 1])
+                yield wave
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+
+    async def play_async(self, music_notes, context=None, channels=1, pan=0.0, output=None, stop=None,
+                         executor=None, **changes):
+        """
+        Play music_notes without blocking the event loop. Blocks are rendered (render_blocks) and
+        written to the output in the executor, so many plays can run at once without a thread
+        each; give every concurrent play its own output, as output overrides the one selected
+        on this object. Cancelling the task stops the playback within one PLAY_BLOCK, and so do
+        stop_music() and the stop event (threading.Event).
+        Returns True if the music was played to the end, False if it was stopped.
+        Outputs that block in write (the sound card, a paced NullOutput) hold an executor
+        thread while they wait, so many of them need an executor with as many threads.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        output = self.output if output is None else make_output(output)
+        if isinstance(output, PyAudioOutput):
+            self._require_audio()
+        context = RenderContext() if context is None else context
+        if changes:
+            context = context.replace(**changes)
+        gains = self.pan_gains(pan, channels)
+        stop = self._start_playback(stop)
+        blocks = self.render_blocks(music_notes, context, executor=executor)
+        writing = None
+        try:
+            await loop.run_in_executor(executor, output.open, context.sample_rate, channels)
+            async for wave in blocks:
+                if channels > 1:
+                    wave = np.outer(wave, gains)
+                for start in range(0, len(wave), self.PLAY_BLOCK):
+                    if stop.is_set():
+                        return False
+                    writing = loop.run_in_executor(executor, output.write, wave[start:start + self.PLAY_BLOCK])
+                    # shielded, so a cancelled task leaves the write running until it is awaited below
+                    await asyncio.shield(writing)
+            return True
+        finally:
+            try:
+                await blocks.aclose()
+                if writing is not None:
+                    # the stream must not be closed under a write still running in the executor
+                    await asyncio.wait([writing])
+                await loop.run_in_executor(executor, output.close)
+            finally:
+                self._end_playback(stop)
 
 
     """
@@ -598,17 +1104,59 @@ class Music():
     #    
     """
 
-    def save_audio(self, filename, wave, sample_rate=44100):
-        """Save waveform to WAV file with proper normalization"""
-        # Normalize to prevent clipping
-        peak = np.max(np.abs(wave))
-        if peak > 1.0:
-            wave /= peak * 1.05
-            
-        # Convert to proper WAV format
-        wave_int16 = np.int16(wave * 32767)
-        
-        sf.write(filename, wave_int16, sample_rate, subtype='PCM_16')
+    def save_midi(self, filename, music_notes, tempo=120, signature=None, instrument="piano", midi_type=1):
+        """
+        Save music notes as a Standard MIDI File (type 0 or 1) with tempo and time signature,
+        a cheap alternative to rendering audio
+        """
+        with self.stats.stage("write"):
+            MidiFile(self.parser).write(filename, music_notes, tempo=tempo,
+                                        signature=signature or self.time_signature,
+                                        instrument=instrument, midi_type=midi_type)
+    
+    
+    def load_midi(self, filename):
+        """
+        Read a Standard MIDI File into a SampleMusic object (one melodic line, see MidiFile)
+        """
+        with self.stats.stage("parse"):
+            return SampleMusic(**MidiFile(self.parser).read(filename))
+    
+    
+    def load_audio(self, filename, tempo=120, signature="4/4", block_seconds=60.0):
+        """
+        Transcribe a monophonic audio file (WAV, FLAC, OGG) into a SampleMusic object whose notes
+        are quantized to the 1/32 note grid at tempo (see Transcriber). The file is streamed
+        block_seconds at a time.
+        """
+        from Transcriber import Transcriber
+        with self.stats.stage("transcribe"):
+            notes = Transcriber(tempo, signature).transcribe_file(filename, block_seconds)
+        name = os.path.splitext(os.path.basename(filename))[0]
+        return SampleMusic(name=name, notes=notes, signature=signature, tempo=tempo)
+    
+    
+    def save_audio(self, filename, wave, sample_rate=44100, format=None, background=False):
+        """
+        Save waveform to a WAV, FLAC or OGG/Vorbis file with proper normalization.
+        The format follows the file extension unless format ("wav", "flac", "ogg") is given.
+        Encoding runs on an AudioWriter thread; with background=True the writer is returned at once,
+        so the next piece can be rendered while this one is compressed (do not modify wave meanwhile),
+        and its close() returns the statistics. Otherwise the statistics are returned when done:
+        {'file_bytes', 'compression_ratio', 'encode_seconds', 'throughput', ...}
+        """
+        with self.stats.stage("write"):
+            # Normalize to prevent clipping
+            peak = np.max(np.abs(wave)) if len(wave) else 0.0
+            if peak > 1.0:
+                wave = wave / (peak * 1.05)
+            channels = 1 if wave.ndim == 1 else wave.shape[1]
+            writer = AudioWriter(filename, sample_rate=sample_rate, channels=channels, format=format)
+            for start in range(0, len(wave), self.WRITE_BLOCK):
+                writer.write(wave[start:start + self.WRITE_BLOCK])
+            if background:
+                return writer
+            return writer.close()
 
 
     """
@@ -620,26 +1168,31 @@ class Music():
     """
     
     # Echo effect
+    # The effects work along the time axis, so a mono (frames,) signal and an interleaved
+    # (frames, channels) buffer are processed alike, every channel within the same buffer.
     def apply_echo(self, signal, sample_rate=44100, delay=0.15, decay=0.5):
         """Applies echo effect by delaying and reducing amplitude."""
-        delay_samples = int(sample_rate * delay)
-        echo_signal = np.zeros(len(signal) + delay_samples)
-        echo_signal[:len(signal)] = signal
-        echo_signal[delay_samples:] += decay * signal
-        return echo_signal[:len(signal)]
+        with self.stats.stage("effect:echo"):
+            delay_samples = int(sample_rate * delay)
+            echo_signal = np.array(signal, dtype=np.float64)
+            if 0 < delay_samples < len(signal):
+                echo_signal[delay_samples:] += decay * signal[:len(signal) - delay_samples]
+            return echo_signal
 
     # Reverb effect (simplified)
     def apply_reverb(self, signal, sample_rate=44100, decay=0.4):
         """Applies a reverb effect by simulating reflections."""
-        reverb_signal = np.copy(signal)
-        for i in range(1, 5):
-            reverb_signal += decay * np.roll(signal, i * 1000)
-        return reverb_signal / 2
+        with self.stats.stage("effect:reverb"):
+            reverb_signal = np.copy(signal)
+            for i in range(1, 5):
+                reverb_signal += decay * np.roll(signal, i * 1000, axis=0)
+            return reverb_signal / 2
 
     # Distortion effect
     def apply_distortion(self, signal, gain=5.0):
         """Applies simple distortion by clipping the waveform."""
-        return np.clip(signal * gain, -1.0, 1.0)
+        with self.stats.stage("effect:distortion"):
+            return np.clip(signal * gain, -1.0, 1.0)
     
 if __name__ == "__main__":
     muz = Music()
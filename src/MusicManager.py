@@ -1,4 +1,6 @@
+import hashlib
 import json
+import threading
 from pathlib import Path
 
 class SampleMusic():
@@ -35,6 +37,66 @@ class SampleMusic():
         return music_data
 
 
+class MusicLibrary():
+    # -------------------------------------------------------------------------------------------------
+    # MusicLibrary Class
+    #
+    # Process-wide, read-only view of a parsed music library file. Each file is parsed once and the
+    # same view is handed to every caller until the file changes (mtime/size, confirmed by hash).
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    _cache = {}
+    _lock = threading.Lock()
+
+    def __init__(self, data_file, music_objects, stamp, digest):
+        self.data_file = data_file
+        self.music_objects = tuple(music_objects)
+        self._by_name = {}
+        for music in self.music_objects:
+            self._by_name.setdefault(music.name, music)
+        self._stamp = stamp
+        self._digest = digest
+
+    @classmethod
+    def load(cls, data_file):
+        """
+        return the shared MusicLibrary of data_file, parsing it only when it is new or has changed
+        """
+        path = Path(data_file).resolve()
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with cls._lock:
+            library = cls._cache.get(path)
+            if library is not None and library._stamp == stamp:
+                return library
+            raw = path.read_bytes()
+            digest = hashlib.sha1(raw).hexdigest()
+            if library is not None and library._digest == digest:
+                # touched but not modified
+                library._stamp = stamp
+                return library
+            music_objects = [SampleMusic(**music_data) for music_data in json.loads(raw)]
+            library = cls(path, music_objects, stamp, digest)
+            cls._cache[path] = library
+            return library
+
+    @classmethod
+    def clear_cache(cls):
+        """Forget every shared library, e.g. after editing files in place within the same second."""
+        with cls._lock:
+            cls._cache.clear()
+
+    def get_all_music(self):
+        """Retrieve all SampleMusic objects."""
+        return self.music_objects
+
+    def get_music_by_name(self, name):
+        """Retrieve a SampleMusic object by its name."""
+        return self._by_name.get(name)
+
+
 class MusicManager:
     # -------------------------------------------------------------------------------------------------
     # MusicManager Class
@@ -50,8 +112,15 @@ class MusicManager:
         self.data_file = script_dir / data_file
         self.music_objects = []
         
-    def load_data(self):
-        """Load JSON data and create music objects."""
+    def load_data(self, shared=True):
+        """
+        Load JSON data and create music objects.
+        With shared=True the file is parsed once per process through MusicLibrary and the
+        SampleMusic objects are shared (treat them as read-only); shared=False parses a private copy.
+        """
+        if shared:
+            self.music_objects.extend(MusicLibrary.load(self.data_file).get_all_music())
+            return
         with open(self.data_file, "r") as file:
             music_data_list = json.load(file)
         for music_data in music_data_list:
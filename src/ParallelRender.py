@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from RenderContext import RenderContext
+
+
+"""
+#
+#    worker side: runs in the process pool
+#
+"""
+
+_worker_music = None
+
+
+def _music():
+    """one headless Music per worker process"""
+    global _worker_music
+    if _worker_music is None:
+        from Music import Music
+        _worker_music = Music(isPrint=False, headless=True)
+    return _worker_music
+
+
+def warm_up():
+    """construct the worker Music so the first render does not pay for it"""
+    return _music().version
+
+
+def render_range(memory_name, n_samples, events, context, start_sample, end_sample):
+    """render samples [start_sample, end_sample) of a piece straight into the shared output buffer"""
+    memory = shared_memory.SharedMemory(name=memory_name)
+    try:
+        wave = np.ndarray(n_samples, dtype=np.float32, buffer=memory.buf)
+        _music().render_events(events, instrument=context.instrument, volume=context.volume,
+                               start_sample=start_sample, end_sample=end_sample, release=context.release,
+                               threshold=context.threshold, sample_rate=context.sample_rate, seed=context.seed,
+                               out=wave[start_sample:end_sample], precision=context.precision)
+        del wave   # the view must go before the memory is closed
+    finally:
+        memory.close()
+    return end_sample - start_sample
+
+
+class ParallelRenderer():
+    # -------------------------------------------------------------------------------------------------
+    # ParallelRenderer Class
+    #
+    # Renders one long piece on a pool of worker processes. The events are scheduled once, the
+    # timeline is cut at measure starts into about CHUNKS_PER_WORKER ranges per worker, and every
+    # worker renders its ranges (Music.render_events with start_sample/end_sample) directly into
+    # one multiprocessing.shared_memory output buffer. Range renders are exact and noise notes
+    # are seeded per note (RenderContext.seed), so the result is bit-identical to
+    # Music.render(notes, context) whenever that render is deterministic.
+    # Use as a context manager, or call start() and close(); the pool is kept between renders.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    CHUNKS_PER_WORKER = 4       # more ranges than workers evens out ranges of unequal cost
+    MIN_CHUNK_SECONDS = 2.0     # shorter pieces are not worth splitting that finely
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        self._music = None
+
+    @property
+    def music(self):
+        """the Music of this process, used to parse and schedule"""
+        if self._music is None:
+            from Music import Music
+            self._music = Music(isPrint=False, headless=True)
+        return self._music
+
+    def start(self):
+        if self.pool is None:
+            if os.name == "posix":
+                # workers must share the resource tracker of this process, or the first one to
+                # exit would unlink the output buffer it attached to
+                from multiprocessing import resource_tracker
+                resource_tracker.ensure_running()
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            for future in [self.pool.submit(warm_up) for _ in range(self.workers)]:
+                future.result()
+        return self
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def plan(self, measure_starts, n_samples, sample_rate=44100):
+        """sample boundaries [0, b1, ..., n_samples] of the ranges, cut at measure starts"""
+        parts = self.workers * self.CHUNKS_PER_WORKER
+        target = max(n_samples / parts, self.MIN_CHUNK_SECONDS * sample_rate)
+        return self.music.measure_ranges(measure_starts, n_samples, target)
+
+    def render(self, music_notes, context=None, **changes):
+        """
+        render music_notes with a RenderContext (keyword arguments replace its fields, as in
+        Music.render) and return the float32 wave
+        """
+        context = RenderContext() if context is None else context
+        if changes:
+            context = context.replace(**changes)
+        muz = self.music
+        timeline = muz.timeline(music_notes, context)
+        n_samples = timeline.end_sample
+        boundaries = self.plan(timeline.measure_starts, n_samples, context.sample_rate)
+        if self.workers == 1 or len(boundaries) <= 2:
+            return muz.render(music_notes, context)
+        self.start()
+
+        memory = shared_memory.SharedMemory(create=True, size=max(1, n_samples) * 4)
+        try:
+            futures = []
+            for start, end in zip(boundaries, boundaries[1:]):
+                # only the events sounding in the range (their note or their release tail)
+                futures.append(self.pool.submit(render_range, memory.name, n_samples,
+                                                timeline.events_between(start, end), context, start, end))
+            for future in futures:
+                future.result()
+            wave = np.ndarray(n_samples, dtype=np.float32, buffer=memory.buf).copy()
+        finally:
+            memory.close()
+            memory.unlink()
+        return wave
@@ -1,4 +1,8 @@
 import re
+
+import numpy as np
+
+
 class PitchNote:
     # -------------------------------------------------------------------------------------------------
     # PitchNote Class
@@ -111,6 +115,14 @@ class PitchNote:
         return self.A4_freq * (2.0 ** ((midi_num - self.A4_midi) / 12.0))
 
 
+    def freq_to_midi(self, freq):
+        """
+        Quantize a frequency in Hz, or an array of them, to the nearest MIDI note number;
+        the inverse of midi_to_freq.
+        """
+        return np.rint(self.A4_midi + 12.0 * np.log2(np.asarray(freq) / self.A4_freq)).astype(np.int16)
+
+
     def midi_to_name(self, midi_num: int) -> str:
         """
         Convert a MIDI note number back to a canonical name (e.g. "C#4"),
@@ -0,0 +1,57 @@
+from collections import namedtuple
+from fractions import Fraction
+
+from Instruments import PRECISIONS
+
+
+_RenderContext = namedtuple("_RenderContext",
+                            "signature tempo instrument volume sample_rate release threshold seed precision")
+
+
+class RenderContext(_RenderContext):
+    # -------------------------------------------------------------------------------------------------
+    # RenderContext Class
+    #
+    # Immutable settings of one render: time signature, tempo, instrument, volume, sample rate, the
+    # release-tail options, the seed of the noise instruments (None draws from the global
+    # np.random; an int gives every note its own generator seeded by (seed, note start sample), so
+    # the output is reproducible however the piece is split) and the precision the instruments
+    # compute in ("float64", or "float32", see Instruments.Instrument). Music.render(notes, context)
+    # reads everything it needs from the context and nothing from the Music object, so one Music (or
+    # one context) can be shared by any number of threads rendering at the same time.
+    # replace(**changes) gives a modified copy.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    __slots__ = ()
+
+    def __new__(cls, signature="4/4", tempo=120, instrument="piano", volume=0.5, sample_rate=44100,
+                release=False, threshold=1e-3, seed=None, precision="float64"):
+        try:
+            numerator, denominator = map(int, str(signature).split('/'))
+        except ValueError:
+            raise ValueError(f"Invalid time signature {signature!r}; use numerator/denominator, e.g. 3/4")
+        if numerator <= 0 or denominator <= 0:
+            raise ValueError(f"Invalid time signature {signature!r}")
+        if tempo <= 0:
+            raise ValueError(f"Tempo must be positive, got {tempo}")
+        if sample_rate <= 0:
+            raise ValueError(f"Sample rate must be positive, got {sample_rate}")
+        if seed is not None and (int(seed) != seed or seed < 0):
+            raise ValueError(f"Seed must be None or a non-negative integer, got {seed!r}")
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; use one of {', '.join(PRECISIONS)}")
+        return super().__new__(cls, f"{numerator}/{denominator}", tempo, str(instrument).lower(), volume,
+                               int(sample_rate), bool(release), threshold, None if seed is None else int(seed),
+                               precision)
+
+    @property
+    def beats_per_measure(self):
+        """length of a measure in whole notes, e.g. Fraction(3, 4) for 3/4"""
+        numerator, denominator = map(int, self.signature.split('/'))
+        return Fraction(numerator, denominator)
+
+    def replace(self, **changes):
+        """a copy with some fields changed (validated like the constructor)"""
+        return RenderContext(**dict(self._asdict(), **changes))
@@ -0,0 +1,391 @@
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import struct
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SAMPLE_RATE = 44100
+CONTENT_TYPES = {"wav": "audio/wav", "flac": "audio/flac"}
+
+
+"""
+#
+#    worker side: runs in the process pool
+#
+"""
+
+_worker_music = None
+
+
+def _music():
+    """one headless Music per worker process"""
+    global _worker_music
+    if _worker_music is None:
+        from Music import Music
+        _worker_music = Music(isPrint=False, headless=True)
+    return _worker_music
+
+
+def _measures(request):
+    try:
+        return _music().parse_music(request["notes"])
+    except ValueError as e:
+        # ScoreSyntaxError does not survive pickling back to the server process
+        raise ValueError(str(e)) from None
+
+
+def _events(request, measures=None):
+    measures = _measures(request) if measures is None else measures
+    return list(_music().notes_to_events(measures, request["tempo"], SAMPLE_RATE))
+
+
+def warm_up():
+    """construct the worker Music so the first request does not pay for it"""
+    return _music().version
+
+
+def plan_render(request, chunk_samples):
+    """
+    schedule a piece once and return its chunks as (start_sample, end_sample, events) with only
+    the events sounding in each range; chunks are cut at measure starts once they hold at least
+    chunk_samples (Music.measure_ranges)
+    """
+    from Timeline import Timeline
+    muz = _music()
+    measures = _measures(request)
+    events = _events(request, measures)
+    measure_starts = muz.measure_start_samples(measures, request["tempo"], SAMPLE_RATE)
+    end_sample = muz.render_length(events, request["instrument"], request["volume"], sample_rate=SAMPLE_RATE)
+    timeline = Timeline(events, measure_starts, end_sample, SAMPLE_RATE)
+    boundaries = muz.measure_ranges(measure_starts, end_sample, chunk_samples)
+    return [(start, end, timeline.events_between(start, end)) for start, end in zip(boundaries, boundaries[1:])]
+
+
+def render_pcm16(request, events, start_sample, end_sample):
+    """render samples [start_sample, end_sample) of a piece from the events in that range as 16-bit PCM"""
+    wave = _music().render_events(events, instrument=request["instrument"], volume=request["volume"],
+                                  start_sample=start_sample, end_sample=end_sample, sample_rate=SAMPLE_RATE)
+    return np.int16(wave * 32767).astype("<i2").tobytes()
+
+
+def render_file(request):
+    """render a whole piece and return it encoded in request['format']"""
+    import soundfile as sf
+    wave = _music().render_events(_events(request), instrument=request["instrument"], volume=request["volume"],
+                                  sample_rate=SAMPLE_RATE)
+    buffer = io.BytesIO()
+    sf.write(buffer, np.int16(wave * 32767), SAMPLE_RATE, format=request["format"].upper(), subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def wav_header(n_samples, sample_rate=SAMPLE_RATE, channels=1):
+    """44-byte header of a 16-bit PCM WAV file holding n_samples frames"""
+    data_bytes = n_samples * channels * 2
+    return (b"RIFF" + struct.pack("<I", 36 + data_bytes) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, sample_rate * channels * 2,
+                                    channels * 2, 16)
+            + b"data" + struct.pack("<I", data_bytes))
+
+
+"""
+#
+#    server side
+#
+"""
+
+
+class LRUCache():
+    # -------------------------------------------------------------------------------------------------
+    # LRUCache Class
+    #
+    # Bounded in-memory cache of rendered responses; least recently used entries are evicted once
+    # the total size exceeds max_bytes.
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        if key in self._items:
+            self.size -= len(self._items.pop(key))
+        self._items[key] = value
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            _, old = self._items.popitem(last=False)
+            self.size -= len(old)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class RenderJob():
+    # -------------------------------------------------------------------------------------------------
+    # RenderJob Class
+    #
+    # One render shared by every request asking for the same piece. `planned` resolves to the list
+    # of chunk futures in output order; consumers iterate chunks() and may start sending the first
+    # chunk while later ones are still rendering.
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, content_type):
+        self.content_type = content_type
+        self.planned = asyncio.get_running_loop().create_future()
+
+    async def chunks(self):
+        for future in await self.planned:
+            yield await future
+
+
+class RenderServer():
+    # -------------------------------------------------------------------------------------------------
+    # RenderServer Class
+    #
+    # Local asyncio HTTP/1.1 render service.
+    #   POST /render  {"notes": "...", "tempo": 120, "signature": "4/4", "instrument": "piano",
+    #                  "volume": 0.5, "format": "wav" | "flac"}  -> audio bytes (chunked)
+    #   GET  /health  -> JSON counters
+    # Rendering runs in a process pool; WAV responses are split at measure boundaries into chunks that
+    # render in parallel and stream as soon as they are ready. Identical in-flight requests share one
+    # render and recent responses are kept in a bounded LRU cache.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, host="127.0.0.1", port=8765, workers=None, cache_bytes=64 * 2 ** 20, chunk_seconds=2.0):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_samples = int(chunk_seconds * SAMPLE_RATE)
+        self.cache = LRUCache(cache_bytes)
+        self.inflight = {}
+        self.counters = {"requests": 0, "cache_hits": 0, "deduplicated": 0, "renders": 0, "errors": 0}
+        self.pool = None
+        self.server = None
+
+    async def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        # start the workers before listening: processes forked later would inherit client sockets
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(self.pool, warm_up)
+                               for _ in range(self.workers)])
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    """
+    #
+    #    rendering with deduplication and caching
+    #
+    """
+
+    @staticmethod
+    def normalize_request(data):
+        """validate a request dictionary and fill in defaults; raises ValueError"""
+        if not isinstance(data, dict) or not isinstance(data.get("notes"), str):
+            raise ValueError("request must be a JSON object with a 'notes' string")
+        request = {
+            "notes": data["notes"],
+            "tempo": data.get("tempo", 120),
+            "signature": str(data.get("signature", "4/4")),
+            "instrument": str(data.get("instrument", "piano")).lower(),
+            "volume": data.get("volume", 0.5),
+            "format": str(data.get("format", "wav")).lower(),
+        }
+        if not isinstance(request["tempo"], (int, float)) or request["tempo"] <= 0:
+            raise ValueError(f"invalid tempo {request['tempo']!r}")
+        if not isinstance(request["volume"], (int, float)) or not 0 <= request["volume"] <= 1:
+            raise ValueError(f"invalid volume {request['volume']!r}")
+        if request["format"] not in CONTENT_TYPES:
+            raise ValueError(f"unsupported format {request['format']!r}")
+        from ScoreParser import ScoreParser
+        try:
+            valid = ScoreParser().measure_ticks(request["signature"]) > 0
+        except (ValueError, ZeroDivisionError):
+            valid = False
+        if not valid:
+            raise ValueError(f"invalid time signature {request['signature']!r}")
+        return request
+
+    @staticmethod
+    def request_key(request):
+        """cache and deduplication key of a normalized request; the signature does not change the audio"""
+        audio = {name: value for name, value in request.items() if name != "signature"}
+        return hashlib.sha1(json.dumps(audio, sort_keys=True).encode()).hexdigest()
+
+    def render(self, request):
+        """return the RenderJob of a normalized request, reusing a cached or in-flight one"""
+        key = self.request_key(request)
+        self.counters["requests"] += 1
+        content_type = CONTENT_TYPES[request["format"]]
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.counters["cache_hits"] += 1
+            job = RenderJob(content_type)
+            done = job.planned.get_loop().create_future()
+            done.set_result(cached)
+            job.planned.set_result([done])
+            return job
+        job = self.inflight.get(key)
+        if job is not None:
+            self.counters["deduplicated"] += 1
+            return job
+        self.counters["renders"] += 1
+        job = RenderJob(content_type)
+        self.inflight[key] = job
+        asyncio.get_running_loop().create_task(self._produce(key, request, job))
+        return job
+
+    async def _produce(self, key, request, job):
+        loop = asyncio.get_running_loop()
+        try:
+            if request["format"] == "wav":
+                ranges = await loop.run_in_executor(self.pool, plan_render, request, self.chunk_samples)
+                header = loop.create_future()
+                header.set_result(wav_header(ranges[-1][1] if ranges else 0))
+                chunks = [header] + [loop.run_in_executor(self.pool, render_pcm16, request, events, start, end)
+                                     for start, end, events in ranges]
+            else:
+                chunks = [loop.run_in_executor(self.pool, render_file, request)]
+            job.planned.set_result(chunks)
+            results = await asyncio.gather(*chunks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            self.cache.put(key, b"".join(results))
+        except Exception as e:
+            self.counters["errors"] += 1
+            if not job.planned.done():
+                job.planned.set_exception(e)
+        finally:
+            self.inflight.pop(key, None)
+
+    """
+    #
+    #    HTTP
+    #
+    """
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._dispatch(method, path, body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body, writer, keep_alive):
+        if method == "GET" and path == "/health":
+            payload = dict(self.counters, cached=len(self.cache), cache_bytes=self.cache.size,
+                           inflight=len(self.inflight))
+            await self._send(writer, 200, "application/json", json.dumps(payload).encode(), keep_alive)
+            return
+        if method != "POST" or path != "/render":
+            await self._send(writer, 404, "application/json", b'{"error": "not found"}', keep_alive)
+            return
+        try:
+            request = self.normalize_request(json.loads(body or b"null"))
+            job = self.render(request)
+            chunks = job.chunks().__aiter__()
+            first = await chunks.__anext__()
+        except StopAsyncIteration:
+            first = b""
+        except ValueError as e:
+            await self._send(writer, 400, "application/json", json.dumps({"error": str(e)}).encode(), keep_alive)
+            return
+        except Exception as e:
+            await self._send(writer, 500, "application/json", json.dumps({"error": str(e)}).encode(), keep_alive)
+            return
+
+        writer.write(self._status(200, job.content_type, keep_alive, "Transfer-Encoding: chunked\r\n"))
+        self._write_chunk(writer, first)
+        await writer.drain()
+        try:
+            async for chunk in chunks:
+                self._write_chunk(writer, chunk)
+                await writer.drain()
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # the status line is gone already: drop the connection so the client sees the body is incomplete
+            print(f"Warning: render failed while streaming: {e!r}")
+            writer.transport.abort()
+            raise ConnectionAbortedError("render failed while streaming") from e
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _status(code, content_type, keep_alive, extra=""):
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}[code]
+        connection = "keep-alive" if keep_alive else "close"
+        return (f"HTTP/1.1 {code} {reason}\r\nContent-Type: {content_type}\r\n"
+                f"Connection: {connection}\r\n{extra}\r\n").encode("latin-1")
+
+    async def _send(self, writer, code, content_type, payload, keep_alive):
+        writer.write(self._status(code, content_type, keep_alive, f"Content-Length: {len(payload)}\r\n") + payload)
+        await writer.drain()
+
+    @staticmethod
+    def _write_chunk(writer, data):
+        if data:
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+async def serve(host, port, workers, cache_mb, chunk_seconds):
+    server = await RenderServer(host, port, workers, cache_mb * 2 ** 20, chunk_seconds).start()
+    print(f"ifn-music render server on http://{server.host}:{server.port}/render")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local ifn-music render service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="render processes")
+    parser.add_argument("--cache-mb", type=int, default=64, help="response cache size")
+    parser.add_argument("--chunk-seconds", type=float, default=2.0, help="audio per streamed chunk")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.workers, args.cache_mb, args.chunk_seconds))
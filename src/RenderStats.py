@@ -0,0 +1,185 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+
+class RenderStats():
+    # -------------------------------------------------------------------------------------------------
+    # RenderStats Class
+    #
+    # Opt-in instrumentation of the Music render and playback pipeline: per-stage wall time, call
+    # counts, samples produced per instrument, cache hits/misses, peak buffer sizes, the share of
+    # repeated measures copied instead of synthesized (dedup_ratio) and structured log events (one
+    # JSON object per message on the "ifn_music" logger).
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    enabled = True
+
+    def __init__(self, logger=None, max_events=1000):
+        self.logger = logger if logger is not None else logging.getLogger("ifn_music")
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """clear all recorded numbers"""
+        with self._lock:
+            self.stage_seconds = {}
+            self.stage_calls = {}
+            self.counters = {}
+            self.samples = {}
+            self.cache = {}
+            self.peak_bytes = {}
+            self.events = deque(maxlen=self.max_events)
+
+    def stage(self, name):
+        """context manager that adds the wall time of its block to stage `name`"""
+        return _StageTimer(self, name)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_samples(self, instrument, n):
+        with self._lock:
+            self.samples[instrument] = self.samples.get(instrument, 0) + n
+
+    def cache_hit(self, name):
+        with self._lock:
+            self.cache.setdefault(name, [0, 0])[0] += 1
+
+    def cache_miss(self, name):
+        with self._lock:
+            self.cache.setdefault(name, [0, 0])[1] += 1
+
+    def peak_buffer(self, name, n_bytes):
+        with self._lock:
+            if n_bytes > self.peak_bytes.get(name, 0):
+                self.peak_bytes[name] = n_bytes
+
+    def emit(self, event, **fields):
+        """record a structured event and log it as a JSON object"""
+        record = {"event": event, "time": time.time()}
+        record.update(fields)
+        with self._lock:
+            self.events.append(record)
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info(json.dumps(record, default=str))
+
+    def as_dict(self):
+        """return a snapshot of all numbers as plain dictionaries"""
+        with self._lock:
+            return {
+                "stages": {name: {"seconds": self.stage_seconds[name], "calls": self.stage_calls[name]}
+                           for name in self.stage_seconds},
+                "counters": dict(self.counters),
+                "samples": dict(self.samples),
+                "cache": {name: {"hits": hits, "misses": misses} for name, (hits, misses) in self.cache.items()},
+                "peak_bytes": dict(self.peak_bytes),
+                "dedup_ratio": self._dedup_ratio(),
+            }
+
+    def _dedup_ratio(self):
+        # share of the measures rendered that were copied from an identical earlier measure
+        measures = self.counters.get("measures", 0)
+        return self.counters.get("measures_copied", 0) / measures if measures else None
+
+    def report(self):
+        """return a human readable multi-line summary"""
+        stats = self.as_dict()
+        lines = ["stage                          seconds    calls"]
+        for name, stage in sorted(stats["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{name:<28} {stage['seconds']:9.4f} {stage['calls']:8d}")
+        for name, n in sorted(stats["samples"].items()):
+            lines.append(f"samples {name:<20} {n:d}")
+        for name, cache in sorted(stats["cache"].items()):
+            lines.append(f"cache {name:<22} hits {cache['hits']} misses {cache['misses']}")
+        for name, n in sorted(stats["peak_bytes"].items()):
+            lines.append(f"peak {name:<23} {n} bytes")
+        for name, n in sorted(stats["counters"].items()):
+            lines.append(f"{name:<28} {n}")
+        if stats["dedup_ratio"] is not None:
+            lines.append(f"{'dedup ratio':<28} {stats['dedup_ratio']:.3f}")
+        return "\n".join(lines)
+
+
+class _StageTimer():
+    __slots__ = ("stats", "name", "start")
+
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullStage():
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullStats():
+    # -------------------------------------------------------------------------------------------------
+    # NullStats Class
+    #
+    # Same interface as RenderStats with every method a no-op; the default when stats are disabled.
+    # -------------------------------------------------------------------------------------------------
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+    def add_samples(self, instrument, n):
+        pass
+
+    def cache_hit(self, name):
+        pass
+
+    def cache_miss(self, name):
+        pass
+
+    def peak_buffer(self, name, n_bytes):
+        pass
+
+    def emit(self, event, **fields):
+        pass
+
+    def reset(self):
+        pass
+
+    def as_dict(self):
+        return {"stages": {}, "counters": {}, "samples": {}, "cache": {}, "peak_bytes": {},
+                "dedup_ratio": None}
+
+    def report(self):
+        return "stats disabled"
+
+
+NULL_STATS = NullStats()
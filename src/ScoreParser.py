@@ -0,0 +1,324 @@
+import re
+from PitchNote import PitchNote
+
+
+class ScoreSyntaxError(ValueError):
+    """
+    Raised for a token of a music notes string that cannot be parsed.
+    position is the 0-based character offset; line and column are 1-based.
+    """
+    def __init__(self, message, token, position, line, column):
+        super().__init__(f"{message}: {token!r} at line {line}, column {column}")
+        self.token = token
+        self.position = position
+        self.line = line
+        self.column = column
+
+
+class Score():
+    # -------------------------------------------------------------------------------------------------
+    # Score Class
+    #
+    # Result of ScoreParser.parse: list of measures, each a list of note dictionaries
+    #   {'pitch': 'C#4' or 'rest', 'midi': 61 or None, 'ticks': 960, 'tie': False, 'position': 17}
+    # where ticks are integer durations at ScoreParser.PPQ ticks per quarter note and tie=True ties
+    # the note to the next note of the same pitch. errors holds the ScoreSyntaxError of every skipped
+    # token when parsing with strict=False.
+    # measures are in playing order, with the repeats unfolded; written holds the measures as
+    # they are written and order the index into written of every measure played.
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, measures, errors, ppq, written=None, order=None):
+        self.measures = measures
+        self.errors = errors
+        self.ppq = ppq
+        self.written = measures if written is None else written
+        self.order = list(range(len(measures))) if order is None else order
+
+    def total_ticks(self):
+        return sum(note['ticks'] for measure in self.measures for note in measure)
+
+
+class ScoreParser():
+    # -------------------------------------------------------------------------------------------------
+    # ScoreParser Class
+    #
+    # Single-pass tokenizer of the music notes notation into integer tick durations.
+    #
+    #   note     = pitch ["/" duration] ["~"]        e.g. C4/4  Bb3/8.  E4/2+8  G4/4~
+    #   pitch    = letter [#bx]* octave  |  r | R | rest
+    #   duration = value ["."]* ("+" value ["."]*)*  value is the note value (1 whole, 2 half, 4 quarter...)
+    #   "|"      = bar line
+    #   "|:" ":|" ":|:" = start / end / end and start of a repeat, "||" = double bar
+    #   "[1" "[2" "[1,3" = volta ending played on the given passes of the repeat
+    #
+    # A note without "/duration" takes the note value of the previous note (a quarter at the start),
+    # so "C4 D4 E4." is two quarters and a dotted quarter. "+" adds durations inside one token and a
+    # trailing "~" ties a note to the next note, also across bar lines.
+    # Repeats are unfolded into playing order: ":|" plays again from the last "|:" (or from the
+    # last completed repeat, or the start). The measures after "[n" up to the next ":|", "[m",
+    # "|:" or "||" are only played on pass n; a repeat with endings is played as many times as
+    # its highest ending number (at least twice).
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    PPQ = 960              # ticks per quarter note; divisible by 2, 3 and 5 for dotted and tuplet values
+    WHOLE = 4 * PPQ        # ticks per whole note
+
+    _TOKEN = re.compile(r"""
+        (?P<space>\s+)
+      | (?P<repeat_both>:\|:)
+      | (?P<double>\|\|)
+      | (?P<repeat_start>\|:)
+      | (?P<repeat_end>:\|)
+      | (?P<bar>\|)
+      | \[(?P<ending>\d+(?:,\d+)*)(?=\s|$)
+      | (?P<note>
+            (?P<pitch>[A-Ga-g][#bx]*\d+|(?i:rest)|[Rr])
+            (?:/(?P<duration>\d+\.*(?:\+\d+\.*)*)|(?P<dots>\.+))?
+            (?P<tie>~)?
+        )(?=[\s|:]|$)
+      | (?P<bad>[^\s|]+)
+    """, re.VERBOSE)
+
+    def __init__(self):
+        self.version = "0.0.1"
+        self.note_handle = PitchNote()
+        self._pitch_cache = {}
+        self._duration_cache = {}
+        self._format_cache = {}
+
+    def parse(self, music_notes: str, strict: bool = True) -> Score:
+        """
+        Parse a music notes string into a Score.
+        strict=True raises ScoreSyntaxError at the first unparseable token;
+        strict=False skips such tokens and records them in Score.errors.
+        """
+        measures = []
+        errors = []
+        notes = []
+        layout = []   # repeat signs and endings, as (kind, value) between the measures
+        volta = None   # the last ending token, until a repeat sign closes it
+        value = 4   # current note value for notes written without a duration
+        pitch_cache = self._pitch_cache
+        for match in self._TOKEN.finditer(music_notes):
+            kind = match.lastgroup
+            if kind == "space":
+                continue
+            if kind in self._SIGNS:
+                if notes:
+                    layout.append(("measure", len(measures)))
+                    measures.append(notes)
+                    notes = []
+                if kind == "ending":
+                    passes = frozenset(int(n) for n in match.group("ending").split(","))
+                    if 0 in passes:
+                        error = self._error("Volta endings are numbered from 1", music_notes, match.start(),
+                                            match.group())
+                        if strict:
+                            raise error
+                        errors.append(error)
+                        continue
+                    if volta is not None:
+                        # another ending before ":|" would never be reached: close the open one
+                        error = self._error("Volta ending is not closed by a repeat sign", music_notes,
+                                            volta.start(), volta.group())
+                        if strict:
+                            raise error
+                        errors.append(error)
+                        layout.append(("end", None))
+                    volta = match
+                    layout.append(("ending", passes))
+                elif kind == "repeat_both":
+                    layout += [("end", None), ("start", None)]
+                    volta = None
+                elif kind != "bar":
+                    layout.append((kind.replace("repeat_", ""), None))
+                    volta = None
+                continue
+            if kind == "bad":
+                error = self._error("Unrecognized token", music_notes, match.start(), match.group())
+                if strict:
+                    raise error
+                errors.append(error)
+                continue
+
+            pitch_text = match.group("pitch")
+            try:
+                pitch = pitch_cache.get(pitch_text)
+                if pitch is None:
+                    pitch = self._parse_pitch(pitch_text)
+                    pitch_cache[pitch_text] = pitch
+                duration = match.group("duration")
+                if duration is None:
+                    ticks = self.duration_to_ticks(f"{value}{match.group('dots') or ''}")
+                else:
+                    ticks, value = self._duration(duration)
+            except ValueError as e:
+                error = self._error(str(e), music_notes, match.start(), match.group())
+                if strict:
+                    raise error
+                errors.append(error)
+                continue
+
+            notes.append({
+                'pitch': pitch[0],
+                'midi': pitch[1],
+                'ticks': ticks,
+                'tie': match.group("tie") is not None,
+                'position': match.start(),
+            })
+        if notes:
+            layout.append(("measure", len(measures)))
+            measures.append(notes)
+        if len(layout) == len(measures):
+            return Score(measures, errors, self.PPQ)
+        order = self.unfold(layout)
+        return Score([list(measures[index]) for index in order], errors, self.PPQ, measures, order)
+
+    _SIGNS = ("bar", "double", "repeat_start", "repeat_end", "repeat_both", "ending")
+
+    def unfold(self, layout):
+        """
+        playing order (indices of the written measures) of a layout of ("measure", index),
+        ("start", None), ("end", None), ("double", None) and ("ending", passes) entries
+        """
+        # the passes each entry is played on: None for every pass, else those of its ending
+        entries = []
+        ending = None
+        for kind, value in layout:
+            if kind == "ending":
+                ending = value
+            elif kind in ("start", "double"):
+                ending = None
+            entries.append((kind, value, ending))
+            if kind == "end":
+                ending = None
+
+        def passes_of(position):
+            # a repeat is played as often as its highest ending, at least twice
+            highest = 2
+            for kind, value, _ in entries[position:]:
+                if kind == "start":
+                    break
+                if kind == "ending":
+                    highest = max(highest, max(value))
+            return highest
+
+        order = []
+        section, pass_number, passes = 0, 1, passes_of(0)
+        position = 0
+        while position < len(entries):
+            kind, value, ending = entries[position]
+            active = ending is None or pass_number in ending
+            if kind == "start":
+                section, pass_number, passes = position + 1, 1, passes_of(position + 1)
+            elif kind == "end" and active:
+                if pass_number < passes:
+                    pass_number += 1
+                    position = section
+                    continue
+                section, pass_number, passes = position + 1, 1, passes_of(position + 1)
+            elif kind == "measure" and active:
+                order.append(value)
+            position += 1
+        return order
+
+    def _parse_pitch(self, pitch_text):
+        """return (pitch name, MIDI number or None for a rest)"""
+        if pitch_text.lower() in ("r", "rest"):
+            return ("rest", None)
+        pitch = pitch_text[0].upper() + pitch_text[1:]
+        return (pitch, self.note_handle.parse_note(pitch))
+
+    def _duration(self, duration):
+        """return (ticks, note value of the first part) of a duration such as '2.+8'"""
+        cached = self._duration_cache.get(duration)
+        if cached is None:
+            ticks = 0
+            for part in duration.split("+"):
+                ticks += self.duration_to_ticks(part)
+            cached = (ticks, int(duration.split("+")[0].rstrip(".")))
+            self._duration_cache[duration] = cached
+        return cached
+
+    def duration_to_ticks(self, part: str) -> int:
+        """
+        convert a single note value with optional dots (e.g. '4', '2.', '8..') to ticks
+        """
+        value = int(part.rstrip("."))
+        dots = len(part) - len(part.rstrip("."))
+        if value <= 0 or self.WHOLE % value:
+            raise ValueError(f"Unsupported note value 1/{value}")
+        base = self.WHOLE // value
+        ticks = base
+        for _ in range(dots):
+            if base % 2:
+                raise ValueError(f"Unsupported dotted note value 1/{value}")
+            base //= 2
+            ticks += base
+        return ticks
+
+    def format_duration(self, ticks: int) -> str:
+        """
+        return the notation of a duration in ticks, e.g. 960 -> '4', 1440 -> '4.', 1200 -> '4+16'
+        """
+        text = self._format_cache.get(ticks)
+        if text is not None:
+            return text
+        if ticks <= 0:
+            raise ValueError(f"Duration must be positive, got {ticks} ticks")
+        parts = []
+        remaining = ticks
+        while remaining > self.WHOLE * 3 // 2:
+            parts.append("1")
+            remaining -= self.WHOLE
+        while remaining > 0:
+            single = self._single_duration(remaining)
+            if single is not None:
+                parts.append(single)
+                break
+            for value in (1, 2, 4, 8, 16, 32, 64, 128):
+                base = self.WHOLE // value
+                if base * 3 // 2 <= remaining:
+                    parts.append(f"{value}.")
+                    remaining -= base * 3 // 2
+                    break
+                if base <= remaining:
+                    parts.append(f"{value}")
+                    remaining -= base
+                    break
+            else:
+                raise ValueError(f"Duration of {ticks} ticks cannot be written")
+        text = "+".join(parts)
+        self._format_cache[ticks] = text
+        return text
+
+    def _single_duration(self, ticks):
+        """return a single note value (optionally dotted) of exactly ticks, or None"""
+        if self.WHOLE % ticks == 0:
+            return str(self.WHOLE // ticks)
+        if (2 * ticks) % 3 == 0 and self.WHOLE % (2 * ticks // 3) == 0:
+            return f"{self.WHOLE // (2 * ticks // 3)}."
+        return None
+
+    def measure_ticks(self, time_signature: str) -> int:
+        """ticks in one measure of a time signature such as '3/4'"""
+        numerator, denominator = map(int, time_signature.split('/'))
+        ticks, remainder = divmod(self.WHOLE * numerator, denominator)
+        if remainder:
+            raise ValueError(f"Unsupported time signature {time_signature}")
+        return ticks
+
+    def _error(self, message, text, position, token):
+        line = text.count("\n", 0, position) + 1
+        column = position - (text.rfind("\n", 0, position) + 1) + 1
+        return ScoreSyntaxError(message, token, position, line, column)
+
+
+if __name__ == "__main__":
+    parser = ScoreParser()
+    score = parser.parse("C4 D4 E4. F4/8 | G4/2+8 r/8 A4/4~ | A4/4 Bb3/2.", strict=False)
+    for measure in score.measures:
+        print(" ".join(f"{n['pitch']}/{parser.format_duration(n['ticks'])}{'~' if n['tie'] else ''}"
+                       for n in measure))
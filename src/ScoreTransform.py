@@ -0,0 +1,188 @@
+import numpy as np
+from PitchNote import PitchNote
+from ScoreParser import ScoreParser
+
+
+class ScoreArrays():
+    # -------------------------------------------------------------------------------------------------
+    # ScoreArrays Class
+    #
+    # Columnar form of one or more parsed scores, one row per note:
+    #   midi     int16   MIDI number, -1 for a rest
+    #   ticks    int64   duration in ScoreParser.PPQ ticks
+    #   tie      bool    tied to the next note
+    #   measure  int64   measure index within its piece
+    #   piece    int32   index of the piece the note belongs to
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, midi, ticks, tie, measure, piece, n_pieces):
+        self.midi = midi
+        self.ticks = ticks
+        self.tie = tie
+        self.measure = measure
+        self.piece = piece
+        self.n_pieces = n_pieces
+
+    def __len__(self):
+        return len(self.midi)
+
+    def starts(self):
+        """start tick of every note within its own piece"""
+        ends = np.cumsum(self.ticks)
+        starts = ends - self.ticks
+        if len(starts):
+            # subtract the start tick of the first note of each piece
+            first = np.flatnonzero(np.r_[True, self.piece[1:] != self.piece[:-1]])
+            offsets = np.repeat(starts[first], np.diff(np.r_[first, len(starts)]))
+            starts = starts - offsets
+        return starts
+
+
+class ScoreTransform():
+    # -------------------------------------------------------------------------------------------------
+    # ScoreTransform Class
+    #
+    # Bulk score transforms on ScoreArrays: transpose by semitones, canonical respelling,
+    # re-barring to a new time signature (splitting and tying notes across bar lines) and
+    # tempo scaling, applicable to a whole MusicManager library in one batched call.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, parser=None):
+        self.parser = parser if parser is not None else ScoreParser()
+        note_handle = PitchNote()
+        # index -1 (a rest) conveniently selects the last entry
+        self.PITCH_NAMES = np.array([note_handle.midi_to_name(m) for m in range(128)] + ["rest"])
+
+    def to_arrays(self, music_notes_list):
+        """parse a list of music notes strings into one ScoreArrays"""
+        midi, ticks, tie, measure, piece = [], [], [], [], []
+        for piece_index, music_notes in enumerate(music_notes_list):
+            score = self.parser.parse(music_notes, strict=False)
+            for error in score.errors:
+                print(f"Warning: piece {piece_index}: skipping {error}")
+            for measure_index, notes in enumerate(score.measures):
+                for note in notes:
+                    midi.append(-1 if note['midi'] is None else note['midi'])
+                    ticks.append(note['ticks'])
+                    tie.append(note['tie'])
+                    measure.append(measure_index)
+                    piece.append(piece_index)
+        return ScoreArrays(np.array(midi, dtype=np.int16), np.array(ticks, dtype=np.int64),
+                           np.array(tie, dtype=bool), np.array(measure, dtype=np.int64),
+                           np.array(piece, dtype=np.int32), len(music_notes_list))
+
+    def transpose(self, arrays, semitones):
+        """return a copy with every pitch moved by semitones; rests are unchanged"""
+        midi = arrays.midi.astype(np.int32)
+        is_note = midi >= 0
+        midi[is_note] += semitones
+        if is_note.any() and (midi[is_note].min() < 0 or midi[is_note].max() > 127):
+            raise ValueError(f"Transposing by {semitones} semitones leaves the MIDI range 0..127")
+        return ScoreArrays(midi.astype(np.int16), arrays.ticks, arrays.tie, arrays.measure, arrays.piece,
+                           arrays.n_pieces)
+
+    def rebar(self, arrays, time_signature):
+        """
+        return a copy re-barred to time_signature: notes crossing a bar line are split at the bar
+        and the parts tied together (rests are split without a tie)
+        """
+        measure_ticks = self.parser.measure_ticks(time_signature)
+        starts = arrays.starts()
+        ends = starts + arrays.ticks
+        first_bar = starts // measure_ticks
+        parts = (ends - 1) // measure_ticks - first_bar + 1
+
+        # one output row per (note, part)
+        source = np.repeat(np.arange(len(arrays)), parts)
+        part = np.arange(len(source)) - np.repeat(np.cumsum(parts) - parts, parts)
+        bar = first_bar[source] + part
+        part_start = np.maximum(starts[source], bar * measure_ticks)
+        part_end = np.minimum(ends[source], (bar + 1) * measure_ticks)
+
+        midi = arrays.midi[source]
+        is_last = part == parts[source] - 1
+        tie = np.where(is_last, arrays.tie[source], midi >= 0)
+        return ScoreArrays(midi, part_end - part_start, tie, bar, arrays.piece[source], arrays.n_pieces)
+
+    def scale_tempo(self, tempo, factor):
+        """return tempo * factor, as an int when it is a whole number"""
+        scaled = tempo * factor
+        return int(scaled) if float(scaled).is_integer() else scaled
+
+    def to_notes(self, arrays, measure_separator=" | "):
+        """
+        format ScoreArrays back to one canonical music notes string per piece
+        """
+        if len(arrays) == 0:
+            return [""] * arrays.n_pieces
+        values, inverse = np.unique(arrays.ticks, return_inverse=True)
+        durations = np.array([self.parser.format_duration(int(v)) for v in values])[inverse]
+        tokens = np.char.add(np.char.add(np.char.add(self.PITCH_NAMES[arrays.midi], "/"), durations),
+                             np.where(arrays.tie, "~", ""))
+        tokens = tokens.tolist()
+
+        # boundaries of measures and pieces
+        new_measure = np.r_[True, (arrays.measure[1:] != arrays.measure[:-1]) | (arrays.piece[1:] != arrays.piece[:-1])]
+        measure_starts = np.flatnonzero(new_measure)
+        measure_ends = np.r_[measure_starts[1:], len(tokens)]
+        measure_piece = arrays.piece[measure_starts]
+
+        pieces = [[] for _ in range(arrays.n_pieces)]
+        for start, end, piece in zip(measure_starts.tolist(), measure_ends.tolist(), measure_piece.tolist()):
+            pieces[piece].append(" ".join(tokens[start:end]))
+        return [measure_separator.join(measures) for measures in pieces]
+
+    def to_measures(self, arrays):
+        """
+        return the notes of a single-piece ScoreArrays as parse_music style measures
+        (list of measures, each a list of note dictionaries)
+        """
+        measures = []
+        current = None
+        names = self.PITCH_NAMES.tolist()
+        for midi, ticks, tie, measure in zip(arrays.midi.tolist(), arrays.ticks.tolist(),
+                                             arrays.tie.tolist(), arrays.measure.tolist()):
+            if measure != current:
+                measures.append([])
+                current = measure
+            measures[-1].append({'pitch': names[midi], 'midi': None if midi < 0 else midi,
+                                 'ticks': ticks, 'tie': tie, 'position': None})
+        return measures
+
+    def apply(self, music_notes_list, semitones=0, time_signature=None):
+        """transpose and/or re-bar a list of music notes strings; returns canonical strings"""
+        arrays = self.to_arrays(music_notes_list)
+        if semitones:
+            arrays = self.transpose(arrays, semitones)
+        if time_signature is not None:
+            arrays = self.rebar(arrays, time_signature)
+        return self.to_notes(arrays)
+
+    def apply_library(self, manager, semitones=0, time_signature=None, tempo_scale=1.0, save=False):
+        """
+        transform every SampleMusic of a MusicManager in one batched call and write the results
+        back to the manager (notes are always canonically respelled). The manager gets new
+        SampleMusic objects, so a shared MusicLibrary view is never modified. save=True also
+        writes the library file once at the end. Returns the list of transformed music objects.
+        """
+        music_objects = manager.get_all_music()
+        notes = self.apply([music.notes for music in music_objects], semitones, time_signature)
+        transformed = []
+        for music, music_notes in zip(music_objects, notes):
+            music_data = music.get_music()
+            music_data["notes"] = music_notes
+            if time_signature is not None:
+                music_data["signature"] = time_signature
+            if tempo_scale != 1.0:
+                music_data["tempo"] = self.scale_tempo(music.tempo, tempo_scale)
+            transformed.append(manager.create_music(music_data))
+        manager.music_objects[:] = transformed
+        if save:
+            manager.save_data()
+        return transformed
+
+
+if __name__ == "__main__":
+    transform = ScoreTransform()
+    print(transform.apply(["C4/2 D4/2. E4/4 | F4/1"], semitones=2, time_signature="3/4"))
@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from MusicManager import MusicManager
+from ScoreParser import ScoreParser
+from Instruments import instrument_names
+
+# Instrument names of the registry, including installed plugins (listed without importing them)
+KNOWN_INSTRUMENTS = tuple(instrument_names())
+LOWEST_MIDI = 21     # A0, lowest note of PitchNote.note_freq_definition
+HIGHEST_MIDI = 127   # G9, highest MIDI note
+
+
+def validate_music(music_data, instruments=KNOWN_INSTRUMENTS):
+    """
+    Validate one music dictionary (as returned by SampleMusic.get_music) without synthesizing audio.
+    Returns a list of issue dictionaries:
+      {'piece', 'severity': 'error' or 'warning', 'code', 'message', 'measure', 'line', 'column'}
+    """
+    name = music_data.get("name")
+    issues = []
+
+    def issue(severity, code, message, measure=None, line=None, column=None):
+        issues.append({'piece': name, 'severity': severity, 'code': code, 'message': message,
+                       'measure': measure, 'line': line, 'column': column})
+
+    parser = ScoreParser()
+    measure_ticks = None
+    try:
+        measure_ticks = parser.measure_ticks(str(music_data.get("signature", "4/4")))
+    except ValueError:
+        issue("error", "signature", f"invalid time signature {music_data.get('signature')!r}")
+
+    tempo = music_data.get("tempo")
+    if not isinstance(tempo, (int, float)) or tempo <= 0:
+        issue("error", "tempo", f"invalid tempo {tempo!r}")
+
+    # rendering lowercases the instrument name, so "Piano" is the piano
+    known = {str(known_name).lower() for known_name in instruments}
+    for instrument in music_data.get("instruments") or []:
+        if str(instrument).lower() not in known:
+            issue("error", "unknown_instrument", f"unknown instrument {instrument!r}")
+
+    notes = music_data.get("notes")
+    if not isinstance(notes, str):
+        issue("error", "notes", "notes must be a string")
+        return issues
+
+    score = parser.parse(notes, strict=False)
+    for error in score.errors:
+        issue("error", "syntax", str(error), line=error.line, column=error.column)
+
+    # measures as written: a repeated measure is checked once
+    last = len(score.written) - 1
+    for index, measure in enumerate(score.written):
+        for note in measure:
+            midi = note['midi']
+            if midi is not None and not LOWEST_MIDI <= midi <= HIGHEST_MIDI:
+                position = note['position']
+                line = notes.count("\n", 0, position) + 1
+                column = position - (notes.rfind("\n", 0, position) + 1) + 1
+                issue("error", "pitch_range", f"pitch {note['pitch']} (MIDI {midi}) is out of range",
+                      measure=index + 1, line=line, column=column)
+        if measure_ticks is None:
+            continue
+        total = sum(note['ticks'] for note in measure)
+        if total > measure_ticks:
+            issue("error", "measure_overflow",
+                  f"measure has {parser.format_duration(total)} but the signature allows "
+                  f"{parser.format_duration(measure_ticks)}", measure=index + 1)
+        elif total < measure_ticks:
+            # a short first (pickup) or last measure is common notation
+            severity = "warning" if index in (0, last) else "error"
+            issue(severity, "measure_underflow",
+                  f"measure has {parser.format_duration(total)} of {parser.format_duration(measure_ticks)}",
+                  measure=index + 1)
+    return issues
+
+
+class ValidationReport():
+    # -------------------------------------------------------------------------------------------------
+    # ValidationReport Class
+    #
+    # Structured result of validating a library: the issues of every piece plus an exit code
+    # (0 = no errors, 1 = errors; with strict=True warnings count as errors).
+    # -------------------------------------------------------------------------------------------------
+    def __init__(self, pieces, issues, strict=False):
+        self.pieces = pieces
+        self.issues = issues
+        self.strict = strict
+
+    @property
+    def errors(self):
+        return [i for i in self.issues if i['severity'] == "error"]
+
+    @property
+    def warnings(self):
+        return [i for i in self.issues if i['severity'] == "warning"]
+
+    @property
+    def exit_code(self):
+        if self.errors or (self.strict and self.warnings):
+            return 1
+        return 0
+
+    def as_dict(self):
+        return {"pieces": self.pieces, "errors": len(self.errors), "warnings": len(self.warnings),
+                "exit_code": self.exit_code, "issues": self.issues}
+
+    def report(self):
+        """return a human readable multi-line summary"""
+        lines = []
+        for i in self.issues:
+            where = f" measure {i['measure']}" if i['measure'] else ""
+            where += f" line {i['line']} column {i['column']}" if i['column'] else ""
+            lines.append(f"{i['severity']:<7} {i['piece']}{where}: [{i['code']}] {i['message']}")
+        lines.append(f"{self.pieces} pieces, {len(self.errors)} errors, {len(self.warnings)} warnings")
+        return "\n".join(lines)
+
+
+def validate_library(library, workers=None, strict=False, instruments=KNOWN_INSTRUMENTS):
+    """
+    Validate every piece of a MusicManager (or a list of music dictionaries) over a process pool.
+    workers=1 validates in the calling process. Returns a ValidationReport.
+    """
+    if isinstance(library, MusicManager):
+        music_list = [music.get_music() for music in library.get_all_music()]
+    else:
+        music_list = list(library)
+    if workers == 1 or len(music_list) <= 1:
+        results = [validate_music(music_data, instruments) for music_data in music_list]
+    else:
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(music_list) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(validate_music, music_list, [instruments] * len(music_list),
+                                        chunksize=chunksize))
+    issues = [issue for result in results for issue in result]
+    return ValidationReport(len(music_list), issues, strict)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate the scores of a music library without rendering")
+    parser.add_argument("data_file", nargs="?", default="music_data.json", help="library JSON file")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--strict", action="store_true", help="treat warnings as errors")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    manager = MusicManager(args.data_file)
+    manager.load_data()
+    report = validate_library(manager, workers=args.workers, strict=args.strict)
+    print(json.dumps(report.as_dict(), indent=2) if args.json else report.report())
+    return report.exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import bisect
+
+
+class Timeline():
+    # -------------------------------------------------------------------------------------------------
+    # Timeline Class
+    #
+    # Measure and time index over the scheduled events of one piece (Music.notes_to_events) and
+    # the start samples of its measures (Music.measure_start_samples, from the measures' ticks: a
+    # measure that begins with a tied continuation has no event of its own), so rendering and
+    # playback can start at any measure or timestamp. The start samples of the
+    # measures and the start/end samples of the events are kept in sorted lists and looked up by
+    # binary search: finding where measure 200 starts, or which events sound in a range, costs
+    # O(log n) and nothing before that point is synthesized (Music.render_events renders exact
+    # ranges). Measures are numbered from 0 and a section [start_measure, end_measure) ends where
+    # end_measure starts, like a Python slice; end_sample is the end of the whole render,
+    # including the release tails when they are on (reach is then the longest tail, so that a
+    # range also gets the notes still ringing into it).
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+
+    def __init__(self, events, measure_starts, end_sample, sample_rate=44100, reach=0):
+        self.events = events
+        self.measure_starts = list(measure_starts)
+        self.end_sample = end_sample
+        self.sample_rate = sample_rate
+        self.reach = reach
+        self.starts = [event['start_sample'] for event in events]
+        self.ends = [event['end_sample'] for event in events]
+
+    @property
+    def measures(self):
+        """number of measures"""
+        return len(self.measure_starts)
+
+    @property
+    def seconds(self):
+        """length of the render in seconds"""
+        return self.end_sample / self.sample_rate
+
+    def measure_at(self, sample):
+        """index of the measure playing at a sample (the last one past the end)"""
+        return max(bisect.bisect_right(self.measure_starts, sample) - 1, 0)
+
+    def measure_sample(self, measure):
+        """start sample of a measure; measures past the last one start at end_sample"""
+        if measure < 0:
+            raise ValueError(f"Measure numbers start at 0, got {measure}")
+        return self.measure_starts[measure] if measure < len(self.measure_starts) else self.end_sample
+
+    def seconds_sample(self, seconds):
+        """sample at a time in seconds, within [0, end_sample]"""
+        return min(max(int(round(seconds * self.sample_rate)), 0), self.end_sample)
+
+    def section(self, start_measure=None, end_measure=None, start_seconds=None, end_seconds=None):
+        """
+        (start_sample, end_sample) of a section given by measures or by seconds; by default the
+        section runs from the beginning to the end of the render
+        """
+        if start_measure is not None and start_seconds is not None:
+            raise ValueError("Give the start of the section as a measure or in seconds, not both")
+        if end_measure is not None and end_seconds is not None:
+            raise ValueError("Give the end of the section as a measure or in seconds, not both")
+        start = 0
+        if start_measure is not None:
+            start = self.measure_sample(start_measure)
+        elif start_seconds is not None:
+            start = self.seconds_sample(start_seconds)
+        end = self.end_sample
+        if end_measure is not None:
+            end = self.measure_sample(end_measure)
+        elif end_seconds is not None:
+            end = self.seconds_sample(end_seconds)
+        if end < start:
+            raise ValueError(f"The section ends (sample {end}) before it starts (sample {start})")
+        return start, end
+
+    def first_event(self, sample):
+        """index of the first event still sounding at a sample (its note, or its release tail)"""
+        return bisect.bisect_right(self.ends, sample - self.reach)
+
+    def events_between(self, start_sample, end_sample):
+        """the events sounding in [start_sample, end_sample)"""
+        return self.events[self.first_event(start_sample):bisect.bisect_left(self.starts, end_sample)]
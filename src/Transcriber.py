@@ -0,0 +1,213 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from MidiFile import MidiFile
+from PitchNote import PitchNote
+
+
+class Transcriber():
+    # -------------------------------------------------------------------------------------------------
+    # Transcriber Class
+    #
+    # Turns monophonic audio back into a notes string. Audio is cut into overlapping frames of
+    # frame_size samples every hop samples; a batch of frames is windowed and its autocorrelations
+    # are taken at once with one FFT per frame (Wiener-Khinchin), normalized by the autocorrelation
+    # of the window. The period of a frame is the first lag whose correlation comes within
+    # PEAK_RATIO of the best one (which avoids octave-low errors), refined by a parabola.
+    # Frames below the silence level, or not periodic enough (clarity), are rests.
+    # The frame pitches are quantized to MIDI numbers with PitchNote, median filtered, and cut into
+    # notes at pitch changes and at onsets (a dip of the frame level followed by a rise of at least
+    # ONSET_RATIO within ONSET_FRAMES, as when a repeated note starts again). Note times
+    # are converted to ticks at the given tempo and quantized to the 1/32 note grid by
+    # MidiFile.spans_to_notes.
+    # track_blocks() works block by block, so a long file is streamed through a bounded amount of
+    # memory; only one small number per frame (pitch and level) is kept until the end.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    PEAK_RATIO = 0.9       # first correlation peak within this ratio of the highest gives the period
+    ONSET_RATIO = 2.0      # a level dip followed by a rise of this factor starts a new note ...
+    ONSET_FRAMES = 8       # ... within this many frames
+    MEDIAN_FRAMES = 5      # length of the median filter on the frame pitches
+    MIN_NOTE_FRAMES = 3    # shorter notes are taken as transition glitches and dropped
+
+    def __init__(self, tempo=120, signature="4/4", frame_size=2048, hop=512, min_freq=50.0, max_freq=2000.0,
+                 silence=1e-4, clarity=0.5, batch_frames=1024):
+        self.tempo = tempo
+        self.signature = signature
+        self.frame_size = frame_size
+        self.hop = hop
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        self.silence = silence
+        self.clarity = clarity
+        self.batch_frames = batch_frames
+        self.note_handle = PitchNote()
+        self._window = np.hanning(frame_size).astype(np.float32)
+        window_acf = np.correlate(self._window, self._window, "full")[frame_size - 1:]
+        self._window_acf = np.maximum(window_acf / window_acf[0], 1e-3).astype(np.float32)
+
+    """
+    #
+    #    frame-level pitch tracking
+    #
+    """
+
+    def track(self, wave, sample_rate=44100):
+        """
+        (midi, level) of every frame of a mono wave: midi is -1 for a rest, level the RMS of the frame
+        """
+        wave = np.asarray(wave, dtype=np.float32)
+        if len(wave) < self.frame_size:
+            wave = np.concatenate([wave, np.zeros(self.frame_size - len(wave), dtype=np.float32)])
+        frames = sliding_window_view(wave, self.frame_size)[::self.hop]
+        midi = np.empty(len(frames), dtype=np.int16)
+        level = np.empty(len(frames), dtype=np.float32)
+        for start in range(0, len(frames), self.batch_frames):
+            batch = frames[start:start + self.batch_frames]
+            midi[start:start + len(batch)], level[start:start + len(batch)] = self._track_batch(batch, sample_rate)
+        return midi, level
+
+    def _track_batch(self, frames, sample_rate):
+        level = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        # zero padding by the longest lag searched (half a frame) keeps the circular correlation exact
+        spectrum = np.fft.rfft(frames * self._window, n=self.frame_size + self.frame_size // 2, axis=1)
+        acf = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, axis=1)[:, :self.frame_size // 2 + 1]
+        acf /= self._window_acf[:self.frame_size // 2 + 1]
+        lo = max(2, int(sample_rate / self.max_freq))
+        hi = min(self.frame_size // 2, int(math.ceil(sample_rate / self.min_freq)) + 1)
+        energy = np.maximum(acf[:, 0], 1e-12)
+        lags = acf[:, lo - 1:hi + 1] / energy[:, None]
+        middle = lags[:, 1:-1]
+        peaks = (middle >= lags[:, :-2]) & (middle > lags[:, 2:])
+        best = np.max(np.where(peaks, middle, -np.inf), axis=1)
+        # the first peak close to the best one: the fundamental period rather than a multiple of it
+        candidates = peaks & (middle >= self.PEAK_RATIO * best[:, None])
+        first = np.argmax(candidates, axis=1)
+        rows = np.arange(len(frames))
+        a, b, c = lags[rows, first], lags[rows, first + 1], lags[rows, first + 2]
+        curvature = a - 2 * b + c
+        shift = np.where(curvature < 0, 0.5 * (a - c) / np.where(curvature < 0, curvature, -1), 0.0)
+        period = lo + first + np.clip(shift, -0.5, 0.5)
+        freq = sample_rate / period
+        voiced = (level >= self.silence) & (b >= self.clarity) & candidates.any(axis=1)
+        midi = self.note_handle.freq_to_midi(np.where(voiced, freq, self.note_handle.A4_freq))
+        midi[~voiced] = -1
+        return midi, level
+
+    def track_blocks(self, blocks, sample_rate=44100):
+        """
+        track() over consecutive blocks of a long signal (any iterable of arrays, mono or
+        (frames, channels)), yielding (midi, level) per block; frames spanning two blocks are kept
+        """
+        carry = np.zeros(0, dtype=np.float32)
+        for block in blocks:
+            block = np.asarray(block, dtype=np.float32)
+            if block.ndim > 1:
+                block = block.mean(axis=1)
+            data = np.concatenate([carry, block])
+            n_frames = (len(data) - self.frame_size) // self.hop + 1
+            if n_frames <= 0:
+                carry = data
+                continue
+            yield self.track(data[:(n_frames - 1) * self.hop + self.frame_size], sample_rate)
+            carry = data[n_frames * self.hop:]
+        if len(carry):
+            # the last partial frame, padded with silence
+            yield self.track(carry, sample_rate)
+
+    """
+    #
+    #    frames to notes
+    #
+    """
+
+    def frames_to_spans(self, midi, level):
+        """(start frame, end frame, midi) of the notes in the frame pitches"""
+        midi = np.asarray(midi, dtype=np.int16)
+        level = np.asarray(level, dtype=np.float32)
+        if len(midi) == 0:
+            return np.zeros((0, 3), dtype=np.int64)
+        half = self.MEDIAN_FRAMES // 2
+        padded = np.pad(midi, half, mode="edge")
+        midi = np.median(sliding_window_view(padded, self.MEDIAN_FRAMES), axis=1).astype(np.int16)
+        # onsets: local minima of the level that the next ONSET_FRAMES exceed by ONSET_RATIO
+        padded = np.pad(level, (1, self.ONSET_FRAMES), mode="edge")
+        ahead = np.max(sliding_window_view(padded[2:], self.ONSET_FRAMES), axis=1)
+        dips = np.flatnonzero((level <= padded[:-self.ONSET_FRAMES - 1]) & (level < padded[2:len(level) + 2])
+                              & (ahead >= self.ONSET_RATIO * np.maximum(level, self.silence)))
+        # only inside the sound: a note after a rest is already cut by the rest
+        voiced = np.r_[0, np.cumsum(midi >= 0)]
+        dips = dips[voiced[dips] > voiced[np.maximum(dips - self.ONSET_FRAMES, 0)]]
+        # The frame energy grows linearly with the part of the frame past a sharp change, so the new
+        # note starts at the frame whose energy is halfway through the larger change around the
+        # dip: the rise of a sharp attack, or the fall of a note released into a slow attack.
+        k = self.ONSET_FRAMES
+        energy = np.square(level, dtype=np.float64)
+        around = sliding_window_view(np.pad(energy, k, mode="edge"), 2 * k + 1)[dips]   # frames dip-k .. dip+k
+        valley, before, after = around[:, k:k + 1], around[:, :k], around[:, k + 1:]
+        rise_at = dips + 1 + np.argmax(after >= (valley + after.max(axis=1, keepdims=True)) / 2, axis=1)
+        above = before > (valley + before.max(axis=1, keepdims=True)) / 2
+        fall_at = dips - np.argmax(above[:, ::-1], axis=1)
+        onsets = np.where(before.max(axis=1) > after.max(axis=1), fall_at, rise_at)
+        cut = np.zeros(len(midi) + 1, dtype=bool)
+        cut[onsets[onsets < len(midi)]] = True
+        cut[1:-1] |= midi[1:] != midi[:-1]
+        starts = np.flatnonzero(cut[:-1])
+        starts = np.r_[0, starts[starts > 0]]
+        pitches = midi[starts]
+        lengths = np.diff(np.r_[starts, len(midi)])
+        # glitches (short notes) are dropped and the note before them runs on
+        bounds = (pitches < 0) | (lengths >= self.MIN_NOTE_FRAMES)
+        starts, pitches = starts[bounds], pitches[bounds]
+        ends = np.r_[starts[1:], len(midi)]
+        # a note after a rest starts where the sound does: a slow attack is unpitched at first
+        loud = level >= self.silence
+        run_start = np.maximum.accumulate(np.where(loud & ~np.r_[False, loud[:-1]], np.arange(len(level)), 0))
+        after_rest = (pitches >= 0) & np.r_[True, pitches[:-1] < 0]
+        starts = np.where(after_rest & loud[starts], np.maximum(run_start[starts], np.r_[0, starts[:-1]]), starts)
+        notes = pitches >= 0
+        return np.stack([starts[notes], ends[notes], pitches[notes]], axis=1).astype(np.int64)
+
+    def spans_to_notes(self, spans, n_frames, sample_rate=44100):
+        """notes string of (start frame, end frame, midi) spans at the tempo and signature"""
+        midi_file = MidiFile()
+        ppq = midi_file.parser.PPQ
+        ticks_per_frame = self.hop / sample_rate * self.tempo / 60 * ppq
+        # frame i is centred at i * hop + frame_size / 2; a note boundary lies half a hop before
+        offset = (self.frame_size / 2 - self.hop / 2) / self.hop
+        spans = np.asarray(spans, dtype=np.float64)
+        ticks = [(int(round((start + offset) * ticks_per_frame)), int(round((end + offset) * ticks_per_frame)),
+                  int(midi)) for start, end, midi in spans]
+        return midi_file.spans_to_notes(ticks, ppq, self.signature, end_tick=round(n_frames * ticks_per_frame))
+
+    """
+    #
+    #    transcription
+    #
+    """
+
+    def transcribe(self, wave, sample_rate=44100):
+        """notes string of a mono or (frames, channels) wave"""
+        return self.transcribe_blocks([wave], sample_rate)
+
+    def transcribe_blocks(self, blocks, sample_rate=44100):
+        """notes string of a signal given as consecutive blocks"""
+        midi, level = [], []
+        for block_midi, block_level in self.track_blocks(blocks, sample_rate):
+            midi.append(block_midi)
+            level.append(block_level)
+        if not midi:
+            return ""
+        midi, level = np.concatenate(midi), np.concatenate(level)
+        return self.spans_to_notes(self.frames_to_spans(midi, level), len(midi), sample_rate)
+
+    def transcribe_file(self, filename, block_seconds=60.0):
+        """notes string of an audio file (WAV, FLAC, OGG), read block_seconds at a time"""
+        import soundfile as sf
+        with sf.SoundFile(filename) as file:
+            blocks = file.blocks(blocksize=int(block_seconds * file.samplerate), dtype="float32", always_2d=True)
+            return self.transcribe_blocks(blocks, file.samplerate)
@@ -0,0 +1,164 @@
+import numpy as np
+
+
+class WavePeaks():
+    # -------------------------------------------------------------------------------------------------
+    # WavePeaks Class
+    #
+    # Multi-resolution min/max pyramid of a wave, for drawing it at any zoom level. Level 0 holds
+    # the minimum and maximum of every BLOCK samples, level i of every BLOCK * FACTOR**i samples;
+    # each level is made from the one below by a reshape, so the whole pyramid costs about one
+    # pass over the wave and a third of a level 0 in memory. columns() draws a range of samples
+    # into a given number of pixels from the coarsest level that is still fine enough, in
+    # O(pixels) whatever the length of the wave.
+    # append() takes the wave block by block (e.g. from Music.render_blocks), carrying the
+    # samples and columns that do not fill a whole block yet, so the pyramid grows while the
+    # piece is being rendered; finish() adds the last partial columns.
+    # A (frames, channels) wave is reduced over its channels as well.
+    #
+    # Version: 0.0.1
+    # Date: 19 October 2026
+    # -------------------------------------------------------------------------------------------------
+    BLOCK = 64      # samples per column of level 0
+    FACTOR = 4      # columns of a level per column of the level above
+
+    def __init__(self, sample_rate=44100, block=None, factor=None):
+        self.sample_rate = sample_rate
+        self.block = block or self.BLOCK
+        self.factor = factor or self.FACTOR
+        if self.block < 1 or self.factor < 2:
+            raise ValueError(f"block must be at least 1 and factor at least 2, got {self.block}, {self.factor}")
+        self.length = 0                     # samples appended so far
+        self.finished = False
+        self._lows, self._highs = [], []    # per level, arrays with spare capacity
+        self._counts = []                   # columns filled per level
+        self._carry_low = np.zeros(0, dtype=np.float32)
+        self._carry_high = np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def from_wave(cls, wave, sample_rate=44100, block=None, factor=None):
+        """the complete pyramid of a rendered wave"""
+        peaks = cls(sample_rate, block, factor)
+        peaks.append(wave)
+        peaks.finish()
+        return peaks
+
+    """
+    #
+    #    building
+    #
+    """
+
+    def append(self, wave):
+        """add the next block of samples, mono or (frames, channels)"""
+        if self.finished:
+            raise ValueError("WavePeaks is finished; no more samples can be appended")
+        wave = np.asarray(wave, dtype=np.float32)
+        low, high = (wave, wave) if wave.ndim == 1 else (wave.min(axis=1), wave.max(axis=1))
+        self.length += len(low)
+        if len(self._carry_low):
+            low = np.concatenate([self._carry_low, low])
+            high = np.concatenate([self._carry_high, high])
+        full = len(low) // self.block * self.block
+        if full:
+            self._push(0, low[:full].reshape(-1, self.block).min(axis=1),
+                       high[:full].reshape(-1, self.block).max(axis=1))
+        self._carry_low, self._carry_high = low[full:].copy(), high[full:].copy()
+        self._build(partial=False)
+        return self
+
+    def finish(self):
+        """add the columns of the samples left over; the pyramid is then complete"""
+        if not self.finished:
+            if len(self._carry_low):
+                self._push(0, self._carry_low.min(keepdims=True), self._carry_high.max(keepdims=True))
+                self._carry_low = self._carry_high = np.zeros(0, dtype=np.float32)
+            self._build(partial=True)
+            self.finished = True
+        return self
+
+    def _push(self, level, low, high):
+        if level == len(self._counts):
+            self._lows.append(np.zeros(max(16, len(low)), dtype=np.float32))
+            self._highs.append(np.zeros(max(16, len(low)), dtype=np.float32))
+            self._counts.append(0)
+        count = self._counts[level]
+        if count + len(low) > len(self._lows[level]):
+            size = max(2 * len(self._lows[level]), count + len(low))
+            for arrays in (self._lows, self._highs):
+                grown = np.zeros(size, dtype=np.float32)
+                grown[:count] = arrays[level][:count]
+                arrays[level] = grown
+        self._lows[level][count:count + len(low)] = low
+        self._highs[level][count:count + len(high)] = high
+        self._counts[level] = count + len(low)
+
+    def _build(self, partial):
+        # fill every level from the whole groups of FACTOR columns below it; with partial, a last
+        # smaller group makes a column too, as long as the level below has more than one column
+        level = 1
+        while level - 1 < len(self._counts) and self._counts[level - 1] > 1:
+            below = self._counts[level - 1]
+            done = self._counts[level] if level < len(self._counts) else 0
+            whole = below // self.factor
+            if whole > done:
+                lows = self._lows[level - 1][done * self.factor:whole * self.factor].reshape(-1, self.factor)
+                highs = self._highs[level - 1][done * self.factor:whole * self.factor].reshape(-1, self.factor)
+                self._push(level, lows.min(axis=1), highs.max(axis=1))
+            if partial and below % self.factor:
+                rest = slice(whole * self.factor, below)
+                self._push(level, self._lows[level - 1][rest].min(keepdims=True),
+                           self._highs[level - 1][rest].max(keepdims=True))
+            if level == len(self._counts):
+                break
+            level += 1
+
+    """
+    #
+    #    drawing
+    #
+    """
+
+    @property
+    def levels(self):
+        """number of levels built so far"""
+        return len(self._counts)
+
+    def level(self, index):
+        """(min, max) columns of one level, each covering block * factor**index samples"""
+        count = self._counts[index]
+        return self._lows[index][:count], self._highs[index][:count]
+
+    def columns(self, start_sample=0, end_sample=None, pixels=800):
+        """
+        (min, max) float32 arrays of length pixels for samples [start_sample, end_sample): pixel p
+        shows the range of the samples under it. Pixels past the end, or (while the pyramid is still
+        growing) past the last whole column of the level drawn from, are 0.
+        """
+        end_sample = self.length if end_sample is None else end_sample
+        lows = np.zeros(pixels, dtype=np.float32)
+        highs = np.zeros(pixels, dtype=np.float32)
+        if pixels <= 0 or end_sample <= start_sample or not self._counts:
+            return lows, highs
+        per_pixel = (end_sample - start_sample) / pixels
+        # the coarsest level whose columns are not wider than a pixel
+        index = 0
+        while index + 1 < len(self._counts) and self.block * self.factor ** (index + 1) <= per_pixel:
+            index += 1
+        size = self.block * self.factor ** index
+        low, high = self.level(index)
+        edges = start_sample + per_pixel * np.arange(pixels + 1)
+        first = np.floor(np.maximum(edges[:-1], 0) / size).astype(np.int64)
+        last = np.maximum(np.ceil(edges[1:] / size).astype(np.int64), first + 1)
+        shown = (edges[1:] > 0) & (edges[:-1] < self.length) & (first < len(low))
+        if not shown.any():
+            return lows, highs
+        # reduceat gives every shown pixel the columns from its first one up to the next pixel's
+        # first one; a column cut by the pixel edge belongs to both pixels
+        base, top = int(first[shown][0]), min(int(last[shown].max()), len(low))
+        lows[shown] = np.minimum.reduceat(low[base:top], first[shown] - base)
+        highs[shown] = np.maximum.reduceat(high[base:top], first[shown] - base)
+        cut = np.flatnonzero(shown[:-1] & (last[:-1] > first[1:]) & (first[1:] < len(low)))
+        lows[cut] = np.minimum(lows[cut], low[first[cut + 1]])
+        highs[cut] = np.maximum(highs[cut], high[first[cut + 1]])
+        return lows, highs
@@ -1,8 +1,13 @@
+import bisect
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox 
-# from tkinter import filedialog
+from tkinter import filedialog
+import threading
+import time
 import Music
+from Instruments import instrument_names
+from WavePeaks import WavePeaks
 
 import tkinter as tk
 
@@ -16,10 +21,10 @@ class MusicGUI:
         self.root = tk.Tk()
         self._setup_root()
         self._setup_constants()
-        self._setup_gui()
         
         # initalize Music Object
         self.muz = Music.Music()
+        self._setup_gui()
 
     def _setup_root(self):
         # Apply initial values to the tkinter root
@@ -28,11 +33,15 @@ class MusicGUI:
 
     def _setup_constants(self):
         # # CONSTANTS
-        self.INSTRUMENTS = ["Piano", "Guitar", "Organ", "Drum", "Bass", "Bell", "Angklung", "Harmonica", "Flute"]
+        # every registered instrument, including those of installed plugins
+        self.INSTRUMENTS = [name.title() for name in instrument_names()]
         self.EFFECTS = ["None", "Reverb", "Echo", "Distortion"]
         self.SAMPLE =["None", "Doremi", "Mozart", "kakatua"]
         self.signature_numerator_list=[1,2,3,4,5,6,7,8,9,16,32]
         self.signature_denomerator_list=[1,2,3,4,5,6,7,8,9,16,32,64]
+        self.WAVE_WIDTH = 760           # waveform canvas, in pixels
+        self.WAVE_HEIGHT = 120
+        self.SAMPLE_RATE = 44100
 
     def _on_sample_selected(self, event):
         # Clear the text widget
@@ -200,8 +209,8 @@ C5/2 rest/4
 
         # Text Box for Notes Input (left: label and button, right: text box)
         ttk.Label(self.root, text="Enter Music Notes: ").grid(row=4, column=0, sticky="ne")
-        # self.import_button = ttk.Button(self.root, text="Import File", command=self.import_music_file)
-        # self.import_button.grid(row=5, column=0, sticky="n", pady=5)
+        self.import_button = ttk.Button(self.root, text="Import File", command=self.import_music_file)
+        self.import_button.grid(row=5, column=0, sticky="n", pady=5)
         self.note_text = tk.Text(self.root, height=10, width=50)
         self.note_text.insert("1.0", self.default_sample_music_note()) # Set default music notes
         self.note_text.grid(row=4, column=1, rowspan=2)
@@ -215,9 +224,30 @@ C5/2 rest/4
         self.file_name_entry.grid(row=0, column=1, sticky="w")
         self.save_button = ttk.Button(save_music_container, text="Save Music as File", command=self.export_music_file)
         self.save_button.grid(row=0, column=2, sticky="e", pady=5)
-        
+
+        # Waveform of the last played music, with the measure being played highlighted
+        ttk.Label(self.root, text="Waveform: ").grid(row=7, column=0, sticky="ne")
+        self.wave_canvas = tk.Canvas(self.root, width=self.WAVE_WIDTH, height=self.WAVE_HEIGHT, background="white")
+        self.wave_canvas.grid(row=7, column=1, sticky="w", pady=5)
+        self.wave_canvas.bind("<MouseWheel>", self._on_wave_zoom)                         # Windows, macOS
+        self.wave_canvas.bind("<Button-4>", lambda event: self._on_wave_zoom(event, 120))   # X11
+        self.wave_canvas.bind("<Button-5>", lambda event: self._on_wave_zoom(event, -120))
+        self.wave_canvas.bind("<Button-3>", lambda event: self.draw_wave())
+        self.wave_canvas.bind("<Button-1>", self._on_wave_click)
+        self.root.bind("<Escape>", lambda event: self.stop_music())
+        wave_container = ttk.Frame(self.root)
+        wave_container.grid(row=8, column=1, sticky="w")
+        self.loop_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(wave_container, text="Loop the clicked measure", variable=self.loop_var).grid(row=0, column=0)
+        ttk.Label(wave_container, text="    click: play from a measure, wheel: zoom, right click: whole wave"
+                  ).grid(row=0, column=1, sticky="w")
+        self.waves = None               # the last played wave
+        self.wave_peaks = None          # its WavePeaks
+        self.measure_starts = []        # start sample of each of its measures
+        self.view = (0, 0)              # samples shown on the canvas
+        self.playback = None            # (stop event, start time, start sample, loop end) of the playback
+
     def default_sample_music_note(self):
-        self.muz = Music.Music()
         name = "mary has a little lamb"
         music = self.muz.manager.get_music_by_name(name)
         if music:            
@@ -228,15 +258,35 @@ C5/2 rest/4
             return music.notes
         
     def import_music_file(self):
-        pass
+        file_path = filedialog.askopenfilename(filetypes=[("MIDI Files", "*.mid *.midi"),
+                                                          ("Audio Files", "*.wav *.flac *.ogg")])
+        if not file_path:
+            return
+        if file_path.lower().endswith((".mid", ".midi")):
+            music = self.muz.load_midi(file_path)
+        else:
+            # audio is transcribed at the tempo and time signature currently selected
+            signature = f"{self.signature_numerator_var.get()}/{self.signature_denomerator_var.get()}"
+            music = self.muz.load_audio(file_path, tempo=self.tempo_var.get(), signature=signature)
+        numerator, denominator = map(int, music.signature.split('/'))
+        self.note_text.delete("1.0", tk.END)
+        self.note_text.insert("1.0", music.notes.replace(" | ", " |\n"))
+        self.tempo_var.set(music.tempo)
+        self.tempo_slider.set(music.tempo)
+        self.signature_numerator_var.set(numerator)
+        self.signature_denomerator_var.set(denominator)
     
     def export_music_file(self):
         instrument = self.instrument_var.get().lower()
         filename = self.file_name_var.get()
         tempo = self.tempo_var.get()
         music_notes = self.note_text.get("1.0", tk.END).strip()
-        waves = self.muz.music_note_to_waves(music_notes, tempo=tempo, instrument=instrument)
-        self.muz.save_audio(filename, waves)
+        if filename.lower().endswith((".mid", ".midi")):
+            signature = f"{self.signature_numerator_var.get()}/{self.signature_denomerator_var.get()}"
+            self.muz.save_midi(filename, music_notes, tempo=tempo, signature=signature, instrument=instrument)
+        else:
+            waves = self.muz.music_notes_to_waves(music_notes, tempo=tempo, instrument=instrument)
+            self.muz.save_audio(filename, waves)
         # Show a messagebox to inform the user
         messagebox.showinfo("Success", f"The music file '{filename}' has been saved successfully!")
 
@@ -244,9 +294,8 @@ C5/2 rest/4
         numerator = str(self.signature_numerator_var.get())
         denomerator = str(self.signature_denomerator_var.get())
         signature =  numerator + "/" + denomerator 
-        tempo = self.tempo_var.get()
         music_notes = self.note_text.get("1.0", tk.END).strip()
-        canonize_notes = self.muz.canonize_music(music_notes, tempo, signature)
+        canonize_notes = self.muz.canonize_music(music_notes, time_signature=signature)
         # Clear the existing text
         self.note_text.delete("1.0", tk.END)
         # Insert the new text
@@ -271,8 +320,115 @@ C5/2 rest/4
             else:
                 # effect == "None":
                 new_waves = waves
-            self.muz.play_wave(new_waves)
+            self.stop_music()
+            self.waves = new_waves
+            self.wave_peaks = WavePeaks.from_wave(new_waves, self.SAMPLE_RATE)
+            self.measure_starts = self.muz.measure_starts(music_notes, self.muz.context(tempo, instrument))
+            self.draw_wave()
+            self.play_from(0)
             # self.muz.play_music_notes(music_notes=music_notes, tempo=tempo, instrument=instrument, volume=0.5)
+
+    def play_from(self, start_sample, loop_end=None):
+        # play the last wave from a sample in the background, so the window can follow the playback;
+        # with loop_end the part up to it is repeated until stopped
+        self.stop_music()
+        stop = threading.Event()
+        self.playback = (stop, time.perf_counter(), start_sample, loop_end)
+        threading.Thread(target=self.muz.play_wave, args=(self.waves, stop, start_sample, loop_end,
+                                                          0 if loop_end else 1), daemon=True).start()
+        self._follow_playback(stop)
+
+    def stop_music(self):
+        if self.playback is not None:
+            self.playback[0].set()
+            self.playback = None
+
+    """
+    #
+    #    waveform view
+    #
+    """
+
+    def draw_wave(self, start_sample=0, end_sample=None):
+        # one vertical min-max line per pixel, read from the peak pyramid whatever the zoom
+        canvas = self.wave_canvas
+        canvas.delete("all")
+        if self.wave_peaks is None or self.wave_peaks.length == 0:
+            return
+        end_sample = self.wave_peaks.length if end_sample is None else end_sample
+        self.view = (start_sample, end_sample)
+        lows, highs = self.wave_peaks.columns(start_sample, end_sample, self.WAVE_WIDTH)
+        scale = max(float(highs.max()), -float(lows.min()), 1e-6)
+        middle = self.WAVE_HEIGHT / 2
+        canvas.create_rectangle(0, 0, 0, self.WAVE_HEIGHT, fill="#ffe9a8", outline="", tags="measure")
+        for x, (low, high) in enumerate(zip(lows, highs)):
+            canvas.create_line(x, middle - high / scale * (middle - 2), x, middle - low / scale * (middle - 2) + 1,
+                               fill="#1f5fa8")
+        for start in self.measure_starts:
+            x = self._sample_to_x(start)
+            if 0 <= x < self.WAVE_WIDTH:
+                canvas.create_line(x, 0, x, 6, fill="gray")
+        canvas.create_line(0, 0, 0, self.WAVE_HEIGHT, fill="red", tags="cursor")
+        canvas.tag_lower("measure")
+        if self.playback is not None:
+            self._show_position(self._playback_sample())
+
+    def _sample_to_x(self, sample):
+        start, end = self.view
+        return (sample - start) * self.WAVE_WIDTH / max(end - start, 1)
+
+    def _on_wave_zoom(self, event, delta=None):
+        # the wheel zooms in or out by 2 around the sample under the mouse
+        if self.wave_peaks is None:
+            return
+        delta = event.delta if delta is None else delta
+        start, end = self.view
+        anchor = start + event.x * (end - start) / self.WAVE_WIDTH
+        span = (end - start) / 2 if delta > 0 else (end - start) * 2
+        span = min(max(span, self.WAVE_WIDTH / 4), self.wave_peaks.length)
+        start = min(max(anchor - (anchor - start) * span / (end - start), 0), self.wave_peaks.length - span)
+        self.draw_wave(int(start), int(start + span))
+
+    def _on_wave_click(self, event):
+        # play from the start of the measure under the mouse, or loop that measure
+        if self.waves is None or not self.measure_starts:
+            return
+        start, end = self.view
+        sample = start + event.x * (end - start) / self.WAVE_WIDTH
+        index = max(bisect.bisect_right(self.measure_starts, sample) - 1, 0)
+        loop_end = None
+        if self.loop_var.get():
+            loop_end = self.measure_starts[index + 1] if index + 1 < len(self.measure_starts) else len(self.waves)
+        self.play_from(self.measure_starts[index], loop_end)
+
+    def _playback_sample(self):
+        _, started, start_sample, loop_end = self.playback
+        played = int((time.perf_counter() - started) * self.SAMPLE_RATE)
+        if loop_end:
+            return start_sample + played % max(loop_end - start_sample, 1)
+        return start_sample + played
+
+    def _show_position(self, sample):
+        # highlight the measure holding the sample and put the cursor on it
+        index = max(bisect.bisect_right(self.measure_starts, sample) - 1, 0)
+        if self.measure_starts:
+            start = self.measure_starts[index]
+            end = self.measure_starts[index + 1] if index + 1 < len(self.measure_starts) else self.wave_peaks.length
+            self.wave_canvas.coords("measure", self._sample_to_x(start), 0, self._sample_to_x(end), self.WAVE_HEIGHT)
+        x = self._sample_to_x(sample)
+        self.wave_canvas.coords("cursor", x, 0, x, self.WAVE_HEIGHT)
+
+    def _follow_playback(self, stop):
+        if self.playback is None or self.playback[0] is not stop:
+            return
+        sample = self._playback_sample()
+        if stop.is_set() or (not self.playback[3] and sample >= self.wave_peaks.length):
+            self.playback = None
+            self.wave_canvas.coords("measure", 0, 0, 0, self.WAVE_HEIGHT)
+            self.wave_canvas.coords("cursor", 0, 0, 0, self.WAVE_HEIGHT)
+            return
+        self._show_position(sample)
+        self.root.after(40, self._follow_playback, stop)
         
     def run(self):
         # Start the tkinter main event loop
@@ -281,7 +437,7 @@ C5/2 rest/4
 # Example of using the MyTkApp class
 if __name__ == "__main__":
     # Set initial values
-    app = MusicGUI(initial_title="Interactive Music Synthesizer", initial_size="920x510")
+    app = MusicGUI(initial_title="Interactive Music Synthesizer", initial_size="920x710")
     # Run the app
     app.run()
 
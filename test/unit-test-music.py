@@ -1,6 +1,27 @@
 # unit-test-music.py
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
+from fractions import Fraction
+import numpy as np
 import Music 
+from MusicManager import MusicLibrary, MusicManager
+from ScoreParser import ScoreParser, ScoreSyntaxError
+from ScoreTransform import ScoreTransform
+import ScoreValidator
+import MidiFile
+import RenderServer
+import Instruments
+import LivePlay
+from AudioOutput import FileOutput, MemoryOutput, NullOutput
+from RenderContext import RenderContext
+from Transcriber import Transcriber
+from WavePeaks import WavePeaks
 
 class TestMusic(unittest.TestCase):
     def setUp(self):
@@ -49,6 +70,13 @@ class TestMusic(unittest.TestCase):
             note_name = f"{note_names[note_index]}{octave}"
             self.assertEqual(self.muz.pitch_to_freq(note_name),A4_FREQ * (2 ** ((midi_num - A4_MIDI) / 12)))
     
+    def test_freq_to_midi(self):
+        # the nearest MIDI note of a frequency, for one value or an array
+        handle = self.muz.note_handle
+        self.assertEqual(handle.freq_to_midi(440.0), 69)
+        midi = np.arange(21, 128)
+        np.testing.assert_array_equal(handle.freq_to_midi([handle.midi_to_freq(m) * 1.02 for m in midi]), midi)
+    
     def test_non_standard_notes(self): 
         # test to normalize the non-standard notes
         examples = ["Fx4", "Cx5", "Dx4", "Bbb3", "A#4", "Bx3", "Cx4", "Bb3", "F#4", "Eb5", "Fx3", "B3", "Cb4", "G#4"]
@@ -89,6 +117,1104 @@ class TestMusic(unittest.TestCase):
         tempo = music["tempo"]        
         muz.set_time_signature(signature)
         self.assertTrue(self.muz.play_music_notes(music_notes, tempo=tempo))
+    
+    def test_play_doremi_null_output(self):
+        muz = Music.Music(isPrint=False, headless=True, output="null")
+        music = muz.manager.get_music_by_name("doremi")
+        muz.set_time_signature(music.signature)
+        t = time.perf_counter()
+        self.assertTrue(muz.play_music_notes(music.notes, tempo=music.tempo))
+        # far faster than the real-time length of the song
+        self.assertLess(time.perf_counter() - t, 2.0)
+    
+    """
+    #
+    #    testing playback outputs
+    #
+    """
+    
+    def test_memory_and_file_outputs(self):
+        import soundfile as sf
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/8 E4/8 G4/4 rest/4 C5/4"
+        expected = muz.music_notes_to_waves(notes, tempo=120, instrument="organ")
+        memory = muz.set_output("memory")
+        self.assertTrue(muz.play_music_notes(notes, tempo=120, instrument="organ"))
+        np.testing.assert_array_equal(memory.data(), expected)
+        self.assertEqual((memory.read(100).shape, memory.available()), ((100,), len(expected) - 100))
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "take.wav")
+            muz.set_output(FileOutput(filename))
+            self.assertTrue(muz.play_wave(np.stack([expected, expected], axis=1)))
+            data, _ = sf.read(filename)
+            self.assertEqual(data.shape, (len(expected), 2))
+        # a named output given to the constructor is the one played to and read back
+        named = Music.Music(isPrint=False, headless=True, output="memory")
+        self.assertIsInstance(named.output, MemoryOutput)
+        self.assertTrue(named.play_music_notes(notes, tempo=120, instrument="organ"))
+        np.testing.assert_array_equal(named.output.data(), expected)
+        # the ring keeps the most recent frames only
+        ring = MemoryOutput(capacity=1000 / 44100).open()
+        ring.write(np.arange(1500, dtype=np.float32))
+        self.assertEqual((ring.data()[0], ring.dropped), (500.0, 500))
+        with self.assertRaises(ValueError):
+            muz.set_output("speaker")
+        # the sound card stays unavailable in headless mode
+        muz.set_output(None)
+        with self.assertRaises(RuntimeError):
+            muz.play_wave(expected)
+    
+    def test_paced_playback_and_cancellation(self):
+        muz = Music.Music(isPrint=False, headless=True, output=NullOutput(speed=50))
+        stats = muz.enable_stats()
+        notes = "C4/4 D4/4 E4/4 F4/4 | " * 4   # 8 seconds
+        t = time.perf_counter()
+        self.assertTrue(muz.play_music_notes(notes, tempo=120, instrument="organ"))
+        self.assertGreater(time.perf_counter() - t, 8 / 50 - 0.1 / 50)
+        self.assertEqual(muz.output.seconds, 8.0)
+        # stop_music from another thread ends playback within a block
+        muz.set_output(NullOutput(speed=10))
+        threading.Timer(0.2, muz.stop_music).start()
+        t = time.perf_counter()
+        muz.play_music_notes(notes, tempo=120, instrument="organ")
+        self.assertLess(time.perf_counter() - t, 0.5)
+        self.assertLess(muz.output.seconds, 4.0)
+        self.assertIn("playback_underruns", stats.counters)
+    
+    """
+    #
+    #    testing headless mode and start-up cost
+    #
+    """
+    
+    # budgets in seconds, an order of magnitude above a typical machine so a loaded CI box passes;
+    # they catch the heavy imports or the library read coming back, not small slowdowns
+    IMPORT_BUDGET = 10.0
+    CONSTRUCTION_BUDGET = 0.1
+    
+    def test_cold_import_budget(self):
+        # a fresh interpreter imports Music without the audio, keyboard, scipy or soundfile stack
+        code = (
+            "import sys, time\n"
+            "t = time.perf_counter()\n"
+            "import Music\n"
+            "print(time.perf_counter() - t)\n"
+            "print(','.join(m for m in ('pyaudio', 'keyboard', 'scipy', 'soundfile') if m in sys.modules))\n"
+        )
+        src_dir = os.path.dirname(os.path.abspath(Music.__file__))
+        result = subprocess.run([sys.executable, "-c", code], cwd=src_dir,
+                                capture_output=True, text=True, check=True)
+        elapsed, loaded = result.stdout.splitlines()
+        self.assertLess(float(elapsed), self.IMPORT_BUDGET)
+        self.assertEqual(loaded, "")
+    
+    def test_construction_budget(self):
+        # constructing a headless Music does no file or device access
+        t = time.perf_counter()
+        muz = Music.Music(isPrint=False, headless=True)
+        elapsed = time.perf_counter() - t
+        self.assertLess(elapsed, self.CONSTRUCTION_BUDGET)
+        self.assertIsNone(muz._manager)
+        self.assertIsNotNone(muz.manager.get_music_by_name("doremi"))
+    
+    def test_headless_render_without_playback(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        waves = muz.music_notes_to_waves("C4/4 D4/4 E4/4 F4/4", tempo=120, instrument="organ")
+        self.assertEqual(len(waves), 4 * 22050)
+        with self.assertRaises(RuntimeError):
+            muz.play_wave(waves)
+    
+    """
+    #
+    #    testing the shared music library
+    #
+    """
+    
+    def _write_library(self, path, names):
+        with open(path, "w") as file:
+            json.dump([{"name": n, "notes": "C4/4", "signature": "4/4", "tempo": 60} for n in names], file)
+    
+    def test_library_shared_across_instances(self):
+        first = Music.Music(isPrint=False, headless=True).manager
+        second = Music.Music(isPrint=False, headless=True).manager
+        self.assertIsNot(first, second)
+        self.assertIs(first.get_music_by_name("doremi"), second.get_music_by_name("doremi"))
+    
+    def test_library_invalidated_on_change(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "library.json")
+            self._write_library(path, ["a"])
+            library = MusicLibrary.load(path)
+            self.assertIs(MusicLibrary.load(path), library)
+            # touched but unchanged content keeps the parsed view
+            os.utime(path, ns=(0, 12345))
+            self.assertIs(MusicLibrary.load(path), library)
+            self._write_library(path, ["a", "b"])
+            os.utime(path, ns=(0, 67890))
+            reloaded = MusicLibrary.load(path)
+            self.assertIsNot(reloaded, library)
+            self.assertIsNotNone(reloaded.get_music_by_name("b"))
+            manager = MusicManager(path)
+            manager.load_data()
+            self.assertEqual(len(manager.get_all_music()), 2)
+    
+    def test_library_concurrent_construction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "library.json")
+            self._write_library(path, ["n%d" % i for i in range(200)])
+            libraries = []
+            def load():
+                libraries.append(MusicLibrary.load(path))
+            threads = [threading.Thread(target=load) for _ in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(set(map(id, libraries))), 1)
+    
+    """
+    #
+    #    testing instrumentation
+    #
+    """
+    
+    def test_stats_disabled_by_default(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        self.assertFalse(muz.stats.enabled)
+        muz.music_notes_to_waves("C4/4 D4/4", tempo=120, instrument="organ")
+        self.assertEqual(muz.stats.as_dict()["stages"], {})
+    
+    def test_stats_records_render_stages(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        stats = muz.enable_stats()
+        waves = muz.music_notes_to_waves("C4/4 D4/4 C4/4 rest/4", tempo=120, instrument="organ")
+        muz.apply_echo(waves)
+        report = stats.as_dict()
+        for stage in ("parse", "pitch", "synthesis:organ", "effect:echo"):
+            self.assertIn(stage, report["stages"])
+        # notes synthesized straight into the buffer have no separate mix step
+        self.assertNotIn("mix", report["stages"])
+        self.assertEqual(report["stages"]["synthesis:organ"]["calls"], 3)
+        self.assertEqual(report["samples"]["organ"] + report["samples"]["rest"], len(waves))
+        self.assertEqual(report["cache"]["pitch"], {"hits": 1, "misses": 2})
+        self.assertEqual(report["peak_bytes"]["render"], waves.nbytes)
+        self.assertEqual(stats.events[-1]["event"], "render")
+        # a note cut by a section is copied in, and only that copy is timed as mix
+        muz.render_section("C4/2 D4/2 | E4/1", start_seconds=0.5, tempo=120, instrument="organ")
+        self.assertEqual(stats.as_dict()["stages"]["mix"]["calls"], 1)
+        muz.disable_stats()
+        self.assertFalse(muz.stats.enabled)
+    
+    def test_repeated_measures_render_once(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "|: C4/4 E4/4 G4/4 C5/4 | E4/2 G4/4 rest/4 :| A4/4 A4/4 A4/4 A4/4 | E4/2 G4/4 rest/4 | C4/1"
+        stats = muz.enable_stats()
+        wave = muz.render(notes, instrument="violin")
+        self.assertEqual((stats.counters["measures"], stats.counters["measures_copied"]), (7, 3))
+        self.assertAlmostEqual(stats.as_dict()["dedup_ratio"], 3 / 7)
+        self.assertIn("dedup ratio", stats.report())
+        self.assertEqual(stats.events[-2]["event"], "dedup")
+        # copies are exact: the same as synthesizing every note
+        events = list(muz.notes_to_events(muz.parse_music(notes), 120))
+        expected = np.zeros(len(wave), dtype=np.float32)
+        violin = Instruments.get_instrument("violin")
+        for event in events:
+            violin.render_into(expected[event['start_sample']:], event['frequency'],
+                               event['end_sample'] - event['start_sample'], 0.5)
+        np.testing.assert_array_equal(wave, expected)
+        # noise instruments and release tails are always synthesized
+        stats.reset()
+        muz.render(notes, instrument="guitar")
+        muz.render(notes, instrument="organ", release=True)
+        self.assertEqual(stats.counters.get("measures_copied", 0), 0)
+    
+    def test_memory_budget(self):
+        # the main entry points stay within the peak memory per audio second of the stored budget
+        import importlib.util
+        bench_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmark")
+        spec = importlib.util.spec_from_file_location("mem_music", os.path.join(bench_dir, "mem-music.py"))
+        harness = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(harness)
+        with open(harness.DEFAULT_BUDGET) as file:
+            budget = json.load(file)
+        muz = Music.Music(isPrint=False, headless=True)
+        names = ("render/mozart", "music_notes_to_waves/", "generate_wave/piano", "apply_reverb/", "save_audio/wav")
+        entries = [entry for entry in harness.collect_entry_points(muz, budget["meta"]["scale"])
+                   if entry[0].startswith(names)]
+        results = harness.run_entry_points(entries)
+        self.assertEqual(len(results), len(names))
+        self.assertEqual(harness.check(results, budget), [])
+        # a render keeps little more than its float32 output
+        render = next(result for name, result in results.items() if name.startswith("render/"))
+        self.assertLess(render["peak_bytes"], 1.25 * render["retained_bytes"])
+    
+    """
+    #
+    #    testing the score parser
+    #
+    """
+    
+    def test_parse_durations_in_ticks(self):
+        ppq = ScoreParser.PPQ
+        measures = self.muz.parse_music("C4/4 D4/2. E4/8 | F4/2+8 rest/8 Bb3/4")
+        self.assertEqual([n['ticks'] for n in measures[0]], [ppq, 3 * ppq, ppq // 2])
+        self.assertEqual([n['ticks'] for n in measures[1]], [2 * ppq + ppq // 2, ppq // 2, ppq])
+        self.assertEqual([n['midi'] for n in measures[1]], [65, None, 58])
+    
+    def test_parse_notes_without_duration(self):
+        # twinkle_twinkle writes bare pitches; they take the previous note value
+        music = self.muz.manager.get_music_by_name("twinkle_twinkle")
+        measures = self.muz.parse_music(music.notes)
+        self.assertEqual(sum(len(m) for m in measures), 28)
+        self.assertEqual(measures[-1][-1]['ticks'], 3 * ScoreParser.PPQ // 2)
+        self.assertEqual(self.muz.parse_music("C4/8 D4 E4/2 F4")[0][1]['ticks'], ScoreParser.PPQ // 2)
+    
+    def test_parse_tie_merges_events(self):
+        measures = self.muz.parse_music("C4/2 G4/2~ | G4/4 rest/2.")
+        self.assertTrue(measures[0][1]['tie'])
+        events = list(self.muz.notes_to_events(measures, 60))
+        self.assertEqual([e['pitch'] for e in events], ["C4", "G4", "rest"])
+        self.assertAlmostEqual(events[1]['duration'], 3.0)
+        # the merge ends with the first untied continuation; later notes of the pitch stand alone
+        events = list(self.muz.notes_to_events(self.muz.parse_music("C4/4~ C4/4 C4/4 C4/4~ | C4/4 C4/2."), 60))
+        self.assertEqual([(e['pitch'], e['duration']) for e in events],
+                         [("C4", 2.0), ("C4", 1.0), ("C4", 2.0), ("C4", 3.0)])
+    
+    def test_parse_error_position(self):
+        with self.assertRaises(ScoreSyntaxError) as context:
+            self.muz.parse_music("C4/4 D4/4 |\nE4/4 H4/4 F4/4")
+        self.assertEqual(context.exception.token, "H4/4")
+        self.assertEqual((context.exception.line, context.exception.column), (2, 6))
+        self.assertEqual(context.exception.position, 17)
+        score = ScoreParser().parse("C4/4 X E4/3x", strict=False)
+        self.assertEqual([e.token for e in score.errors], ["X", "E4/3x"])
+        self.assertEqual(len(score.measures[0]), 1)
+    
+    def test_parse_repeats_and_endings(self):
+        def played(notes):
+            return " | ".join(" ".join(n['pitch'] for n in measure) for measure in self.muz.parse_music(notes))
+        self.assertEqual(played("C4 |: D4 | E4 :| F4"), "C4 | D4 | E4 | D4 | E4 | F4")
+        self.assertEqual(played("C4 | D4/4:| F4"), "C4 | D4 | C4 | D4 | F4")
+        self.assertEqual(played("|: A4 | [1 B4 :| [2 C5 || D5"), "A4 | B4 | A4 | C5 | D5")
+        self.assertEqual(played("|: A4 [1 B4 :| [2 C5 :| [3 D5 | E5"), "A4 | B4 | A4 | C5 | A4 | D5 | E5")
+        self.assertEqual(played("|: A4 :|: B4 :| C5"), "A4 | A4 | B4 | B4 | C5")
+        self.assertEqual(played("|: C4 [1,2 D4 :| [3 E4"), "C4 | D4 | C4 | D4 | C4 | E4")
+        score = ScoreParser().parse("G4/2 |: E4/2 G4/4 :| A4/2.")
+        self.assertEqual((len(score.written), score.order), (3, [0, 1, 1, 2]))
+        with self.assertRaises(ScoreSyntaxError):
+            ScoreParser().parse("C4 [0 D4")
+        # an ending followed by another one without ":|" is an error, not a silent drop of the later notes
+        with self.assertRaises(ScoreSyntaxError) as raised:
+            ScoreParser().parse("[1 A4 | [2 B4")
+        self.assertEqual((raised.exception.token, raised.exception.column), ("[1", 1))
+        score = ScoreParser().parse("[1 A4 | [2 B4", strict=False)
+        self.assertEqual(([n['pitch'] for m in score.measures for n in m], len(score.errors)), (["A4", "B4"], 1))
+        # a repeated measure is validated once, as written
+        issues = ScoreValidator.validate_music({"name": "r", "signature": "3/4", "tempo": 90, "instruments": [],
+                                                "notes": "C4/2. |: D4/2 :| E4/2."})
+        self.assertEqual([(i['code'], i['measure']) for i in issues], [("measure_underflow", 2)])
+    
+    def test_format_duration_round_trip(self):
+        parser = ScoreParser()
+        for text in ["1", "2", "4", "8", "16", "2.", "4.", "3", "4+16", "1+1"]:
+            self.assertEqual(parser.format_duration(parser._duration(text)[0]), text)
+        self.assertEqual(parser.duration_to_ticks("8.."), parser._duration("8.+32")[0])
+    
+    """
+    #
+    #    testing sample-accurate scheduling
+    #
+    """
+    
+    def test_events_are_contiguous_without_drift(self):
+        # 3000 sixteenth triplets at an awkward tempo: no truncation error may accumulate
+        tempo, sample_rate = 97, 44100
+        measures = self.muz.parse_music(" | ".join(["C4/24 E4/24 G4/24"] * 1000))
+        events = list(self.muz.notes_to_events(measures, tempo, sample_rate=sample_rate))
+        self.assertEqual(len(events), 3000)
+        for previous, event in zip(events, events[1:]):
+            self.assertEqual(previous['end_sample'], event['start_sample'])
+        for event in events[::97]:
+            exact = Fraction(event['start_tick'] * sample_rate * 60, tempo * ScoreParser.PPQ)
+            self.assertLessEqual(abs(event['start_sample'] - exact), Fraction(1, 2))
+        exact_end = Fraction(3000 * ScoreParser.PPQ // 6 * sample_rate * 60, tempo * ScoreParser.PPQ)
+        self.assertEqual(events[-1]['end_sample'], round(exact_end))
+    
+    def test_render_length_matches_schedule(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        waves = muz.music_notes_to_waves("C4/16 " * 33, tempo=133, instrument="organ")
+        self.assertEqual(len(waves), round(Fraction(33 * 44100 * 60, 133 * 4)))
+
+    """
+    #
+    #    testing the reentrant render API
+    #
+    """
+
+    def test_render_context(self):
+        muz = Music.Music("3/4", isPrint=False, headless=True)
+        context = muz.context(tempo=90, instrument="Organ")
+        self.assertEqual((context.signature, context.instrument), ("3/4", "organ"))
+        self.assertEqual(context.beats_per_measure, Fraction(3, 4))
+        with self.assertRaises(AttributeError):
+            context.tempo = 60
+        self.assertEqual(context.replace(tempo=60).tempo, 60)
+        self.assertEqual(context.tempo, 90)
+        with self.assertRaises(ValueError):
+            RenderContext(signature="3-4")
+        with self.assertRaises(ValueError):
+            context.replace(tempo=0)
+        notes = "C4/4 E4/4 G4/4 | C5/2."
+        np.testing.assert_array_equal(muz.render(notes, context),
+                                      muz.music_notes_to_waves(notes, tempo=90, instrument="organ"))
+        np.testing.assert_array_equal(muz.render(notes, context, tempo=60), muz.render(notes, context.replace(tempo=60)))
+        half = muz.render(notes, context, sample_rate=22050)
+        self.assertEqual(len(half), len(muz.render(notes, context)) // 2)
+        # helpers taking a time signature leave the object's own unchanged
+        muz.canonize_music(notes, time_signature="4/4")
+        muz.align_measures(notes, "2/4")
+        self.assertEqual((muz.time_signature, muz.beats_per_measure), ("3/4", Fraction(3, 4)))
+
+    def test_concurrent_renders_match_serial(self):
+        from concurrent.futures import ThreadPoolExecutor
+        muz = Music.Music(isPrint=False, headless=True)
+        muz.enable_stats()
+        pieces = ["C4/8 D4/8 E4/4 G4/4 | A4/2 rest/4 C5/4", "E4/4. D4/8 C4/2 | G3/4~ G3/8 B3/8 D4/2",
+                  "F#4/16 " * 16 + "| Bb3/1"]
+        contexts = [RenderContext("4/4", tempo, instrument, volume, sample_rate, release)
+                    for tempo, instrument, volume, sample_rate, release in
+                    [(120, "organ", 0.5, 44100, False), (97, "bell", 0.3, 44100, True),
+                     (140, "piano", 0.7, 22050, False), (75, "violin", 0.5, 48000, False),
+                     (110, "bass", 0.6, 44100, True)]]
+        jobs = [(notes, context) for notes in pieces for context in contexts] * 4
+        serial = [muz.render(notes, context) for notes, context in jobs]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            concurrent = list(pool.map(lambda job: muz.render(*job), jobs))
+        for expected, wave in zip(serial, concurrent):
+            np.testing.assert_array_equal(wave, expected)
+        self.assertEqual(muz.stats.counters["renders"], 2 * len(jobs))
+
+    def test_seeded_noise_is_reproducible(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        drum = Instruments.get_instrument("drum")
+        first, second = np.empty(1000, dtype=np.float32), np.empty(1000, dtype=np.float32)
+        drum.render_into(first, 100.0, 1000, seed=(3, 0))
+        drum.render_into(second, 100.0, 1000, seed=(3, 0))
+        np.testing.assert_array_equal(first, second)
+        # every range of a seeded render equals the same samples of the whole render
+        context = RenderContext(instrument="harmonica", release=True, seed=11)
+        notes = "C4/8 D4/8 E4/4 | G4/2 C5/2 | " * 2
+        events = list(muz.notes_to_events(muz.parse_music(notes), context.tempo))
+        whole = muz.render(notes, context)
+        cut = events[5]['start_sample']
+        parts = [muz.render_events(events, context.instrument, context.volume, start, end, release=True, seed=11)
+                 for start, end in [(0, cut), (cut, len(whole))]]
+        np.testing.assert_array_equal(np.concatenate(parts), whole)
+        self.assertFalse(np.array_equal(whole, muz.render(notes, context, seed=12)))
+
+    def test_parallel_render_matches_serial(self):
+        from ParallelRender import ParallelRenderer
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = " | ".join(["C4/8 D4/8 E4/4 G4/4~ G4/8 rest/8", "A4/2 F4/4 C5/4", "B3/4. D4/8 G4/2"] * 8)
+        with ParallelRenderer(workers=2) as renderer:
+            for context in [RenderContext("4/4", 150, "drum", seed=1),
+                            RenderContext("4/4", 150, "flute", release=True, seed=2),
+                            RenderContext("4/4", 150, "organ", 0.8, 22050)]:
+                timeline = muz.timeline(notes, context)
+                self.assertGreater(len(renderer.plan(timeline.measure_starts, timeline.end_sample,
+                                                     context.sample_rate)), 3)
+                np.testing.assert_array_equal(renderer.render(notes, context), muz.render(notes, context))
+
+    def test_render_async_and_blocks(self):
+        import asyncio
+        muz = Music.Music(isPrint=False, headless=True)
+        context = RenderContext(instrument="drum", release=True, seed=5)
+        pieces = ["C4/4 E4/4 G4/4 C5/4 | " * n for n in range(1, 9)]
+
+        async def main():
+            waves = await asyncio.gather(*[muz.render_async(notes, context) for notes in pieces])
+            blocks = [block async for block in muz.render_blocks(pieces[-1], context, block_seconds=3.0)]
+            return waves, blocks
+
+        waves, blocks = asyncio.run(main())
+        for notes, wave in zip(pieces, waves):
+            np.testing.assert_array_equal(wave, muz.render(notes, context))
+        self.assertEqual(len(blocks), 4)
+        np.testing.assert_array_equal(np.concatenate(blocks), waves[-1])
+
+    def test_play_async_concurrent_and_cancelled(self):
+        import asyncio
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/8 E4/8 G4/4 rest/4 C5/4 | " * 4
+        context = RenderContext(instrument="organ")
+        expected = muz.render(notes, context)
+
+        async def main():
+            # the loop keeps ticking while sixteen plays run on the default executor
+            gaps = []
+            async def ticker():
+                last = time.perf_counter()
+                while True:
+                    await asyncio.sleep(0.005)
+                    now = time.perf_counter()
+                    gaps.append(now - last)
+                    last = now
+            ticking = asyncio.ensure_future(ticker())
+            outputs = [MemoryOutput() for _ in range(16)]
+            played = await asyncio.gather(*[muz.play_async(notes, context, output=output) for output in outputs])
+            ticking.cancel()
+            # a paced play (8 s of music at 10x real time) is cancelled after 0.2 s
+            paced = NullOutput(speed=10)
+            task = asyncio.ensure_future(muz.play_async(notes * 2, context, output=paced))
+            await asyncio.sleep(0.2)
+            t = time.perf_counter()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return played, outputs, gaps, time.perf_counter() - t, paced
+
+        played, outputs, gaps, cancel_seconds, paced = asyncio.run(main())
+        self.assertEqual(played, [True] * 16)
+        for output in outputs:
+            np.testing.assert_array_equal(output.data(), expected)
+        # loose bounds: a blocked loop or a cancel waiting for the whole piece take far longer
+        self.assertLess(max(gaps), 1.0)
+        self.assertLess(cancel_seconds, 2.0)
+        self.assertFalse(paced.is_open)
+        self.assertLess(paced.seconds, 4.0)
+        self.assertEqual(muz._playbacks, set())
+
+    def test_play_async_cancelled_during_write(self):
+        import asyncio
+        muz = Music.Music(isPrint=False, headless=True)
+        entered, release = threading.Event(), threading.Event()
+        log = []
+
+        class BlockingOutput(MemoryOutput):
+            def write(self, wave):
+                entered.set()
+                release.wait()
+                log.append("write")
+                return super().write(wave)
+
+            def close(self):
+                log.append(("close", threading.current_thread() is threading.main_thread()))
+                return super().close()
+
+        async def main():
+            task = asyncio.ensure_future(muz.play_async("C4/4 E4/4", RenderContext(instrument="organ"),
+                                                        output=BlockingOutput()))
+            while not entered.is_set():
+                await asyncio.sleep(0.001)
+            task.cancel()
+            threading.Timer(0.1, release.set).start()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(main())
+        # the write in flight finished before the output was closed, off the event loop thread
+        self.assertEqual(log, ["write", ("close", False)])
+        self.assertEqual(muz._playbacks, set())
+
+    def test_stop_one_playback(self):
+        muz = Music.Music(isPrint=False, headless=True, output=NullOutput(speed=10))
+        stop = threading.Event()
+        threading.Timer(0.2, stop.set).start()
+        t = time.perf_counter()
+        self.assertTrue(muz.play_music_notes("C4/4 D4/4 E4/4 F4/4 | " * 4, tempo=120, instrument="organ", stop=stop))
+        self.assertLess(time.perf_counter() - t, 0.5)
+        self.assertLess(muz.output.seconds, 4.0)
+        # nothing is left registered once the playback has ended
+        self.assertFalse(muz.stop_playback)
+        self.assertEqual(muz._playbacks, set())
+
+    """
+    #
+    #    testing seek and loop playback
+    #
+    """
+    
+    def test_timeline_index(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/4 D4/4 E4/4 F4/4 | G4/2 rest/2 | C5/1"
+        timeline = muz.timeline(notes, tempo=120)
+        self.assertEqual((timeline.measures, timeline.measure_starts, timeline.end_sample),
+                         (3, [0, 88200, 176400], 264600))
+        self.assertEqual([timeline.measure_at(s) for s in (0, 88199, 88200, 300000)], [0, 0, 1, 2])
+        self.assertEqual(timeline.section(1, 2), (88200, 176400))
+        self.assertEqual(timeline.section(start_seconds=2.5), (110250, 264600))
+        self.assertEqual(timeline.section(end_measure=9), (0, 264600))
+        self.assertEqual([e['pitch'] for e in timeline.events_between(110250, 176401)], ["G4", "rest", "C5"])
+        with self.assertRaises(ValueError):
+            timeline.section(start_measure=1, start_seconds=1.0)
+        with self.assertRaises(ValueError):
+            timeline.section(2, 1)
+        # with release tails the notes ringing into a range are found too
+        notes = "C4/4 D4/4 E4/4 F4/4 | G4/8 rest/8 rest/4 rest/2"
+        ringing = muz.timeline(notes, tempo=120, instrument="bell", release=True)
+        self.assertIn("G4", [e['pitch'] for e in ringing.events_between(99300, 99400)])
+        self.assertEqual([e['pitch'] for e in muz.timeline(notes, tempo=120).events_between(99300, 99400)],
+                         ["rest"])
+    
+    def test_timeline_tie_across_bar_line(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/1~ | C4/1 | D4/1 | E4/1"
+        timeline = muz.timeline(notes, tempo=120)
+        self.assertEqual((timeline.measures, timeline.measure_starts), (4, [0, 88200, 176400, 264600]))
+        self.assertEqual(timeline.section(2, 3), (176400, 264600))
+        self.assertEqual([e['pitch'] for e in timeline.events_between(176400, 264600)], ["D4"])
+        full = muz.render(notes, tempo=120)
+        np.testing.assert_array_equal(muz.render_section(notes, start_measure=2, tempo=120), full[176400:])
+        self.assertEqual(muz.measure_ranges(timeline.measure_starts, timeline.end_sample, 1),
+                         [0, 88200, 176400, 264600, 352800])
+    
+    def test_render_section_matches_full_render(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/8 E4/8 G4/4 D4/4 B3/4 | " * 40
+        for context in [RenderContext(instrument="organ"), RenderContext(instrument="guitar", seed=5),
+                        RenderContext(instrument="bell", release=True)]:
+            full = muz.render(notes, context)
+            timeline = muz.timeline(notes, context)
+            start, end = timeline.measure_starts[30], timeline.measure_starts[33]
+            np.testing.assert_array_equal(muz.render_section(notes, context, 30, 33), full[start:end])
+            np.testing.assert_array_equal(muz.render_section(notes, context, start_seconds=61.3), full[2703330:])
+        # only the section is synthesized
+        stats = muz.enable_stats()
+        muz.render_section(notes, RenderContext(instrument="organ"), 39)
+        self.assertEqual(stats.samples["organ"], 88200)
+    
+    def test_play_section_and_loop(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/4 D4/4 E4/4 F4/4 | G4/2 A4/4 B4/4 | C5/2. rest/4 | " * 4
+        context = RenderContext(instrument="organ", tempo=120)
+        full = muz.render(notes, context)
+        memory = muz.set_output("memory")
+        stats = muz.enable_stats()
+        self.assertTrue(muz.play_music_notes(notes, tempo=120, instrument="organ", start_measure=10, end_measure=12))
+        np.testing.assert_array_equal(memory.data(), full[10 * 88200:12 * 88200])
+        self.assertEqual(stats.samples["organ"], 2 * 88200 - 22050)    # nothing else is synthesized
+        self.assertTrue(muz.play_music_notes(notes, tempo=120, instrument="organ", start_seconds=20.25))
+        np.testing.assert_array_equal(memory.data(), full[893025:])
+        # a loop is rendered once and replayed
+        self.assertTrue(muz.play_music_notes(notes, tempo=120, instrument="organ", start_measure=1,
+                                             end_measure=2, loops=3))
+        np.testing.assert_array_equal(memory.data(), np.tile(full[88200:176400], 3))
+        self.assertTrue(muz.play_wave(full, start_sample=100, end_sample=5000, loops=2))
+        np.testing.assert_array_equal(memory.data(), np.r_[full[100:5000], full[100:5000]])
+        # an endless loop runs until it is stopped
+        muz.set_output(NullOutput(speed=20))
+        stop = threading.Event()
+        threading.Timer(0.3, stop.set).start()
+        self.assertTrue(muz.play_music_notes(notes, tempo=120, instrument="organ", start_measure=2,
+                                             end_measure=3, loops=0, stop=stop))
+        self.assertGreater(muz.output.seconds, 2.0)
+    
+    """
+    #
+    #    testing the instrument registry
+    #
+    """
+    
+    def test_instruments_render_into(self):
+        out = np.full(1000, 9.0, dtype=np.float32)
+        for name in Instruments.instrument_names():
+            instrument = Instruments.get_instrument(name)
+            self.assertIs(instrument, Instruments.get_instrument(name.upper()))
+            instrument.render_into(out[100:], 440.0, 800, 0.5)
+            self.assertTrue(np.all(out[:100] == 9.0) and np.all(out[900:] == 9.0), name)
+            self.assertTrue(np.all(np.abs(out[100:900]) <= 1.0), name)
+        # longer than the precomputed tables, and silence for a rest frequency
+        long_note = Instruments.get_instrument("organ").render_into(np.empty(200000, np.float32), 220.0, 200000)
+        self.assertGreater(np.max(np.abs(long_note[-1000:])), 0.1)
+        self.assertFalse(Instruments.get_instrument("bell").render_into(out, 0, 1000).any())
+        # unknown instruments fall back to a sine, as generate_wave always did
+        self.assertIsInstance(Instruments.get_instrument("kazoo"), Instruments.Instrument)
+    
+    def test_register_instrument(self):
+        registry = Instruments.InstrumentRegistry()
         
+        class Square(Instruments.Instrument):
+            def oscillate(self, freq, t):
+                return np.sign(np.sin(2 * np.pi * freq * t))
+        
+        registry.register("square", Square)
+        self.assertIn("square", registry)
+        wave = registry.get("square").render_into(np.empty(441, np.float32), 100.0, 441, 0.25)
+        self.assertEqual(sorted(set(np.round(wave, 6).tolist())), [-0.25, 0.0, 0.25])
+        self.assertNotIn("square", Instruments.REGISTRY)
+        # generate_wave goes through the default registry
+        muz = Music.Music(isPrint=False, headless=True)
+        out = np.empty(4410, np.float32)
+        Instruments.get_instrument("violin").render_into(out, 440.0, 4410, 0.5)
+        np.testing.assert_array_equal(muz.generate_wave(440.0, 0.1, "violin"), out)
+
+    def test_float32_precision(self):
+        # high and low notes longer than the tables, against the float64 reference
+        bounds = {"piano": 1e-5, "organ": 2e-5, "bass": 1e-5, "bell": 1e-5, "violin": 1e-5, "flute": 1e-4,
+                  "harmonica": 1e-5, "guitar": 1e-5, "angklung": 1e-5, "drum": 1e-5, "sine": 1e-5}
+        n = 6 * 44100
+        for name, bound in bounds.items():
+            reference = Instruments.get_instrument(name)
+            single = Instruments.get_instrument(name, precision="float32")
+            self.assertEqual((single.dtype, single.time(10).dtype), (np.float32, np.float32))
+            for freq in (110.0, 4186.01):
+                expected = reference.render_into(np.empty(n, np.float32), freq, n, seed=(7, 0))
+                wave = single.render_into(np.empty(n, np.float32), freq, n, seed=(7, 0))
+                error = np.abs(wave - expected)
+                if name in ("piano", "violin"):
+                    # the square and the sawtooth jump; only a sample at a jump may land on the other side
+                    self.assertLess(np.count_nonzero(error > bound), 100, name)
+                    error = error[error <= bound]
+                self.assertLessEqual(error.max(), bound, (name, freq))
+        # the time base is shared and read-only
+        self.assertIs(Instruments.get_instrument("bell", precision="float32")._t, single._t)
+        self.assertFalse(single._t.flags.writeable)
+        # through a render context
+        muz = Music.Music(isPrint=False, headless=True)
+        context = RenderContext("3/4", 90, "organ")
+        notes = "C4/4 E4/4 G4/4 | C8/2."
+        np.testing.assert_allclose(muz.render(notes, context, precision="float32"), muz.render(notes, context),
+                                   atol=2e-5)
+        np.testing.assert_allclose(muz.generate_wave(4186.01, 5.0, "bell", precision="float32"),
+                                   muz.generate_wave(4186.01, 5.0, "bell"), atol=1e-5)
+        with self.assertRaises(ValueError):
+            context.replace(precision="float16")
+
+    def test_release_tails_overlap_add(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C5/4 rest/4 E5/4"
+        dry = muz.music_notes_to_waves(notes, tempo=120, instrument="bell")
+        wet = muz.music_notes_to_waves(notes, tempo=120, instrument="bell", release=True)
+        # the bell rings on into the rest instead of being cut at the note end
+        self.assertFalse(dry[22050:44100].any())
+        self.assertGreater(np.max(np.abs(wet[22050:22550])), 0.5 * np.max(np.abs(dry[21550:22050])))
+        np.testing.assert_allclose(wet[:22050], dry[:22050], atol=1e-6)
+        # the last tail extends the wave and is cut once below the threshold
+        bell = Instruments.get_instrument("bell")
+        self.assertEqual(len(wet), 3 * 22050 + bell.tail_samples(22050, 0.5, 1e-3))
+        self.assertLess(np.max(np.abs(wet[-100:])), 1e-3)
+        # rendering in ranges gives the same samples
+        events = list(muz.notes_to_events(muz.parse_music(notes), 120))
+        parts = [muz.render_events(events, "bell", 0.5, lo, hi, release=True)
+                 for lo, hi in [(0, 30000), (30000, 70000), (70000, len(wet))]]
+        np.testing.assert_array_equal(np.concatenate(parts), wet)
+    
+    """
+    #
+    #    testing bulk score transforms
+    #
+    """
+    
+    def test_canonize_music(self):
+        canonical = self.muz.canonize_music("Bbb3/4 Cx4/8. E#4/16 | rest/2", time_signature="2/4")
+        self.assertEqual(canonical, "A3/4 D4/8. F4/16 | \nrest/2")
+        # the notes are re-barred to the time signature given
+        self.assertEqual(self.muz.canonize_music("C4/2 D4/2 | E4/1", time_signature="3/4"),
+                         "C4/2 D4/4~ | \nD4/4 E4/2~ | \nE4/2")
+        self.assertEqual(self.muz.canonize_music("C4/2 D4/2"), "C4/2 D4/2")
+        with self.assertWarns(DeprecationWarning):
+            self.muz.canonize_music("C4/2 D4/2", 120, "4/4")
+    
+    def test_transpose_and_rebar(self):
+        transform = ScoreTransform()
+        notes = transform.apply(["C4/2 D4/2. E4/4 | F4/1"], semitones=2, time_signature="3/4")
+        self.assertEqual(notes, ["D4/2 E4/4~ | E4/2 F#4/4 | G4/2.~ | G4/4"])
+        with self.assertRaises(ValueError):
+            transform.apply(["C9/4"], semitones=12)
+    
+    def test_align_measures_ties_across_bars(self):
+        measures = self.muz.align_measures("C4/2. D4/2 E4/4", "3/4")
+        self.assertEqual([[(n['pitch'], n['ticks'], n['tie']) for n in m] for m in measures],
+                         [[("C4", 2880, False)], [("D4", 1920, False), ("E4", 960, False)]])
+        measures = self.muz.align_measures("C4/1", "3/4")
+        events = list(self.muz.notes_to_events(measures, 60))
+        self.assertEqual(len(events), 1)
+        self.assertAlmostEqual(events[0]['duration'], 4.0)
+    
+    def test_apply_library_batch(self):
+        manager = MusicManager("music_data.json")
+        manager.load_data()
+        shared_doremi = manager.get_music_by_name("doremi")
+        transformed = ScoreTransform().apply_library(manager, semitones=-12, time_signature="2/4", tempo_scale=2)
+        doremi = manager.get_music_by_name("doremi")
+        self.assertEqual(len(transformed), len(manager.get_all_music()))
+        self.assertEqual((doremi.signature, doremi.tempo), ("2/4", 120))
+        self.assertTrue(doremi.notes.startswith("rest/4 C3/4 | D3/4 E3/4"))
+        # the shared library view is untouched
+        self.assertEqual(shared_doremi.tempo, 60)
+        self.assertEqual(Music.Music(headless=True).manager.get_music_by_name("doremi").tempo, 60)
+    
+    """
+    #
+    #    testing library validation
+    #
+    """
+    
+    def test_validate_music_issues(self):
+        issues = ScoreValidator.validate_music({
+            "name": "broken", "signature": "3/4", "tempo": 90, "instruments": ["Piano", "kazoo"],
+            "notes": "rest/4 C4/4 | C4/2 D4/4 | E4/4 | F4/2 G4/2 |\nX9 A0/4 C0/4 Bb0/4 | C1/4"})
+        codes = [(i['code'], i['severity'], i['measure']) for i in issues]
+        self.assertEqual([i['message'] for i in issues if i['code'] == "unknown_instrument"],
+                         ["unknown instrument 'kazoo'"])
+        self.assertIn(("measure_underflow", "warning", 1), codes)
+        self.assertIn(("measure_underflow", "error", 3), codes)
+        self.assertIn(("measure_overflow", "error", 4), codes)
+        self.assertIn(("syntax", "error", None), codes)
+        self.assertIn(("pitch_range", "error", 5), codes)
+        # the out-of-range note is located like a syntax error: C0/4 on line 2, column 9
+        self.assertEqual([(i['line'], i['column']) for i in issues if i['code'] == "pitch_range"], [(2, 9)])
+        self.assertIn(("measure_underflow", "warning", 6), codes)
+        self.assertNotIn(("measure_underflow", "error", 2), codes)
+    
+    def test_validate_library_parallel(self):
+        manager = Music.Music(headless=True).manager
+        serial = ScoreValidator.validate_library(manager, workers=1)
+        parallel = ScoreValidator.validate_library(manager, workers=2)
+        self.assertEqual(serial.as_dict(), parallel.as_dict())
+        self.assertEqual(serial.exit_code, 1)
+        self.assertEqual({i['piece'] for i in serial.errors}, {"twinkle_twinkle"})
+        clean = [m.get_music() for m in manager.get_all_music() if m.name != "twinkle_twinkle"]
+        self.assertEqual(ScoreValidator.validate_library(clean, workers=2).exit_code, 0)
+    
+    """
+    #
+    #    testing MIDI export and import
+    #
+    """
+    
+    def test_midi_round_trip(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            for music in muz.manager.get_all_music():
+                if music.name == "twinkle_twinkle":
+                    continue
+                for midi_type in (0, 1):
+                    filename = os.path.join(tmp, f"{music.name}.mid")
+                    muz.save_midi(filename, music.notes, tempo=music.tempo, signature=music.signature,
+                                  midi_type=midi_type)
+                    loaded = muz.load_midi(filename)
+                    self.assertEqual((loaded.signature, loaded.tempo), (music.signature, music.tempo))
+                    # same notes at the same ticks (consecutive rests may be merged)
+                    self.assertEqual(self._note_onsets(muz, loaded.notes), self._note_onsets(muz, music.notes))
+    
+    def _note_onsets(self, muz, music_notes):
+        events = list(muz.notes_to_events(muz.parse_music(music_notes), 60))
+        onsets = [(e['pitch'], e['start_tick'], e['ticks']) for e in events if e['type'] == 'note']
+        return onsets, events[-1]['start_tick'] + events[-1]['ticks']
+    
+    def test_midi_reader_running_status_and_chords(self):
+        # type 0, 96 ticks per quarter, running status, note-on velocity 0 as note-off, a C-E-G chord
+        track = bytes([0x00, 0x90, 60, 80, 0x00, 64, 80, 0x00, 67, 80,
+                       0x60, 60, 0, 0x00, 64, 0, 0x00, 67, 0,
+                       0x60, 0x80, 62, 0, 0x00, 0xff, 0x2f, 0x00])
+        data = b"MThd" + bytes([0, 0, 0, 6, 0, 0, 0, 1, 0, 96]) + b"MTrk" + len(track).to_bytes(4, "big") + track
+        music = MidiFile.MidiFile().from_bytes(data)
+        self.assertEqual(music["notes"], "G4/4 rest/4")
+        self.assertEqual((music["tempo"], music["signature"]), (120, "4/4"))
+    
+    def test_midi_import_directory(self):
+        midi_file = MidiFile.MidiFile()
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(6):
+                midi_file.write(os.path.join(tmp, f"piece{i}.mid"), f"C4/4 D4/4 E4/{2 ** (i % 3)}", tempo=100 + i)
+            with open(os.path.join(tmp, "broken.mid"), "wb") as file:
+                file.write(b"not midi")
+            manager = MusicManager(os.path.join(tmp, "library.json"))
+            added, failed = MidiFile.import_directory(manager, tmp, workers=2, max_pending=2)
+            self.assertEqual(sorted(m.name for m in added), [f"piece{i}" for i in range(6)])
+            self.assertEqual([os.path.basename(path) for path, _ in failed], ["broken.mid"])
+            self.assertEqual(manager.get_music_by_name("piece5").tempo, 105)
+    
+    """
+    #
+    #    testing audio transcription
+    #
+    """
+    
+    def test_transcribe_round_trip(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/4 E4/4 G4/4 C5/4 | D5/2 B4/4 rest/4 | A4/8 G4/8 F4/4 E4/2 | C4/4 C4/4 D4/8 E4/8 F4/4"
+        for instrument, tempo in [("violin", 90), ("harmonica", 150), ("piano", 150), ("bass", 90)]:
+            wave = muz.render(notes, tempo=tempo, instrument=instrument)
+            t = time.perf_counter()
+            self.assertEqual(Transcriber(tempo).transcribe(wave), notes, instrument)
+            # faster than real time, even on a loaded machine
+            self.assertLess(time.perf_counter() - t, len(wave) / 44100)
+    
+    def test_transcribe_streaming_and_files(self):
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "G4/8 A4/8 B4/2 | D5/2."
+        wave = muz.render(notes, tempo=100, instrument="violin")
+        transcriber = Transcriber(100, "3/4")
+        whole, level = transcriber.track(wave)
+        blocks = [wave[i:i + 3000] for i in range(0, len(wave), 3000)]
+        streamed = np.concatenate([midi for midi, _ in transcriber.track_blocks(blocks)])
+        np.testing.assert_array_equal(streamed[:len(whole)], whole)
+        self.assertEqual(transcriber.transcribe_blocks(blocks), notes)
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "take.flac")
+            muz.save_audio(filename, np.stack([wave, wave], axis=1))
+            music = muz.load_audio(filename, tempo=100, signature="3/4", block_seconds=0.5)
+        self.assertEqual((music.name, music.notes, music.signature), ("take", notes, "3/4"))
+        self.assertEqual(transcriber.transcribe(np.zeros(1000, dtype=np.float32)), "")
+    
+    """
+    #
+    #    testing the waveform peak pyramid
+    #
+    """
+    
+    def test_wave_peaks_columns(self):
+        wave = np.random.default_rng(3).standard_normal(100_003).astype(np.float32)
+        peaks = WavePeaks.from_wave(wave, block=16, factor=4)
+        # every level holds the min/max of its blocks, the last one cut short
+        for index in range(peaks.levels):
+            size = 16 * 4 ** index
+            low, high = peaks.level(index)
+            self.assertEqual(len(low), -(-len(wave) // size))
+            self.assertEqual((low[-1], high[-1]), (wave[(len(low) - 1) * size:].min(), wave[(len(low) - 1) * size:].max()))
+        self.assertEqual(len(peaks.level(peaks.levels - 1)[0]), 1)
+        # each pixel covers the samples under it, and a whole-block view is exact
+        for start, end, pixels in [(0, len(wave), 300), (1234, 5678, 97), (0, 1600, 100), (99_000, 100_003, 40)]:
+            lows, highs = peaks.columns(start, end, pixels)
+            self.assertEqual(len(lows), pixels)
+            edges = start + (end - start) / pixels * np.arange(pixels + 1)
+            for p in range(pixels):
+                under = wave[int(edges[p]):int(np.ceil(edges[p + 1]))]
+                self.assertLessEqual(lows[p], under.min())
+                self.assertGreaterEqual(highs[p], under.max())
+        lows, highs = peaks.columns(0, 1600, 100)
+        np.testing.assert_array_equal(lows, wave[:1600].reshape(100, 16).min(axis=1))
+        # past the end is silence
+        self.assertEqual(peaks.columns(len(wave), 2 * len(wave), 10)[1].max(), 0)
+    
+    def test_wave_peaks_streaming(self):
+        import asyncio
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/4 E4/4 G4/4 C5/4 | " * 6
+        context = RenderContext(instrument="organ")
+        whole = WavePeaks.from_wave(muz.render(notes, context))
+        streamed = WavePeaks()
+        
+        async def follow():
+            async for block in muz.render_blocks(notes, context, block_seconds=1.0):
+                streamed.append(block)
+                self.assertEqual(streamed.columns(0, None, 50)[0].shape, (50,))
+        
+        asyncio.run(follow())
+        streamed.finish()
+        self.assertEqual(streamed.levels, whole.levels)
+        for index in range(whole.levels):
+            for a, b in zip(streamed.level(index), whole.level(index)):
+                np.testing.assert_array_equal(a, b)
+        with self.assertRaises(ValueError):
+            streamed.append(np.zeros(10))
+        # stereo waves are reduced over the channels too
+        stereo = WavePeaks.from_wave(np.stack([np.ones(128), -np.ones(128)], axis=1), block=64)
+        np.testing.assert_array_equal(stereo.columns(0, 128, 2)[0], [-1, -1])
+        # the measures the GUI highlights
+        self.assertEqual(muz.measure_starts(notes, context), [i * 88200 for i in range(6)])
+    
+    """
+    #
+    #    testing compressed audio export
+    #
+    """
+    
+    def test_save_audio_formats(self):
+        import soundfile as sf
+        muz = Music.Music(isPrint=False, headless=True)
+        waves = muz.music_notes_to_waves("C4/4 E4/4 G4/4 C5/4 | " * 8, tempo=120, instrument="organ")
+        with tempfile.TemporaryDirectory() as tmp:
+            for extension in ("wav", "flac", "ogg"):
+                filename = os.path.join(tmp, f"song.{extension}")
+                stats = muz.save_audio(filename, waves)
+                data, sample_rate = sf.read(filename)
+                self.assertEqual((len(data), sample_rate), (len(waves), 44100))
+                self.assertEqual(stats["frames"], len(waves))
+                if extension != "wav":
+                    self.assertGreater(stats["compression_ratio"], 1.5)
+            with self.assertRaises(ValueError):
+                muz.save_audio(os.path.join(tmp, "song.xyz"), waves)
+    
+    def test_save_audio_background(self):
+        import soundfile as sf
+        muz = Music.Music(isPrint=False, headless=True)
+        loud = muz.music_notes_to_waves("C4/2 G4/2", tempo=120, instrument="organ") * 4
+        with tempfile.TemporaryDirectory() as tmp:
+            writers = [muz.save_audio(os.path.join(tmp, f"{i}.flac"), loud, background=True) for i in range(3)]
+            self.assertTrue(all(writer.stats is None for writer in writers))
+            for writer in writers:
+                self.assertGreater(writer.close()["throughput"], 1.0)
+            data, _ = sf.read(os.path.join(tmp, "2.flac"))
+            self.assertLessEqual(np.max(np.abs(data)), 1.0)
+        # the caller's array is not normalized in place
+        self.assertGreater(np.max(np.abs(loud)), 1.0)
+
+    """
+    #
+    #    testing multi-channel output
+    #
+    """
+    
+    def test_stereo_tracks_pan_and_gain(self):
+        import soundfile as sf
+        muz = Music.Music(isPrint=False, headless=True)
+        melody = muz.music_notes_to_waves("C5/4 E5/4 G5/4 C6/4", tempo=120, instrument="organ")
+        bass = muz.music_notes_to_waves("C3/1 | G2/1", tempo=120, instrument="bass")
+        mix = muz.music_tracks_to_waves([
+            {'notes': "C5/4 E5/4 G5/4 C6/4", 'instrument': "organ", 'pan': -1.0},
+            {'notes': "C3/1 | G2/1", 'instrument': "bass", 'pan': 0.0, 'gain': 0.5},
+        ], tempo=120)
+        self.assertEqual((mix.shape, mix.dtype), ((len(bass), 2), np.float32))
+        self.assertTrue(mix.flags.c_contiguous)
+        center = 0.5 * np.sqrt(0.5)
+        np.testing.assert_allclose(mix[:, 1], center * bass, atol=1e-6)
+        np.testing.assert_allclose(mix[:len(melody), 0], melody + center * bass[:len(melody)], atol=1e-6)
+        # the effects process every channel of the interleaved buffer
+        for effect in (muz.apply_echo, muz.apply_reverb, muz.apply_distortion):
+            np.testing.assert_allclose(effect(mix)[:, 1], effect(mix[:, 1].copy()), atol=1e-6)
+        # the interleaved buffer streams and saves without reshaping
+        self.assertEqual(len(Music.Music._frame_bytes(mix)), mix.nbytes)
+        self.assertTrue(np.shares_memory(np.frombuffer(Music.Music._frame_bytes(mix), np.float32), mix))
+        with tempfile.TemporaryDirectory() as tmp:
+            muz.save_audio(os.path.join(tmp, "stereo.flac"), mix)
+            data, _ = sf.read(os.path.join(tmp, "stereo.flac"))
+            self.assertEqual(data.shape, mix.shape)
+        np.testing.assert_allclose(Music.Music.pan_gains(0.5, 4), [0, 0, np.cos(np.pi / 8), np.sin(np.pi / 8)],
+                                   atol=1e-6)
+    
+    """
+    #
+    #    testing live play
+    #
+    """
+    
+    def test_live_synth_mixing_and_latency(self):
+        synth = LivePlay.LiveSynth("organ")
+        c4, e4 = synth.segment(60), synth.segment(64)
+        self.assertTrue(synth.press("a", when=10.0))
+        self.assertFalse(synth.press("a", when=10.01))   # auto-repeat
+        self.assertTrue(synth.press("d", when=10.0))
+        block = synth.render(128, output_delay=0.005, now=10.003)
+        np.testing.assert_allclose(block, np.clip(c4[:128] + e4[:128], -1, 1), atol=1e-6)
+        self.assertAlmostEqual(synth.latency_stats()["p50"], 8.0, places=6)
+        # a released key fades out and its voice ends
+        synth.release("a", when=10.5)
+        synth.release("d", when=10.5)
+        blocks = [synth.render(128, now=10.5) for _ in range(len(synth._fade) // 128 + 2)]
+        self.assertLess(np.max(np.abs(blocks[-1])), 1e-6)
+        self.assertEqual(synth.active_voices, 0)
+    
+    def test_live_synth_recording(self):
+        synth = LivePlay.LiveSynth("piano")
+        for key, start in (("a", 0.0), ("d", 0.5), ("g", 1.0)):
+            synth.press(key, when=start)
+            synth.render(64, now=start)
+            synth.release(key, when=start + 0.25)
+            synth.render(64, now=start + 0.25)
+        self.assertEqual(synth.recorded_notes(tempo=120), "C4/8 rest/8 E4/8 rest/8 G4/8")
+        manager = MusicManager(os.path.join(tempfile.gettempdir(), "live-session.json"))
+        music = synth.to_music("idea", tempo=120, manager=manager)
+        self.assertEqual(manager.get_music_by_name("idea").notes, music["notes"])
+    
+    """
+    #
+    #    testing the render service
+    #
+    """
+    
+    def test_render_server(self):
+        import asyncio
+        muz = Music.Music(isPrint=False, headless=True)
+        notes = "C4/4 D4/4 E4/4 F4/4 | G4/2 E4/2 | " * 3
+        expected = np.int16(muz.music_notes_to_waves(notes, tempo=120, instrument="bell") * 32767).tobytes()
+
+        async def post(port, payload):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            body = json.dumps(payload).encode()
+            writer.write(f"POST /render HTTP/1.1\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                         + body)
+            response = await asyncio.wait_for(reader.read(), 60)
+            writer.close()
+            head, _, body = response.partition(b"\r\n\r\n")
+            if b"Transfer-Encoding: chunked" in head:
+                chunks = []
+                while True:
+                    size_line, _, body = body.partition(b"\r\n")
+                    size = int(size_line, 16)
+                    if size == 0:
+                        break
+                    chunks.append(body[:size])
+                    body = body[size + 2:]
+                body = b"".join(chunks)
+            return int(head.split()[1]), body
+
+        async def scenario():
+            server = await RenderServer.RenderServer(port=0, workers=2, chunk_seconds=1.0).start()
+            try:
+                payload = {"notes": notes, "tempo": 120, "instrument": "bell"}
+                concurrent = await asyncio.gather(*[post(server.port, payload) for _ in range(3)])
+                cached = await post(server.port, payload)
+                bad = await post(server.port, {"notes": "C4/4 X9/4"})
+                return concurrent, cached, bad, dict(server.counters)
+            finally:
+                await server.close()
+
+        concurrent, cached, bad, counters = asyncio.run(scenario())
+        for status, body in concurrent + [cached]:
+            self.assertEqual(status, 200)
+            self.assertEqual(body[:4], b"RIFF")
+            self.assertEqual(body[44:], expected)
+        self.assertEqual(bad[0], 400)
+        self.assertEqual((counters["deduplicated"], counters["cache_hits"]), (2, 1))
+        # the signature is checked but does not split the cache
+        with self.assertRaises(ValueError):
+            RenderServer.RenderServer.normalize_request({"notes": notes, "signature": "4/0"})
+        normalize = RenderServer.RenderServer.normalize_request
+        self.assertEqual(RenderServer.RenderServer.request_key(normalize({"notes": notes, "signature": "3/4"})),
+                         RenderServer.RenderServer.request_key(normalize({"notes": notes})))
+        # the piece is scheduled once; each chunk gets only the events of its range
+        request = RenderServer.RenderServer.normalize_request({"notes": notes, "instrument": "bell"})
+        ranges = RenderServer.plan_render(request, 44100)
+        self.assertEqual(len(ranges), 6)
+        self.assertTrue(all(len(events) == 2 for _, _, events in ranges[1::2]))
+        pcm = [RenderServer.render_pcm16(request, events, start, end) for start, end, events in ranges]
+        self.assertEqual(b"".join(pcm), expected)
+        
+    def test_render_server_stream_error(self):
+        import asyncio
+
+        async def scenario():
+            server = await RenderServer.RenderServer(port=0, workers=1).start()
+            loop = asyncio.get_running_loop()
+
+            def render(request):
+                # the first chunk is sent, the second one fails after the status line is out
+                job = RenderServer.RenderJob("audio/wav")
+                header, failed = loop.create_future(), loop.create_future()
+                header.set_result(RenderServer.wav_header(10))
+                failed.set_exception(RuntimeError("worker died"))
+                job.planned.set_result([header, failed])
+                return job
+
+            server.render = render
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                body = json.dumps({"notes": "C4/4"}).encode()
+                writer.write(f"POST /render HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+                response = await asyncio.wait_for(reader.read(), 10)
+                writer.close()
+                return response
+            finally:
+                await server.close()
+
+        response = asyncio.run(scenario())
+        # the client gets the status line and the first chunk, then the connection ends without the last chunk
+        self.assertTrue(response.startswith(b"HTTP/1.1 200"))
+        self.assertIn(b"RIFF", response)
+        self.assertFalse(response.endswith(b"0\r\n\r\n"))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file